@@ -0,0 +1,165 @@
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+import requests
+
+from deadline import Deadline, DeadlineExceeded, NO_DEADLINE
+from domain_stats import CACHE_DIR
+from log_setup import get_logger
+from perf_metrics import perf
+
+logger = get_logger(__name__)
+
+DEFAULT_LIMITS_PATH = os.path.join(CACHE_DIR, 'concurrency_limits.json')
+
+# Responses meaning "slow down": rate limited, unavailable, gateway timeout
+OVERLOAD_STATUS = {429, 503, 504}
+
+
+def is_overload(exc: BaseException) -> bool:
+    """Timeouts and 429/503/504 errors from requests or the Gemini client (google.api_core)"""
+    if isinstance(exc, (TimeoutError, concurrent.futures.TimeoutError, requests.exceptions.Timeout)):
+        return True
+    status = getattr(exc, 'code', None)
+    if not isinstance(status, int):
+        status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    return status in OVERLOAD_STATUS
+
+
+class _Slot:
+    def __init__(self):
+        self.overloaded = False
+
+    def overload(self):
+        """Mark the call as throttled even though it did not raise (e.g. a 429 handled by the caller)"""
+        self.overloaded = True
+
+
+def limited(limiter: Optional['AdaptiveLimiter'], key: str, deadline: Deadline = NO_DEADLINE):
+    """`limiter.slot(key, deadline)`, or a no-op when no limiter is configured"""
+    return limiter.slot(key, deadline) if limiter is not None else nullcontext(_Slot())
+
+
+class AdaptiveLimiter:
+    """Per-key concurrency limits (news host or LLM endpoint) tuned by AIMD, persisted across runs.
+
+    Each healthy call raises the key's limit by 1/limit (about +1 per limit's worth of calls);
+    a timeout or 429/503 halves it, at most once per `cooldown` seconds so a burst of
+    in-flight failures counts as a single signal. Calls much slower than the key's usual
+    latency hold the limit where it is.
+    """
+
+    def __init__(self, path: str = DEFAULT_LIMITS_PATH, initial: float = 2, min_limit: float = 1,
+                 max_limit: float = 32, backoff: float = 0.5, cooldown: float = 2.0,
+                 latency_tolerance: float = 2.0, save_every: int = 50):
+        self.path = path
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.latency_tolerance = latency_tolerance
+        self.save_every = save_every
+        self._limits: Dict[str, Dict[str, float]] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._last_decrease: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._dirty = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._limits = json.load(f)
+        except (OSError, ValueError):
+            self._limits = {}
+
+    def save(self):
+        with self._condition:
+            if not self._dirty:
+                return
+            snapshot = json.dumps(self._limits)
+            self._dirty = 0
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.path)
+
+    def limit(self, key: str) -> float:
+        entry = self._limits.get(key)
+        return entry['limit'] if entry else self.initial
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Current limit, latency baseline and in-flight count per key"""
+        with self._condition:
+            return {
+                key: {'limit': round(entry['limit'], 2), 'latency': round(entry['latency'], 3),
+                      'in_flight': self._in_flight.get(key, 0)}
+                for key, entry in self._limits.items()
+            }
+
+    @contextmanager
+    def slot(self, key: str, deadline: Deadline = NO_DEADLINE):
+        """Hold one of `key`'s concurrent slots for the duration of the block.
+
+        Waits while the key is at its limit (raising DeadlineExceeded if the budget runs out);
+        the outcome of the block adjusts the limit.
+        """
+        self._acquire(key, deadline)
+        slot = _Slot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except DeadlineExceeded:
+            # Our own budget ran out: says nothing about the server
+            self._release(key, None, False)
+            raise
+        except BaseException as e:
+            self._release(key, None, is_overload(e))
+            raise
+        else:
+            self._release(key, time.monotonic() - started, slot.overloaded)
+
+    def _acquire(self, key: str, deadline: Deadline):
+        with self._condition:
+            waited = False
+            while self._in_flight.get(key, 0) >= int(self.limit(key)):
+                remaining = deadline.remaining()
+                if remaining <= 0:
+                    raise DeadlineExceeded()
+                waited = True
+                self._condition.wait(min(remaining, 1.0))
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        if waited:
+            perf.incr('limiter.waited')
+
+    def _release(self, key: str, latency: Optional[float], overloaded: bool):
+        with self._condition:
+            self._in_flight[key] = max(0, self._in_flight.get(key, 0) - 1)
+            entry = self._limits.setdefault(key, {'limit': float(self.initial), 'latency': 0.0})
+            now = time.monotonic()
+
+            if overloaded:
+                if now - self._last_decrease.get(key, 0.0) >= self.cooldown:
+                    entry['limit'] = max(self.min_limit, entry['limit'] * self.backoff)
+                    self._last_decrease[key] = now
+                    perf.incr('limiter.decrease')
+                    logger.info("Concurrency for %s cut to %.1f", key, entry['limit'])
+            elif latency is not None:
+                baseline = entry['latency']
+                if not baseline or latency <= baseline * self.latency_tolerance:
+                    entry['limit'] = min(self.max_limit, entry['limit'] + 1 / entry['limit'])
+                # Slow-moving latency baseline (EWMA)
+                entry['latency'] = latency if not baseline else 0.9 * baseline + 0.1 * latency
+
+            self._dirty += 1
+            should_save = self._dirty >= self.save_every
+            self._condition.notify_all()
+        if should_save:
+            self.save()
@@ -1,26 +1,152 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
-import asyncio
 from datetime import datetime
 import re
+import time
 import os
-from typing import List, Dict, Optional
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 import json
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Import modules
 from scraper import NewsScraper
-from sentiment_analyzer import SentimentAnalyzer
+from sentiment_analyzer import CONFIDENCE_LEVELS, SentimentAnalyzer
 from journalist_detector import JournalistDetector
 from summarizer import ArticleSummarizer
 from config import GEMINI_API_KEY
+from perf_metrics import PerfRecorder, perf, recording
+from log_setup import configure_logging, get_logger, set_correlation_id
+from result_store import ResultStore, TEXT_COLUMNS
+from exporter import EXPORT_FORMATS, ExportManager
+from deadline import Deadline, DeadlineExceeded, NO_DEADLINE
+from site_index import SiteIndex
+from article_store import ArticleStore
+from adaptive_limiter import AdaptiveLimiter
+from circuit_breaker import CircuitOpen
+from work_queue import DEFAULT_QUEUE_PATH, ROW_INDEX, ShardWorker, WorkQueue, analyze_shard
+from prefilter import ArticleIdDates, RowFilter, filter_urls
+from upload_reader import UPLOAD_TYPES, content_hash, read_upload
+from fingerprint import fingerprint
+
+logger = get_logger(__name__)
+
+LIVE_TABLE_ROWS = 20
+PREVIEW_PAGE_SIZES = (25, 50, 100, 250)
+
+# Output columns per stage, and the column recording the fingerprint of their inputs (incremental mode)
+STAGE_COLUMNS = {
+ 'scrape': ('Title_New', 'Content_New', 'Scraping_Method_New'),
+ 'journalist': ('Journalist_New',),
+ 'sentiment': ('Sentiment_New', 'Confidence_New', 'Reasoning_New'),
+ 'summary': ('Summary_New',)
+}
+STAGE_FINGERPRINTS = {stage: f"Fingerprint_{stage.title()}_New" for stage in STAGE_COLUMNS}
+
+MAX_ENTITIES = 20
+
+# Snippets per model call in the snippet tier of tiered mode
+SNIPPET_BATCH_SIZE = 8
+
+# Title shown for manual URLs whose row did not run to completion, per row status
+ROW_STATUS_TITLES = {
+ 'timeout': 'Waktu habis (timeout)',
+ 'deferred': 'Ditunda: situs sedang diblokir/tidak merespons',
+ 'circuit_open': 'Dilewati: situs diblokir/tidak merespons (circuit breaker)',
+ 'filtered': 'Dilewati filter awal'
+}
+
+def parse_entities(text: Optional[str]) -> List[str]:
+ """One entity per line, duplicates removed, order kept"""
+ entities = []
+ for line in (text or '').splitlines():
+     entity = line.strip()
+     if entity and entity.lower() not in [e.lower() for e in entities]:
+         entities.append(entity)
+ return entities[:MAX_ENTITIES]
+
+def entity_columns(entity: str, suffix: str = '') -> Tuple[str, str, str]:
+ """Sentiment/Confidence/Reasoning column names for one entity"""
+ label = re.sub(r'\W+', '_', entity).strip('_') or 'Entitas'
+ return (f"Sentiment_{label}{suffix}", f"Confidence_{label}{suffix}", f"Reasoning_{label}{suffix}")
+
+def input_row_hashes(frame: pd.DataFrame) -> pd.Series:
+ """Hash per row over all given columns, independent of dtype and index"""
+ return pd.util.hash_pandas_object(frame.fillna('').astype(str), index=False).reset_index(drop=True)
+
+def carry_over_outputs(df: pd.DataFrame, previous: ResultStore, url_column: str) -> pd.DataFrame:
+ """`df` with the outputs and fingerprints (`*_New`) of `previous` copied into rows whose inputs are unchanged.
+ 
+ A row matches an earlier row when all its input columns, the URL included, hash the same; edited
+ snippets or other inputs therefore keep their new values and are analyzed again.
+ """
+ input_columns = [column for column in df.columns if not str(column).endswith('_New')]
+ output_columns = [column for column in previous.columns if str(column).endswith('_New')]
+ if url_column not in input_columns or not output_columns or not set(input_columns) <= set(previous.columns):
+     return df
+ 
+ earlier_rows = {}
+ for position, row_hash in enumerate(input_row_hashes(previous.frame(columns=input_columns))):
+     earlier_rows.setdefault(row_hash, position)
+ matches = [(position, earlier_rows[row_hash])
+            for position, row_hash in enumerate(input_row_hashes(df[input_columns])) if row_hash in earlier_rows]
+ if not matches:
+     return df
+ 
+ rows = [position for position, _ in matches]
+ earlier = [position for _, position in matches]
+ merged = df.copy()
+ for column in output_columns:
+     if column in merged.columns:
+         values = merged[column].astype(object)
+     else:
+         values = pd.Series(None, index=merged.index, dtype=object)
+     values.iloc[rows] = previous.column(column).iloc[earlier].values
+     merged[column] = values
+ perf.incr('incremental.rows_carried', len(matches))
+ return merged
+
+@st.cache_resource
+def get_export_manager() -> ExportManager:
+ """Background export worker shared across reruns and sessions"""
+ return ExportManager()
+
+@st.cache_resource(show_spinner=False)
+def get_site_index() -> SiteIndex:
+ """robots.txt/sitemap cache and per-host request spacing shared across reruns and sessions"""
+ return SiteIndex()
+
+@st.cache_resource(show_spinner=False)
+def get_concurrency_limiter() -> AdaptiveLimiter:
+ """Learned per-host and per-endpoint concurrency limits, shared so all sessions respect them together"""
+ return AdaptiveLimiter()
+
+@st.cache_resource(show_spinner=False)
+def get_article_store() -> ArticleStore:
+ """Articles and analysis results shared by all users of this deployment"""
+ store = ArticleStore()
+ store.evict()
+ return store
+
+@st.cache_resource(show_spinner=False)
+def get_article_id_dates() -> ArticleIdDates:
+ """Publication dates learned for sequential article IDs, used to date URLs without fetching them"""
+ return ArticleIdDates()
 
 class NewsAnalyzerApp:
  def __init__(self):
      self.scraper = NewsScraper()
+     self.scraper.site_index = get_site_index()
+     self.scraper.limiter = get_concurrency_limiter()
      self.sentiment_analyzer = SentimentAnalyzer()
      self.journalist_detector = JournalistDetector()
      self.summarizer = ArticleSummarizer()
+     self.article_id_dates = get_article_id_dates()
+     self.row_filter = None
+     self.run_metrics = {}
      
      # Set API key from config
      if GEMINI_API_KEY and GEMINI_API_KEY != "YOUR_GEMINI_API_KEY_HERE":
@@ -78,6 +204,10 @@ class NewsAnalyzerApp:
      
      # Conditional configurations
      sentiment_context = None
+     sentiment_entities = []
+     sentiment_backend = 'gemini'
+     snippet_first = False
+     min_snippet_confidence = 'sedang'
      summarize_config = {}
      
      # Sentiment Configuration (only show if enabled)
@@ -88,6 +218,42 @@ class NewsAnalyzerApp:
              placeholder="Contoh: Toyota Avanza, harga mobil, kualitas produk",
              help="Masukkan objek/aspek untuk analisis sentimen"
          )
+         entities_input = st.sidebar.text_area(
+             "Daftar Entitas (opsional)",
+             placeholder="Satu entitas per baris, contoh:\nToyota\nHonda\nDaihatsu",
+             help="Sentimen dianalisis untuk setiap entitas dalam satu kali proses per artikel; hasilnya satu grup kolom per entitas"
+         )
+         sentiment_entities = parse_entities(entities_input)
+         backend_options = {
+             "Gemini (AI)": 'gemini',
+             "Lexicon Lokal (offline)": 'lexicon',
+             "Hybrid (Lexicon + Gemini)": 'hybrid'
+         }
+         backend_label = st.sidebar.selectbox(
+             "Mesin Sentimen",
+             list(backend_options.keys()),
+             help="Lexicon lokal berjalan offline tanpa API; Hybrid hanya memanggil Gemini untuk hasil dengan confidence rendah"
+         )
+         sentiment_backend = backend_options[backend_label]
+         # Escalated rows are re-analyzed on the full text, so the tier needs scraping
+         if enable_scraping:
+             snippet_first = st.sidebar.checkbox(
+                 "🪜 Mode bertingkat: snippet dulu (Excel)",
+                 value=False,
+                 help="Sentimen dihitung dulu dari kolom snippet, tanpa membuka halaman dan beberapa baris per panggilan AI. "
+                      "Hanya baris yang hasilnya kurang yakin di-scrape dan dianalisis ulang dari teks lengkap. "
+                      "Tidak berlaku untuk daftar entitas; jurnalis dan ringkasan tidak dibuat untuk baris yang cukup dari snippet"
+             )
+             if snippet_first:
+                 escalate_options = {"rendah": 'sedang', "rendah atau sedang": 'tinggi'}
+                 escalate_label = st.sidebar.selectbox(
+                     "Analisis teks lengkap jika confidence snippet",
+                     list(escalate_options.keys()),
+                     help="Hasil 'tidak terkait' dari snippet hanya diterima jika confidence tinggi"
+                 )
+                 min_snippet_confidence = escalate_options[escalate_label]
+         else:
+             st.sidebar.caption("🪜 Mode bertingkat (snippet dulu) memerlukan '📄 Tarik Full Teks Berita'")
      
      # Summarize Configuration (only show if enabled)
      if enable_summarize:
@@ -135,8 +301,140 @@ class NewsAnalyzerApp:
              value=30,
              help="Waktu tunggu maksimal untuk setiap URL"
          )
+         browser_fallback = st.sidebar.checkbox(
+             "🖥️ Fallback Browser (Playwright)",
+             value=True,
+             help="Render halaman yang gagal di-scrape (JavaScript/anti-bot) dengan headless browser"
+         )
+         max_page_mb = st.sidebar.slider(
+             "Ukuran maksimal halaman (MB)",
+             min_value=1,
+             max_value=10,
+             value=3,
+             help="Halaman lebih besar dipotong; file non-HTML (PDF, video) tidak diunduh"
+         )
+         respect_robots = st.sidebar.checkbox(
+             "🤖 Patuhi robots.txt",
+             value=True,
+             help="Lewati URL yang dilarang robots.txt dan beri jeda sesuai Crawl-delay per situs"
+         )
+         use_sitemaps = st.sidebar.checkbox(
+             "🗺️ Gunakan sitemap berita",
+             value=True,
+             help="Ambil judul/tanggal dari sitemap-news.xml dan lewati artikel yang belum berubah (lastmod)"
+         )
      else:
          scraping_timeout = 30
+         browser_fallback = False
+         max_page_mb = 3
+         respect_robots = True
+         use_sitemaps = True
+     
+     st.sidebar.subheader("🔎 Filter Awal")
+     filter_dates = st.sidebar.checkbox(
+         "📅 Batasi tanggal terbit",
+         value=False,
+         help="Tanggal dibaca dari sinyal termurah dulu: pola tanggal/ID di URL, sitemap berita, lalu tanggal artikel hasil scraping"
+     )
+     filter_since, filter_until = '', ''
+     if filter_dates:
+         filter_since = st.sidebar.date_input("Dari tanggal", value=datetime.now().date().replace(day=1)).isoformat()
+         filter_until = st.sidebar.date_input("Sampai tanggal", value=datetime.now().date()).isoformat()
+     allow_domains = st.sidebar.text_area(
+         "Hanya domain ini (opsional)",
+         placeholder="Satu domain per baris, contoh:\nkompas.com\ndetik.com",
+         help="Subdomain ikut (finance.detik.com cocok dengan detik.com)"
+     )
+     deny_domains = st.sidebar.text_area(
+         "Abaikan domain ini (opsional)",
+         placeholder="Satu domain per baris"
+     )
+     language_options = {"Indonesia": 'id', "Inggris": 'en'}
+     filter_languages = st.sidebar.multiselect(
+         "Bahasa artikel (opsional)",
+         list(language_options.keys()),
+         help="Deteksi cepat dari paragraf pertama; artikel berbahasa lain tidak dianalisis AI"
+     )
+     drop_filtered = st.sidebar.checkbox(
+         "Buang baris yang tersaring",
+         value=False,
+         help="URL yang tersaring dari domain/tanggal di URL dihapus dari hasil. Jika tidak dicentang, baris tetap ada "
+              "dengan status 'filtered' dan alasannya. Baris yang tersaring setelah scraping (tanggal artikel, bahasa) "
+              "selalu ditandai, tanpa sentimen/ringkasan"
+     )
+     prefilter = {
+         'since': filter_since,
+         'until': filter_until,
+         'allow_domains': [line.strip() for line in allow_domains.splitlines() if line.strip()],
+         'deny_domains': [line.strip() for line in deny_domains.splitlines() if line.strip()],
+         'languages': [language_options[label] for label in filter_languages],
+         'drop': drop_filtered
+     }
+     
+     st.sidebar.subheader("⏳ Batas Waktu")
+     url_budget = st.sidebar.slider(
+         "Batas total per URL (detik)",
+         min_value=30,
+         max_value=300,
+         value=120,
+         step=10,
+         help="Waktu maksimal untuk semua tahap satu URL (judul, scraping, AI). Baris yang melewati batas ditandai 'timeout'"
+     )
+     batch_deadline_minutes = st.sidebar.number_input(
+         "Batas waktu batch (menit, 0 = tanpa batas)",
+         min_value=0,
+         max_value=600,
+         value=0,
+         help="Setelah batas ini, baris yang tersisa langsung ditandai 'timeout' dan bisa diulang nanti"
+     )
+     
+     st.sidebar.subheader("🚀 Paralel")
+     max_workers = st.sidebar.slider(
+         "Baris diproses paralel (maks)",
+         min_value=1,
+         max_value=32,
+         value=8,
+         help="Batas atas; jumlah request bersamaan per situs berita dan ke Gemini menyesuaikan otomatis "
+              "(naik selama respons lancar, turun saat 429/503/timeout)"
+     )
+     distributed = st.sidebar.checkbox(
+         "🌐 Mode terdistribusi (Excel)",
+         value=False,
+         help="File dibagi menjadi shard di antrean bersama; sesi ini dan worker lain "
+              "(`python work_queue.py worker`) memproses shard bersamaan, hasil digabung sesuai urutan baris"
+     )
+     queue_path = DEFAULT_QUEUE_PATH
+     shard_size = 500
+     if distributed:
+         queue_path = st.sidebar.text_input(
+             "Lokasi antrean",
+             value=DEFAULT_QUEUE_PATH,
+             help="File SQLite yang sama harus bisa diakses semua worker"
+         )
+         shard_size = st.sidebar.number_input("Baris per shard", min_value=10, max_value=5000, value=500, step=10)
+     
+     st.sidebar.subheader("⚡ Tampilan")
+     log_level = st.sidebar.selectbox(
+         "Level Log Server",
+         ["WARNING", "INFO", "DEBUG"],
+         help="Batch besar sebaiknya memakai WARNING agar log server tetap ringan"
+     )
+     live_results = st.sidebar.checkbox(
+         "Tampilkan hasil live (streaming)",
+         value=True,
+         help="Tabel hasil diperbarui per baris dan ringkasan ditampilkan saat dihasilkan"
+     )
+     use_article_store = st.sidebar.checkbox(
+         "🗄️ Gunakan arsip artikel bersama",
+         value=True,
+         help="Pakai ulang artikel dan hasil analisis yang sudah pernah diproses (oleh pengguna mana pun) di server ini"
+     )
+     incremental = st.sidebar.checkbox(
+         "♻️ Mode inkremental (Excel)",
+         value=True,
+         help="Hanya hitung ulang kolom yang inputnya berubah (konten, konteks, konfigurasi ringkasan, versi prompt, model). "
+              "Berlaku untuk file hasil export yang diupload ulang maupun analisis ulang file yang sama di sesi ini"
+     )
      
      return {
          'enable_scraping': enable_scraping,
@@ -144,8 +442,27 @@ class NewsAnalyzerApp:
          'enable_journalist': enable_journalist,
          'enable_summarize': enable_summarize,
          'sentiment_context': sentiment_context,
+         'sentiment_entities': sentiment_entities,
+         'sentiment_backend': sentiment_backend,
+         'snippet_first': snippet_first,
+         'min_snippet_confidence': min_snippet_confidence,
          'summarize_config': summarize_config,
-         'scraping_timeout': scraping_timeout
+         'scraping_timeout': scraping_timeout,
+         'browser_fallback': browser_fallback,
+         'max_page_mb': max_page_mb,
+         'respect_robots': respect_robots,
+         'use_sitemaps': use_sitemaps,
+         'prefilter': prefilter,
+         'url_budget': url_budget,
+         'batch_deadline_minutes': batch_deadline_minutes,
+         'max_workers': max_workers,
+         'distributed': distributed,
+         'queue_path': queue_path,
+         'shard_size': shard_size,
+         'live_results': live_results,
+         'use_article_store': use_article_store,
+         'incremental': incremental,
+         'log_level': log_level
      }
  
  def get_column_mapping(self, df: pd.DataFrame, input_method: str):
@@ -179,284 +496,796 @@ class NewsAnalyzerApp:
          'snippet_column': snippet_column if snippet_column != "Tidak Ada" else None
      }
  
- def process_urls_manual(self, urls: List[str], config: Dict) -> List[Dict]:
+ def process_urls_manual(self, urls: List[str], config: Dict) -> ResultStore:
      """Process manual URL input"""
-     results = []
+     results = ResultStore(text_columns=self._text_columns(config))
      progress_bar = st.progress(0)
      status_text = st.empty()
+     live_view = self._create_live_view(config)
+     run_started = time.perf_counter()
+     batch_deadline = self._batch_deadline(config)
      
-     for i, url in enumerate(urls):
+     def analyze(i: int, url: str) -> Dict:
+         set_correlation_id(f"url{i+1}")
          status_text.text(f"Memproses URL {i+1}/{len(urls)}: {url[:50]}...")
          
-         try:
-             result = {'URL': url}
-             content = ""
-             
-             # Get title using newspaper3k first
-             title = self.scraper.get_title_newspaper3k(url)
-             result['Title'] = title if title else 'Gagal mengambil judul'
+         return self._run_with_deadline(
+             lambda deadline: self._analyze_manual_url(url, config, status_text, live_view, deadline),
+             {'URL': url, 'Title': ''},
+             'Status',
+             Deadline(config.get('url_budget'), parent=batch_deadline),
+             defer_open=True
+         )
+     
+     for i, result in enumerate(self._map_rows(analyze, urls, config.get('max_workers', 1))):
+         results.append(result)
+         self._update_live_view(live_view, results, run_started)
+         progress_bar.progress((i + 1) / len(urls))
+     
+     # URLs of domains whose circuit opened get one more chance once the rest is done
+     self._rerun_rows(results, config, False, 'deferred', "⏭️ Memproses baris yang ditunda", batch_deadline)
+     
+     self.scraper.save_state()
+     self.article_id_dates.save()
+     status_text.text("Selesai!")
+     return results
+ 
+ def _analyze_manual_url(self, url: str, config: Dict, status_text, live_view: Optional[Dict],
+                         deadline: Deadline) -> Dict:
+     try:
+         reason = self._filter_before_fetch(url, deadline)
+         if reason:
+             return {'URL': url, 'Title': ROW_STATUS_TITLES['filtered'], 'Filter': reason, 'Status': 'filtered'}
+         
+         result = {'URL': url}
+         content = ""
+         publish_date = ""
+         
+         # Get title using newspaper3k first
+         title = self.scraper.get_title_newspaper3k(url, config['scraping_timeout'], deadline)
+         result['Title'] = title if title else 'Gagal mengambil judul'
+         
+         # 1. Scraping (if enabled)
+         if config['enable_scraping']:
+             # Use sync method instead of async
+             article_data = self.scraper.scrape_article_sync(
+                 url, 
+                 timeout=config['scraping_timeout'],
+                 deadline=deadline
+             )
              
-             # 1. Scraping (if enabled)
-             if config['enable_scraping']:
-                 # Use sync method instead of async
-                 article_data = self.scraper.scrape_article_sync(
-                     url, 
-                     timeout=config['scraping_timeout']
-                 )
+             if article_data:
+                 result['Content'] = article_data.get('content', '')
+                 result['Scraping_Method'] = article_data.get('method', 'unknown')  # Track method
+                 content = article_data.get('content', '')
+                 publish_date = article_data.get('publish_date', '')
                  
-                 if article_data:
-                     result['Content'] = article_data.get('content', '')
-                     result['Scraping_Method'] = article_data.get('method', 'unknown')  # Track method
-                     content = article_data.get('content', '')
-                     
-                     # Show success info
-                     if len(content) > 500:
-                         status_text.text(f"✅ Berhasil: {len(content)} karakter dari {url[:30]}...")
-                     else:
-                         status_text.text(f"⚠️ Konten pendek: {len(content)} karakter dari {url[:30]}...")
+                 # Show success info
+                 if len(content) > 500:
+                     status_text.text(f"✅ Berhasil: {len(content)} karakter dari {url[:30]}...")
                  else:
-                     result['Content'] = 'Gagal scraping'
-                     result['Scraping_Method'] = 'failed'
-                     content = ''
-                     status_text.text(f"❌ Gagal scraping: {url[:30]}...")
+                     status_text.text(f"⚠️ Konten pendek: {len(content)} karakter dari {url[:30]}...")
              else:
-                 # If scraping disabled, try to get basic content for other functions
-                 try:
-                     article_data = self.scraper.scrape_article_sync(url, basic_only=True)
-                     content = article_data.get('content', '') if article_data else ''
-                 except:
-                     content = ''
-             
-             # 2. Journalist Detection (if enabled)
-             if config['enable_journalist']:
-                 if content:
-                     journalist = self.journalist_detector.detect_journalist(url, content)
-                     result['Journalist'] = journalist
-                 else:
-                     result['Journalist'] = 'Tidak dapat dideteksi (tidak ada konten)'
-             
-             # 3. Sentiment Analysis (if enabled)
-             if config['enable_sentiment'] and config['sentiment_context']:
-                 if content and len(content.strip()) > 5:
-                     sentiment = self.sentiment_analyzer.analyze_sentiment(
-                         content, config['sentiment_context']
-                     )
-                     
-                     if sentiment:
-                         result.update({
-                             'Sentiment': sentiment.get('sentiment', ''),
-                             'Confidence': sentiment.get('confidence', ''),
-                             'Reasoning': sentiment.get('reasoning', '')
-                         })
-                     else:
-                         result.update({
-                             'Sentiment': 'Gagal analisis',
-                             'Confidence': '',
-                             'Reasoning': 'Error dalam analisis AI'
-                         })
+                 result['Content'] = 'Gagal scraping'
+                 result['Scraping_Method'] = 'failed'
+                 content = ''
+                 status_text.text(f"❌ Gagal scraping: {url[:30]}...")
+         else:
+             # If scraping disabled, try to get basic content for other functions
+             try:
+                 article_data = self.scraper.scrape_article_sync(
+                     url, timeout=config['scraping_timeout'], basic_only=True, deadline=deadline
+                 )
+                 content = article_data.get('content', '') if article_data else ''
+                 publish_date = article_data.get('publish_date', '') if article_data else ''
+             except Exception:
+                 content = ''
+         
+         reason = self._filter_after_fetch(url, publish_date, content)
+         if reason:
+             result.update({'Filter': reason, 'Status': 'filtered'})
+             return result
+         
+         # 2. Journalist Detection (if enabled)
+         if config['enable_journalist']:
+             if content:
+                 journalist = self.journalist_detector.detect_journalist(
+                     url, content, config['scraping_timeout'], deadline
+                 )
+                 result['Journalist'] = journalist
+             else:
+                 result['Journalist'] = 'Tidak dapat dideteksi (tidak ada konten)'
+         
+         # 3. Sentiment Analysis (if enabled)
+         if config['enable_sentiment'] and config.get('sentiment_entities'):
+             result.update(self._analyze_entity_sentiment(content, config, deadline)[0])
+         elif config['enable_sentiment'] and config['sentiment_context']:
+             if content and len(content.strip()) > 5:
+                 sentiment = self.sentiment_analyzer.analyze_sentiment(
+                     content, config['sentiment_context'], deadline
+                 )
+                 
+                 if sentiment:
+                     result.update({
+                         'Sentiment': sentiment.get('sentiment', ''),
+                         'Confidence': sentiment.get('confidence', ''),
+                         'Reasoning': sentiment.get('reasoning', '')
+                     })
                  else:
                      result.update({
-                         'Sentiment': 'Artikel tidak dapat dibuka',
+                         'Sentiment': 'Gagal analisis',
                          'Confidence': '',
-                         'Reasoning': 'Tidak ada konten yang cukup untuk analisis'
+                         'Reasoning': 'Error dalam analisis AI'
                      })
-             
-             # 4. Summarize (if enabled)
-             if config['enable_summarize']:
-                 if content and len(content.strip()) > 50:
-                     summary = self.summarizer.summarize_article(
-                         content, config['summarize_config']
-                     )
-                     
-                     if summary:
-                         result['Summary'] = summary.get('summary', '')
-                     else:
-                         result['Summary'] = 'Gagal membuat ringkasan'
+             else:
+                 result.update({
+                     'Sentiment': 'Artikel tidak dapat dibuka',
+                     'Confidence': '',
+                     'Reasoning': 'Tidak ada konten yang cukup untuk analisis'
+                 })
+         
+         # 4. Summarize (if enabled)
+         if config['enable_summarize']:
+             if content and len(content.strip()) > 50:
+                 summary = self._summarize(content, config, live_view, deadline)
+                 
+                 if summary:
+                     result['Summary'] = summary.get('summary', '')
                  else:
-                     result['Summary'] = 'Konten terlalu pendek untuk diringkas'
-             
-         except Exception as e:
-             result = {
-                 'URL': url,
-                 'Title': f'Error: {str(e)}',
-                 'Content': '',
-                 'Scraping_Method': 'error',
-                 'Journalist': '',
-                 'Sentiment': '',
-                 'Confidence': '',
-                 'Reasoning': '',
-                 'Summary': ''
-             }
-             status_text.text(f"❌ Error: {url[:30]}... - {str(e)[:50]}...")
+                     result['Summary'] = 'Gagal membuat ringkasan'
+             else:
+                 result['Summary'] = 'Konten terlalu pendek untuk diringkas'
          
-         results.append(result)
-         progress_bar.progress((i + 1) / len(urls))
+     except Exception as e:
+         result = {
+             'URL': url,
+             'Title': f'Error: {str(e)}',
+             'Content': '',
+             'Scraping_Method': 'error',
+             'Journalist': '',
+             'Sentiment': '',
+             'Confidence': '',
+             'Reasoning': '',
+             'Summary': '',
+             'Status': 'error'
+         }
+         status_text.text(f"❌ Error: {url[:30]}... - {str(e)[:50]}...")
      
-     status_text.text("Selesai!")
-     return results
+     return result
  
- def process_excel_data(self, df: pd.DataFrame, column_mapping: Dict, config: Dict) -> pd.DataFrame:
+ def process_excel_data(self, df: pd.DataFrame, column_mapping: Dict, config: Dict) -> ResultStore:
      """Process Excel file data"""
-     results = []
+     # Input columns are referenced from df; only new columns are stored per row
+     results = ResultStore(base=df, text_columns=self._text_columns(config))
      progress_bar = st.progress(0)
      status_text = st.empty()
+     live_view = self._create_live_view(config)
+     run_started = time.perf_counter()
+     batch_deadline = self._batch_deadline(config)
      
      total_rows = len(df)
+     tier = self._snippet_tier(df, column_mapping, config, status_text, batch_deadline)
      
-     for i, row in df.iterrows():
+     def analyze(i: int, row: Dict) -> Dict:
          status_text.text(f"Menganalisis baris {i+1}/{total_rows}...")
+         set_correlation_id(f"row{i+1}")
+         if tier and i in tier['filtered']:
+             return {'Filter_New': tier['filtered'][i], 'Status_New': 'filtered'}
          
-         result = row.to_dict()  # Start with existing data
-         
-         url = row.get(column_mapping['url_column'], '')
-         snippet = ""
-         content = ""
-         
-         # Get snippet if column is specified
-         if column_mapping['snippet_column']:
-             snippet = str(row.get(column_mapping['snippet_column'], ''))
-             if snippet == 'nan':
-                 snippet = ""
-         
+         result = self._run_with_deadline(
+             lambda deadline: self._analyze_excel_row(
+                 row, column_mapping, config, status_text, live_view, deadline, f"{i+1}/{total_rows}",
+                 tier['accepted'].get(i) if tier else None
+             ),
+             {},
+             'Status_New',
+             Deadline(config.get('url_budget'), parent=batch_deadline),
+             defer_open=True
+         )
+         if tier:
+             result.setdefault('Tier_New', 'full')
+         return result
+     
+     # Only the columns the row pipeline reads; the full sheet stays referenced by the results
+     rows = iter(df[self._processing_columns(df, column_mapping)].to_dict('records'))
+     for i, result in enumerate(self._map_rows(analyze, rows, config.get('max_workers', 1))):
+         results.append(result)
+         self._update_live_view(live_view, results, run_started)
+         progress_bar.progress((i + 1) / total_rows)
+     
+     # Rows of domains whose circuit opened get one more chance once the rest is done
+     self._rerun_rows(
+         results, {**config, 'column_mapping': column_mapping}, True, 'deferred',
+         "⏭️ Memproses baris yang ditunda", batch_deadline
+     )
+     
+     self.scraper.save_state()
+     self.article_id_dates.save()
+     status_text.text("Analisis selesai!")
+     return results
+ 
+ def process_distributed(self, df: pd.DataFrame, column_mapping: Dict, config: Dict) -> ResultStore:
+     """Process Excel data through the shared work queue; this session works on shards too while waiting"""
+     queue = WorkQueue(config.get('queue_path') or DEFAULT_QUEUE_PATH)
+     minutes = config.get('batch_deadline_minutes') or 0
+     if minutes:
+         config = {**config, 'batch_deadline_at': time.time() + minutes * 60}
+     job_id = queue.submit(df, column_mapping, config, int(config.get('shard_size', 500)))
+     progress = queue.progress(job_id)
+     st.info(
+         f"🌐 Job `{job_id}`: {progress['shards']} shard di antrean `{queue.path}`. Tambah worker dengan "
+         f"`python work_queue.py --queue {queue.path} worker --job {job_id}`"
+     )
+     progress_bar = st.progress(0)
+     status_text = st.empty()
+     shard_area = st.empty()
+     
+     def process(shard: Dict) -> List[Dict]:
+         # Each shard's own progress widgets replace the previous shard's
+         with shard_area.container():
+             return analyze_shard(self, shard)
+     
+     worker = ShardWorker(queue, process)
+     while not queue.is_finished(job_id):
+         shard = queue.claim(worker.worker_id, job_id)
+         if shard:
+             worker.work_on(shard)
+         else:
+             # Remaining shards are leased by other workers
+             time.sleep(worker.poll_interval)
+         progress = queue.progress(job_id)
+         progress_bar.progress(progress['rows_done'] / max(progress['total_rows'], 1))
+         status_text.text(
+             f"Shard selesai {progress['done']}/{progress['shards']} · sedang diproses {progress['leased']} · "
+             f"antre {progress['queued']} · gagal {progress['failed']}"
+         )
+     shard_area.empty()
+     
+     records = {record.pop(ROW_INDEX): record for record in queue.results(job_id)}
+     results = ResultStore(base=df, text_columns=self._text_columns(config))
+     for row_index in df.index.tolist():
+         results.append(records[row_index])
+     queue.delete(job_id)
+     status_text.text("Analisis selesai!")
+     return results
+ 
+ def _analyze_excel_row(self, row: Dict, column_mapping: Dict, config: Dict, status_text,
+                        live_view: Optional[Dict], deadline: Deadline, label: str,
+                        snippet_sentiment: Optional[Dict] = None) -> Dict:
+     """Analyze one sheet row; with a confident `snippet_sentiment` (tiered mode) the page is never fetched"""
+     result = {}
+     
+     url = row.get(column_mapping['url_column'], '')
+     snippet = ""
+     content = ""
+     publish_date = ""
+     
+     reason = self._filter_before_fetch(url, deadline)
+     if reason:
+         return {'Filter_New': reason, 'Status_New': 'filtered'}
+     
+     # Get snippet if column is specified
+     if column_mapping['snippet_column']:
+         snippet = str(row.get(column_mapping['snippet_column'], ''))
+         if snippet == 'nan':
+             snippet = ""
+     
+     # 1. Scraping (if enabled) - reused as-is when this URL was already scraped successfully
+     scrape_fingerprint = fingerprint('scrape', url)
+     reused = self._reuse_stage(row, config, 'scrape', scrape_fingerprint) if url else None
+     if snippet_sentiment is not None:
+         result['Tier_New'] = 'snippet'
+         status_text.text(f"🪜 Baris {label} - cukup dari snippet")
+     elif config['enable_scraping'] and reused:
+         result.update(reused)
+         content = reused.get('Content_New') or ''
+         status_text.text(f"♻️ Baris {label} - konten dipakai ulang")
+     else:
          # Get title using newspaper3k for Excel data too
          if url:
-             title = self.scraper.get_title_newspaper3k(url)
+             title = self.scraper.get_title_newspaper3k(url, config['scraping_timeout'], deadline)
              if title:
                  result['Title_New'] = title
          
-         # 1. Scraping (if enabled)
          if config['enable_scraping'] and url:
              try:
                  # Use sync method
                  article_data = self.scraper.scrape_article_sync(
                      url, 
-                     timeout=config['scraping_timeout']
+                     timeout=config['scraping_timeout'],
+                     deadline=deadline
                  )
                  
                  if article_data:
                      result['Content_New'] = article_data.get('content', '')
                      result['Scraping_Method_New'] = article_data.get('method', 'unknown')  # Track method
+                     result[STAGE_FINGERPRINTS['scrape']] = scrape_fingerprint
                      content = article_data.get('content', '')
+                     publish_date = article_data.get('publish_date', '')
                      
                      # Show progress with method info
                      method = article_data.get('method', 'unknown')
-                     status_text.text(f"✅ Baris {i+1}/{total_rows} - Method: {method} - {len(content)} chars")
+                     status_text.text(f"✅ Baris {label} - Method: {method} - {len(content)} chars")
                  else:
                      result['Content_New'] = 'Gagal scraping'
                      result['Scraping_Method_New'] = 'failed'
                      content = ''
-                     status_text.text(f"❌ Baris {i+1}/{total_rows} - Scraping gagal")
+                     status_text.text(f"❌ Baris {label} - Scraping gagal")
              except Exception as e:
                  result['Content_New'] = f'Error scraping: {str(e)}'
                  result['Scraping_Method_New'] = 'error'
                  content = ''
-                 status_text.text(f"❌ Baris {i+1}/{total_rows} - Error: {str(e)[:30]}...")
-         
-         # Determine text for analysis (prioritize content, then snippet)
-         analysis_text = content if content and len(content.strip()) > 10 else snippet
-         
-         # 2. Journalist Detection (if enabled)
-         if config['enable_journalist']:
-             if analysis_text:
-                 journalist = self.journalist_detector.detect_journalist(url, analysis_text)
-                 result['Journalist_New'] = journalist
-             else:
-                 result['Journalist_New'] = 'Tidak ada konten untuk analisis'
-         
-         # 3. Sentiment Analysis (if enabled)
-         if config['enable_sentiment'] and config['sentiment_context']:
-             if analysis_text and len(analysis_text.strip()) > 5:
-                 sentiment = self.sentiment_analyzer.analyze_sentiment(
-                     analysis_text, config['sentiment_context']
-                 )
-                 
-                 if sentiment:
-                     result.update({
-                         'Sentiment_New': sentiment.get('sentiment', ''),
-                         'Confidence_New': sentiment.get('confidence', ''),
-                         'Reasoning_New': sentiment.get('reasoning', '')
-                     })
-                 else:
-                     result.update({
-                         'Sentiment_New': 'Gagal analisis',
-                         'Confidence_New': '',
-                         'Reasoning_New': 'Error dalam analisis AI'
-                     })
+                 status_text.text(f"❌ Baris {label} - Error: {str(e)[:30]}...")
+     
+     # Determine text for analysis (prioritize content, then snippet)
+     analysis_text = content if content and len(content.strip()) > 10 else snippet
+     
+     # Out-of-scope articles (publish date, language) stop here, before any model call
+     reason = self._filter_after_fetch(url, publish_date, analysis_text)
+     if reason:
+         result.update({'Filter_New': reason, 'Status_New': 'filtered'})
+         return result
+     
+     # 2. Journalist Detection (if enabled)
+     if config['enable_journalist'] and snippet_sentiment is not None:
+         # Detection downloads the page, which the snippet tier exists to avoid
+         result['Journalist_New'] = 'Tidak dideteksi (mode snippet)'
+     elif config['enable_journalist']:
+         journalist_fingerprint = fingerprint('journalist', url, analysis_text)
+         reused = self._reuse_stage(row, config, 'journalist', journalist_fingerprint)
+         if reused:
+             result.update(reused)
+         elif analysis_text:
+             journalist = self.journalist_detector.detect_journalist(
+                 url, analysis_text, config['scraping_timeout'], deadline
+             )
+             result['Journalist_New'] = journalist
+             result[STAGE_FINGERPRINTS['journalist']] = journalist_fingerprint
+         else:
+             result['Journalist_New'] = 'Tidak ada konten untuk analisis'
+     
+     # 3. Sentiment Analysis (if enabled)
+     if config['enable_sentiment'] and config.get('sentiment_entities'):
+         entities = config['sentiment_entities']
+         sentiment_fingerprint = self.sentiment_analyzer.analysis_fingerprint(
+             analysis_text, config['sentiment_context'], entities
+         )
+         reused = self._reuse_stage(
+             row, config, 'sentiment', sentiment_fingerprint,
+             [column for entity in entities for column in entity_columns(entity, '_New')]
+         )
+         if reused:
+             result.update(reused)
+         else:
+             columns, complete = self._analyze_entity_sentiment(analysis_text, config, deadline, '_New')
+             result.update(columns)
+             if complete:
+                 result[STAGE_FINGERPRINTS['sentiment']] = sentiment_fingerprint
+     elif config['enable_sentiment'] and snippet_sentiment is not None:
+         result.update({
+             'Sentiment_New': snippet_sentiment.get('sentiment', ''),
+             'Confidence_New': snippet_sentiment.get('confidence', ''),
+             'Reasoning_New': snippet_sentiment.get('reasoning', ''),
+             STAGE_FINGERPRINTS['sentiment']: self.sentiment_analyzer.analysis_fingerprint(
+                 analysis_text, config['sentiment_context']
+             )
+         })
+     elif config['enable_sentiment'] and config['sentiment_context']:
+         sentiment_fingerprint = self.sentiment_analyzer.analysis_fingerprint(analysis_text, config['sentiment_context'])
+         reused = self._reuse_stage(row, config, 'sentiment', sentiment_fingerprint)
+         if reused:
+             result.update(reused)
+         elif analysis_text and len(analysis_text.strip()) > 5:
+             sentiment = self.sentiment_analyzer.analyze_sentiment(
+                 analysis_text, config['sentiment_context'], deadline
+             )
+             
+             if sentiment:
+                 result.update({
+                     'Sentiment_New': sentiment.get('sentiment', ''),
+                     'Confidence_New': sentiment.get('confidence', ''),
+                     'Reasoning_New': sentiment.get('reasoning', ''),
+                     STAGE_FINGERPRINTS['sentiment']: sentiment_fingerprint
+                 })
              else:
                  result.update({
-                     'Sentiment_New': 'Artikel tidak dapat dibuka',
+                     'Sentiment_New': 'Gagal analisis',
                      'Confidence_New': '',
-                     'Reasoning_New': 'Tidak ada konten yang cukup untuk analisis'
+                     'Reasoning_New': 'Error dalam analisis AI'
                  })
-         
-         # 4. Summarize (if enabled)
-         if config['enable_summarize']:
-             if analysis_text and len(analysis_text.strip()) > 50:
-                 summary = self.summarizer.summarize_article(
-                     analysis_text, config['summarize_config']
-                 )
-                 
-                 if summary:
-                     result['Summary_New'] = summary.get('summary', '')
-                 else:
-                     result['Summary_New'] = 'Gagal membuat ringkasan'
+         else:
+             result.update({
+                 'Sentiment_New': 'Artikel tidak dapat dibuka',
+                 'Confidence_New': '',
+                 'Reasoning_New': 'Tidak ada konten yang cukup untuk analisis'
+             })
+     
+     # 4. Summarize (if enabled)
+     if config['enable_summarize'] and snippet_sentiment is not None:
+         # Tiered mode only settles sentiment from the snippet; a snippet summary would pass for the article's
+         result['Summary_New'] = 'Tidak diringkas (mode snippet)'
+     elif config['enable_summarize']:
+         summary_fingerprint = self.summarizer.analysis_fingerprint(analysis_text, config['summarize_config'])
+         reused = self._reuse_stage(row, config, 'summary', summary_fingerprint)
+         if reused:
+             result.update(reused)
+         elif analysis_text and len(analysis_text.strip()) > 50:
+             summary = self._summarize(analysis_text, config, live_view, deadline)
+             
+             if summary:
+                 result['Summary_New'] = summary.get('summary', '')
+                 result[STAGE_FINGERPRINTS['summary']] = summary_fingerprint
              else:
-                 result['Summary_New'] = 'Konten terlalu pendek untuk diringkas'
-         
-         results.append(result)
-         progress_bar.progress((i + 1) / total_rows)
+                 result['Summary_New'] = 'Gagal membuat ringkasan'
+         else:
+             result['Summary_New'] = 'Konten terlalu pendek untuk diringkas'
      
-     status_text.text("Analisis selesai!")
-     return pd.DataFrame(results)
+     return result
+ 
+ def _analyze_entity_sentiment(self, text: str, config: Dict, deadline: Deadline, suffix: str = '') -> Tuple[Dict, bool]:
+     """One column group per entity from a single analysis of the article; also reports whether all entities succeeded"""
+     entities = config['sentiment_entities']
+     has_text = bool(text and len(text.strip()) > 5)
+     sentiments = {}
+     if has_text:
+         sentiments = self.sentiment_analyzer.analyze_entities(text, config['sentiment_context'] or '', entities, deadline)
+     
+     columns = {}
+     for entity in entities:
+         sentiment = sentiments.get(entity)
+         if sentiment:
+             values = (sentiment.get('sentiment', ''), sentiment.get('confidence', ''), sentiment.get('reasoning', ''))
+         elif has_text:
+             values = ('Gagal analisis', '', 'Error dalam analisis AI')
+         else:
+             values = ('Artikel tidak dapat dibuka', '', 'Tidak ada konten yang cukup untuk analisis')
+         columns.update(zip(entity_columns(entity, suffix), values))
+     return columns, has_text and all(sentiments.get(entity) for entity in entities)
+ 
+ def _snippet_tier(self, df: pd.DataFrame, column_mapping: Dict, config: Dict, status_text,
+                   deadline: Deadline) -> Optional[Dict]:
+     """First tier of tiered mode: batched sentiment on snippets before any page is fetched.
+     
+     Returns row indexes whose snippet result is confident enough ('accepted', with the result)
+     and rows the URL-only filter already rules out ('filtered', with the reason); every other
+     row escalates to scraping and full-text analysis. None when tiered mode is off.
+     """
+     snippet_column = column_mapping.get('snippet_column')
+     # Without scraping an escalated row would only see the same snippet again
+     if not (config.get('snippet_first') and snippet_column and config['enable_scraping'] and config['enable_sentiment']
+             and config['sentiment_context'] and not config.get('sentiment_entities')):
+         return None
+     
+     tier = {'accepted': {}, 'filtered': {}}
+     urls = df[column_mapping['url_column']].fillna('').astype(str).tolist()
+     snippets = df[snippet_column].fillna('').astype(str).tolist()
+     candidates = []
+     for idx, (url, snippet) in enumerate(zip(urls, snippets)):
+         reason = self.row_filter.check_url(url) if self.row_filter and url else None
+         if reason:
+             tier['filtered'][idx] = reason
+         elif len(snippet.strip()) > 20:
+             candidates.append(idx)
+     
+     chunks = [candidates[start:start + SNIPPET_BATCH_SIZE] for start in range(0, len(candidates), SNIPPET_BATCH_SIZE)]
+     
+     def analyze_chunk(n: int, chunk: List[int]) -> List[Optional[Dict]]:
+         status_text.text(f"🪜 Tahap 1: sentimen dari snippet ({n * SNIPPET_BATCH_SIZE}/{len(candidates)} baris)...")
+         try:
+             return self.sentiment_analyzer.analyze_batch(
+                 [snippets[idx] for idx in chunk], config['sentiment_context'],
+                 Deadline(config.get('url_budget'), parent=deadline)
+             )
+         except DeadlineExceeded:
+             return [None] * len(chunk)
+     
+     min_confidence = config.get('min_snippet_confidence', 'sedang')
+     for chunk, sentiments in zip(chunks, self._map_rows(analyze_chunk, chunks, config.get('max_workers', 1))):
+         for idx, sentiment in zip(chunk, sentiments):
+             if self._snippet_confident(sentiment, min_confidence):
+                 tier['accepted'][idx] = sentiment
+     
+     perf.incr('tier.snippet', len(tier['accepted']))
+     perf.incr('tier.escalated', len(df) - len(tier['accepted']) - len(tier['filtered']))
+     return tier
+ 
+ @staticmethod
+ def _snippet_confident(sentiment: Optional[Dict], min_confidence: str) -> bool:
+     """Whether a snippet result can stand; 'tidak terkait' on a snippet needs high confidence"""
+     if not sentiment or sentiment.get('confidence') not in CONFIDENCE_LEVELS:
+         return False
+     required = 'tinggi' if sentiment.get('sentiment') == 'tidak terkait' else min_confidence
+     return CONFIDENCE_LEVELS.index(sentiment['confidence']) >= CONFIDENCE_LEVELS.index(required)
+ 
+ def _filter_before_fetch(self, url: str, deadline: Deadline) -> Optional[str]:
+     """Reason to skip a URL from its domain, URL date/ID or news-sitemap date, before any page request"""
+     if self.row_filter is None or not isinstance(url, str) or not url:
+         return None
+     reason = self.row_filter.check_url(url)
+     if reason or not (self.row_filter.since or self.row_filter.until):
+         return reason
+     entry = self.scraper.sitemap_metadata(url, deadline)
+     return self.row_filter.check_date(entry['publication_date'], 'sitemap') if entry else None
+ 
+ def _filter_after_fetch(self, url: str, publish_date: str, text: str) -> Optional[str]:
+     """Reason to skip the model stages from the scraped publish date or the article's language"""
+     if url and publish_date:
+         self.article_id_dates.learn(url, publish_date)
+     if self.row_filter is None:
+         return None
+     return self.row_filter.check_date(publish_date, 'publish_date') or self.row_filter.check_text(text)
+ 
+ def _drop_filtered_rows(self, df: pd.DataFrame, column_mapping: Dict) -> pd.DataFrame:
+     """Remove rows whose URL alone rules them out (domain lists, date or ID in the URL)"""
+     urls = df[column_mapping['url_column']].fillna('').astype(str)
+     keep = urls.map(lambda url: not (url and self.row_filter.check_url(url)))
+     if not keep.all():
+         st.info(f"🔎 {int((~keep).sum())} baris dibuang filter awal (domain/tanggal di URL)")
+     # The index keeps the rows' positions in the upload; distributed results are joined on it
+     return df[keep.values]
+ 
+ def _reuse_stage(self, row: Dict, config: Dict, stage: str, stage_fingerprint: str,
+                  columns: Optional[List[str]] = None) -> Optional[Dict]:
+     """Previous outputs of `stage` for this row if they were computed from the same inputs"""
+     if not config.get('incremental') or row.get(STAGE_FINGERPRINTS[stage]) != stage_fingerprint:
+         return None
+     
+     perf.incr(f"incremental.{stage}.reused")
+     reused = {STAGE_FINGERPRINTS[stage]: stage_fingerprint}
+     for column in columns or STAGE_COLUMNS[stage]:
+         value = row.get(column)
+         reused[column] = None if value is None or pd.isna(value) else value
+     return reused
+ 
+ def _text_columns(self, config: Dict) -> List[str]:
+     # Per-entity reasoning is long text too
+     reasoning = [entity_columns(entity, suffix)[2]
+                  for entity in config.get('sentiment_entities') or [] for suffix in ('', '_New')]
+     return list(TEXT_COLUMNS) + reasoning
+ 
+ def _map_rows(self, work: Callable[[int, object], Dict], items: Iterable, max_workers: int) -> Iterator[Dict]:
+     """Run `work(i, item)` for every item on up to `max_workers` threads, yielding results in input order.
+     
+     Only a window of rows is in flight, so results stream out as soon as the earliest row is done.
+     How many requests actually hit one news host or the LLM at once is decided by the adaptive limiter.
+     """
+     if max_workers <= 1:
+         for i, item in enumerate(items):
+             yield work(i, item)
+         return
+     
+     # Worker threads may update the status/live placeholders of this script run
+     script_ctx = get_script_run_ctx()
+     def attach_context():
+         if script_ctx is not None:
+             add_script_run_ctx(threading.current_thread(), script_ctx)
+     
+     with ThreadPoolExecutor(max_workers, thread_name_prefix='row', initializer=attach_context) as executor:
+         pending = deque()
+         for i, item in enumerate(items):
+             # A fresh copy per row, so the run's perf recorder reaches every worker thread
+             pending.append(executor.submit(contextvars.copy_context().run, work, i, item))
+             if len(pending) >= max_workers * 2:
+                 yield pending.popleft().result()
+         while pending:
+             yield pending.popleft().result()
+ 
+ def _batch_deadline(self, config: Dict) -> Deadline:
+     # Shards of a distributed job share the job's deadline (wall clock, as they may run on other hosts)
+     deadline_at = config.get('batch_deadline_at')
+     if deadline_at:
+         remaining = deadline_at - time.time()
+         # Deadline(0) would mean no deadline; a negative budget is already expired
+         return Deadline(remaining if remaining > 0 else -1)
+     minutes = config.get('batch_deadline_minutes') or 0
+     return Deadline(minutes * 60 if minutes else None)
+ 
+ def _run_with_deadline(self, work, fallback: Dict, status_column: str, deadline: Deadline,
+                        defer_open: bool = False) -> Dict:
+     """Run one row's work within `deadline`.
+     
+     Rows that run out of time are marked 'timeout' for a later retry; rows whose domain has an
+     open circuit are marked 'deferred' (first pass) or 'circuit_open' and get `fallback` values.
+     """
+     status = 'timeout'
+     if deadline.expired():
+         # Batch deadline already passed: skip the work entirely
+         result = dict(fallback)
+     else:
+         try:
+             result = work(deadline)
+             result.setdefault(status_column, 'ok')
+             return result
+         except DeadlineExceeded:
+             result = dict(fallback)
+         except CircuitOpen:
+             result = dict(fallback)
+             status = 'deferred' if defer_open else 'circuit_open'
+     
+     perf.incr(f"row.{status}")
+     result[status_column] = status
+     if 'Title' in result:
+         result['Title'] = ROW_STATUS_TITLES[status]
+     return result
+ 
+ def retry_timeouts(self, results: ResultStore, config: Dict, is_excel_data: bool) -> int:
+     """Re-run rows marked 'timeout' in place with a fresh per-URL budget"""
+     rerun = self._rerun_rows(results, config, is_excel_data, 'timeout', "🔁 Mengulang baris")
+     self.scraper.save_state()
+     self.article_id_dates.save()
+     return rerun
+ 
+ def _rerun_rows(self, results: ResultStore, config: Dict, is_excel_data: bool, status: str, message: str,
+                 parent: Optional[Deadline] = None) -> int:
+     """Re-run rows with the given status in place, each with a fresh per-URL budget"""
+     status_column = 'Status_New' if is_excel_data else 'Status'
+     if status_column not in results.columns:
+         return 0
+     
+     rows = [idx for idx, row_status in enumerate(results.column(status_column)) if row_status == status]
+     status_text = st.empty()
+     for n, idx in enumerate(rows):
+         set_correlation_id(f"{status}{idx+1}")
+         status_text.text(f"{message} {idx+1} ({n+1}/{len(rows)})...")
+         deadline = Deadline(config.get('url_budget'), parent=parent)
+         if is_excel_data:
+             row = results.base.iloc[idx].to_dict()
+             result = self._run_with_deadline(
+                 lambda d: self._analyze_excel_row(row, config['column_mapping'], config, status_text, None, d, str(idx+1)),
+                 {}, status_column, deadline
+             )
+         else:
+             url = results.column('URL').iloc[idx]
+             result = self._run_with_deadline(
+                 lambda d: self._analyze_manual_url(url, config, status_text, None, d),
+                 {'URL': url, 'Title': ''}, status_column, deadline
+             )
+         results.update_row(idx, result)
+     
+     status_text.empty()
+     return len(rows)
+ 
+ def _create_live_view(self, config: Dict) -> Optional[Dict]:
+     """Placeholders for the live results table and the streaming summary"""
+     self.run_metrics = {}
+     if not config.get('live_results'):
+         return None
+     
+     st.subheader("⚡ Hasil Live")
+     return {
+         'summary': st.empty(),
+         'table': st.empty()
+     }
+ 
+ def _update_live_view(self, live_view: Optional[Dict], results: ResultStore, run_started: float):
+     if len(results) == 1:
+         self.run_metrics['time_to_first_result'] = time.perf_counter() - run_started
+     self.run_metrics['total_time'] = time.perf_counter() - run_started
+     
+     if not live_view:
+         return
+     
+     # Only the latest rows are pushed to the browser, with texts truncated
+     live_view['table'].dataframe(results.preview_frame(start=-LIVE_TABLE_ROWS), use_container_width=True)
+     live_view['summary'].empty()
+ 
+ def _summarize(self, content: str, config: Dict, live_view: Optional[Dict],
+                deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
+     if not live_view:
+         return self.summarizer.summarize_article(content, config['summarize_config'], deadline)
+     
+     return self.summarizer.summarize_article_stream(
+         content,
+         config['summarize_config'],
+         on_chunk=lambda partial: live_view['summary'].markdown(f"📝 *{partial}*"),
+         deadline=deadline
+     )
  
- def display_results(self, results, config: Dict, is_excel_data: bool = False):
-     if isinstance(results, pd.DataFrame):
-         df = results
-         success_count = len(df)
+ def _result_metrics(self, results: ResultStore, is_excel_data: bool, run_id: str) -> Dict:
+     """Summary counts of a result set, computed once per run and result version (not on every rerun)"""
+     key = (run_id, id(results), results.version)
+     cached = st.session_state.get('result_metrics')
+     if cached and cached['key'] == key:
+         return cached['metrics']
+     
+     columns = results.columns
+     metrics = {'total': len(results), 'timeout_count': 0, 'circuit_open_count': 0, 'filtered_count': 0,
+                'method_counts': {}, 'summary_count': None, 'tier_counts': {}}
+     
+     status_column = 'Status_New' if is_excel_data else 'Status'
+     if status_column in columns:
+         statuses = results.column(status_column)
+         metrics['timeout_count'] = int((statuses == 'timeout').sum())
+         metrics['circuit_open_count'] = int((statuses == 'circuit_open').sum())
+         metrics['filtered_count'] = int((statuses == 'filtered').sum())
+     
+     if is_excel_data:
+         metrics['success_count'] = len(results)
      else:
-         if not results:
-             return
-         df = pd.DataFrame(results)
-         success_count = len([r for r in results if r.get('Content', '') != ''])
+         metrics['success_count'] = int((results.text_lengths('Content') > 0).sum()) if 'Content' in columns else 0
+     
+     if 'Tier_New' in columns:
+         metrics['tier_counts'] = {str(tier): int(count) for tier, count in results.column('Tier_New').value_counts().items()}
+     
+     method_col = 'Scraping_Method_New' if 'Scraping_Method_New' in columns else 'Scraping_Method'
+     if method_col in columns:
+         metrics['method_counts'] = {
+             str(method): int(count) for method, count in results.column(method_col).value_counts().items()
+         }
+     
+     summary_cols = [col for col in columns if 'summary' in col.lower()]
+     if summary_cols:
+         metrics['summary_count'] = int((results.text_lengths(summary_cols[0]) > 10).sum())
+     
+     st.session_state['result_metrics'] = {'key': key, 'metrics': metrics}
+     return metrics
+ 
+ def display_results(self, results: ResultStore, config: Dict, is_excel_data: bool = False, run_id: str = ''):
+     if not len(results):
+         return
+     
+     metrics = self._result_metrics(results, is_excel_data, run_id)
+     
+     # Rows that ran out of time can be re-run in place
+     timeout_count = metrics['timeout_count']
+     if timeout_count:
+         st.warning(f"⏳ {timeout_count} baris melewati batas waktu (status 'timeout')")
+         if st.button(f"🔁 Ulangi baris timeout ({timeout_count})"):
+             self._prepare_run(config)
+             # Own recorder, so the retry doesn't record into a run of another session
+             with recording(PerfRecorder()), st.spinner("Mengulang baris timeout..."):
+                 self.retry_timeouts(results, config, is_excel_data)
+             st.rerun()
+     
+     if metrics['circuit_open_count']:
+         st.warning(
+             f"🔌 {metrics['circuit_open_count']} baris dilewati karena situsnya terus gagal diakses "
+             f"(status 'circuit_open'). Lihat 'Circuit Breaker per Domain' di panel performa."
+         )
+     if metrics['tier_counts']:
+         st.info(
+             f"🪜 Mode bertingkat: {metrics['tier_counts'].get('snippet', 0)} baris cukup dari snippet, "
+             f"{metrics['tier_counts'].get('full', 0)} dianalisis dari teks lengkap"
+         )
+     if metrics['filtered_count']:
+         st.info(
+             f"🔎 {metrics['filtered_count']} baris disaring filter awal (status 'filtered', alasan di kolom Filter) "
+             f"dan tidak dianalisis AI"
+         )
+     
+     columns = results.columns
+     success_count = metrics['success_count']
+     method_counts = metrics['method_counts']
      
      # Display summary with method statistics
      col1, col2, col3, col4 = st.columns(4)
      with col1:
-         st.metric("Total Data", len(df))
+         st.metric("Total Data", len(results))
      with col2:
          st.metric("Berhasil", success_count)
      with col3:
          if not is_excel_data:
-             st.metric("Gagal", len(df) - success_count)
+             st.metric("Gagal", len(results) - success_count)
          else:
              # Show scraping method distribution for Excel data
-             method_col = 'Scraping_Method_New' if 'Scraping_Method_New' in df.columns else 'Scraping_Method'
-             if method_col in df.columns:
-                 newspaper_count = len(df[df[method_col] == 'newspaper3k'])
-                 st.metric("Newspaper3k", newspaper_count)
+             if method_counts:
+                 st.metric("Newspaper3k", method_counts.get('newspaper3k', 0))
      with col4:
          if config.get('enable_summarize'):
-             summary_cols = [col for col in df.columns if 'summary' in col.lower()]
-             if summary_cols:
-                 summary_count = len(df[df[summary_cols[0]].str.len() > 10])
-                 st.metric("Summary Berhasil", summary_count)
+             if metrics['summary_count'] is not None:
+                 st.metric("Summary Berhasil", metrics['summary_count'])
          else:
              # Show requests method count
-             method_col = 'Scraping_Method_New' if 'Scraping_Method_New' in df.columns else 'Scraping_Method'
-             if method_col in df.columns:
-                 requests_count = len(df[df[method_col].str.contains('requests', na=False)])
-                 if requests_count > 0:
-                     st.metric("Requests Fallback", requests_count)
+             requests_count = sum(count for method, count in method_counts.items() if 'requests' in method)
+             if requests_count > 0:
+                 st.metric("Requests Fallback", requests_count)
      
      # Show method distribution
-     method_col = 'Scraping_Method_New' if 'Scraping_Method_New' in df.columns else 'Scraping_Method'
-     if method_col in df.columns and config.get('enable_scraping'):
-         method_counts = df[method_col].value_counts()
-         if len(method_counts) > 0:
-             method_info = []
-             for method, count in method_counts.items():
-                 method_info.append(f"{method.title()}: {count}")
-             st.info(f"📊 **Metode Scraping:** {' | '.join(method_info)}")
+     if method_counts and config.get('enable_scraping'):
+         method_info = []
+         for method, count in method_counts.items():
+             method_info.append(f"{method.title()}: {count}")
+         st.info(f"📊 **Metode Scraping:** {' | '.join(method_info)}")
      
      # Display enabled features summary
      enabled_features = []
@@ -471,23 +1300,37 @@ class NewsAnalyzerApp:
      
      st.info(f"**Fungsi yang digunakan:** {' | '.join(enabled_features)}")
      
+     if 'time_to_first_result' in self.run_metrics:
+         st.caption(
+             f"⏱️ Hasil pertama: {self.run_metrics['time_to_first_result']:.1f} detik | "
+             f"Total: {self.run_metrics['total_time']:.1f} detik"
+         )
+     
+     # Parse failure counters for the AI stages
+     parse_stats = self.run_metrics.get('parse_stats', {})
+     if config.get('enable_sentiment') and 'sentiment' in parse_stats:
+         stats = parse_stats['sentiment']
+         st.caption(f"🧾 Parse sentimen: OK {stats['ok']} | Diperbaiki {stats['repaired']} | Retry {stats['retried']} | Gagal {stats['failed']}")
+     if config.get('enable_summarize') and 'summary' in parse_stats:
+         stats = parse_stats['summary']
+         st.caption(f"🧾 Respons ringkasan: OK {stats['ok']} | Retry {stats['retried']} | Gagal {stats['failed']}")
+     
+     self.display_performance_panel()
+     
      # Export section - Simple and direct
      if success_count > 0:
          st.subheader("📤 Export Data")
          
-         # Create export dataframe with all columns
-         export_df = df.copy()
-         
          # Show info about what will be exported
-         st.info(f"💡 File Excel akan berisi **{len(export_df.columns)} kolom** dan **{len(export_df)} baris** data lengkap.")
+         st.info(f"💡 File export akan berisi **{len(columns)} kolom** dan **{len(results)} baris** data lengkap.")
          
          # Show column preview
          with st.expander("📋 Preview Kolom yang Akan Diexport"):
              col_preview1, col_preview2 = st.columns(2)
              
              # Separate original and new columns for display
-             original_columns = [col for col in df.columns if not col.endswith('_New')]
-             new_columns = [col for col in df.columns if col.endswith('_New')]
+             original_columns = [col for col in columns if not col.endswith('_New')]
+             new_columns = [col for col in columns if col.endswith('_New')]
              
              with col_preview1:
                  if original_columns:
@@ -501,13 +1344,25 @@ class NewsAnalyzerApp:
                      for i, col in enumerate(new_columns, 1):
                          st.write(f"{i}. {col}")
          
-         # Create Excel file
-         excel_buffer = BytesIO()
-         export_df.to_excel(excel_buffer, index=False, engine='openpyxl')
-         excel_buffer.seek(0)
+         # Export files are generated in the background and cached per run/format
+         export_col1, export_col2 = st.columns(2)
+         with export_col1:
+             format_options = {info['label']: fmt for fmt, info in EXPORT_FORMATS.items()}
+             export_label = st.selectbox(
+                 "Format Export",
+                 list(format_options.keys()),
+                 help="Parquet dan CSV (gzip) jauh lebih cepat dan kecil untuk data besar"
+             )
+             export_format = format_options[export_label]
+         with export_col2:
+             split_texts = st.checkbox(
+                 "Pisahkan teks artikel ke file terpisah",
+                 value=False,
+                 help="Kolom teks panjang disimpan di file .jsonl.gz terpisah (menghindari batas 32.767 karakter per sel Excel)"
+             )
+         export_slot = st.container()
          
          # Generate filename
-         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
          data_type = "excel" if is_excel_data else "manual"
          features_suffix = "_".join([
              "fullteks" if config.get('enable_scraping') else "",
@@ -516,32 +1371,144 @@ class NewsAnalyzerApp:
              "summarize" if config.get('enable_summarize') else ""
          ]).strip("_")
          
-         filename = f"news_analysis_{data_type}_{features_suffix}_{timestamp}.xlsx"
-         
-         # Download button
-         st.download_button(
-             label="📥 Download Excel Lengkap",
-             data=excel_buffer.getvalue(),
-             file_name=filename,
-             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-             use_container_width=True
+         filename_base = f"news_analysis_{data_type}_{features_suffix}_{run_id}"
+         export_job = get_export_manager().request(
+             (run_id, id(results), results.version, export_format, split_texts), results, export_format, split_texts
          )
      
      # Display results table with truncated content
      st.subheader("📋 Preview Hasil")
      
-     # Create display dataframe with truncated content
-     df_display = df.copy()
-     text_columns = ['Content', 'Content_New', 'Summary', 'Summary_New', 'Reasoning', 'Reasoning_New']
+     # Only the visible page is built and sent to the browser, from truncated views of the text store
+     page_col1, page_col2 = st.columns(2)
+     with page_col1:
+         page_size = st.selectbox("Baris per halaman", PREVIEW_PAGE_SIZES, index=1)
+     page_count = max(1, -(-len(results) // page_size))
+     with page_col2:
+         page = st.number_input(f"Halaman (dari {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+     start = (int(page) - 1) * page_size
+     page_frame = results.preview_frame(width=100, start=start, stop=start + page_size)
+     page_frame.index = range(start, start + len(page_frame))
+     st.dataframe(page_frame, use_container_width=True)
+     st.caption(f"Baris {start + 1}–{start + len(page_frame)} dari {len(results)}. 💡 Tabel di atas menampilkan preview dengan teks terpotong. File Excel yang didownload berisi data lengkap.")
      
-     for col in text_columns:
-         if col in df_display.columns:
-             df_display[col] = df_display[col].astype(str).apply(
-                 lambda x: x[:100] + "..." if len(str(x)) > 100 else x
-             )
+     # Fill in the download buttons once the background export is ready
+     if success_count > 0:
+         with export_slot:
+             try:
+                 with st.spinner("Menyiapkan file export..."):
+                     export_files = export_job.result()
+             except Exception as e:
+                 # Only this format is unavailable; the rest of the page and the other formats still work
+                 logger.exception("Export to %s failed", export_format)
+                 st.button(
+                     f"📥 Download {EXPORT_FORMATS[export_format]['label']}",
+                     disabled=True, use_container_width=True, key=f"download_{export_format}_failed"
+                 )
+                 st.warning(f"⚠️ Export {EXPORT_FORMATS[export_format]['label']} gagal: {str(e)[:200]}. Silakan pilih format lain.")
+                 export_files = []
+             for export_file in export_files:
+                 is_text_file = export_file.suffix.startswith('_texts')
+                 st.download_button(
+                     label="📥 Download Teks Artikel" if is_text_file else f"📥 Download {EXPORT_FORMATS[export_format]['label']}",
+                     data=export_file.data,
+                     file_name=filename_base + export_file.suffix,
+                     mime=export_file.mime,
+                     use_container_width=True,
+                     key=f"download_{export_format}_{export_file.suffix}"
+                 )
+ 
+ def display_performance_panel(self):
+     """Per-stage timing, per-domain/method breakdown and LLM usage of the last run"""
+     report = self.run_metrics.get('perf_report')
+     if not report or not report['stages']:
+         return
      
-     st.dataframe(df_display, use_container_width=True)
-     st.caption("💡 Tabel di atas menampilkan preview dengan teks terpotong. File Excel yang didownload berisi data lengkap.")
+     with st.expander("📈 Performa Proses"):
+         stage_df = pd.DataFrame.from_dict(report['stages'], orient='index')
+         st.write("**⏱️ Waktu per Tahap (detik)**")
+         st.dataframe(stage_df, use_container_width=True)
+         
+         if report['methods']:
+             st.write("**🔧 Per Metode Scraping**")
+             st.dataframe(pd.DataFrame(report['methods']), use_container_width=True)
+         
+         if report['domains']:
+             st.write("**🌐 Per Domain**")
+             domain_df = pd.DataFrame(report['domains']).sort_values('total', ascending=False)
+             st.dataframe(domain_df, use_container_width=True)
+         
+         if report['llm_tokens']:
+             token_info = [
+                 f"{stage}: {tokens['prompt']} input ({tokens.get('cached', 0)} cache) / {tokens['output']} output"
+                 for stage, tokens in report['llm_tokens'].items()
+             ]
+             st.info(f"🤖 **Token LLM:** {' | '.join(token_info)}")
+         
+         circuits = report.get('circuits')
+         if circuits:
+             st.write("**🔌 Circuit Breaker per Domain**")
+             st.dataframe(pd.DataFrame.from_dict(circuits, orient='index'), use_container_width=True)
+         
+         limits = self.scraper.limiter.snapshot()
+         if limits:
+             st.write("**🚦 Batas Konkurensi (adaptif)**")
+             st.dataframe(pd.DataFrame.from_dict(limits, orient='index'), use_container_width=True)
+         
+         if report['counters']:
+             st.write("**🔢 Counter**")
+             st.json(report['counters'])
+         
+         st.download_button(
+             label="📥 Download Laporan Performa (JSON)",
+             data=json.dumps(report, indent=2),
+             file_name=f"performance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+             mime="application/json"
+         )
+ 
+ def _load_upload(self, uploaded_file) -> pd.DataFrame:
+     """Parsed upload, memoized by content hash so reruns (sidebar changes, column mapping) don't re-read the file"""
+     key = (content_hash(uploaded_file.getbuffer()), uploaded_file.name)
+     cached = st.session_state.get('upload')
+     if cached and cached['key'] == key:
+         return cached['df']
+     
+     with st.spinner("Membaca file..."):
+         df = read_upload(uploaded_file.getvalue(), uploaded_file.name)
+     st.session_state['upload'] = {'key': key, 'df': df}
+     return df
+ 
+ def _processing_columns(self, df: pd.DataFrame, column_mapping: Dict) -> List[str]:
+     """Input columns read per row: URL, snippet, and earlier outputs/fingerprints for incremental mode"""
+     wanted = [column_mapping['url_column'], column_mapping.get('snippet_column')]
+     wanted += [column for column in df.columns if str(column).endswith('_New')]
+     return list(dict.fromkeys(column for column in wanted if column in df.columns))
+ 
+ def _incremental_input(self, df: pd.DataFrame, column_mapping: Dict) -> pd.DataFrame:
+     """The uploaded sheet with this session's previous results of unchanged rows, so their columns can be reused"""
+     last_run = st.session_state.get('last_run')
+     if not last_run or not last_run['is_excel_data']:
+         return df
+     return carry_over_outputs(df, last_run['results'], column_mapping['url_column'])
+ 
+ def _prepare_run(self, config: Dict):
+     # Consult the shared store before scraping or calling the model
+     store = get_article_store() if config.get('use_article_store', True) else None
+     self.scraper.article_store = store
+     self.sentiment_analyzer.store = store
+     self.summarizer.store = store
+     self.journalist_detector.store = store
+     self.journalist_detector.breaker = self.scraper.breaker
+     self.journalist_detector.scraper = self.scraper
+     self.sentiment_analyzer.limiter = self.scraper.limiter
+     self.summarizer.limiter = self.scraper.limiter
+     self.sentiment_analyzer.set_backend(config.get('sentiment_backend', 'gemini'))
+     self.row_filter = RowFilter.from_config(config.get('prefilter'), self.article_id_dates)
+     self.scraper.browser_fallback = config.get('browser_fallback', False)
+     self.scraper.respect_robots = config.get('respect_robots', True)
+     self.scraper.max_bytes = int(config.get('max_page_mb', 3) * 1024 * 1024)
+     self.scraper.use_sitemaps = config.get('use_sitemaps', True)
+     configure_logging(config.get('log_level', 'WARNING'))
  
  def validate_configuration(self, config: Dict, urls: List[str], uploaded_file=None) -> List[str]:
      warnings = []
@@ -549,17 +1516,18 @@ class NewsAnalyzerApp:
      if not any([config['enable_scraping'], config['enable_sentiment'], config['enable_journalist'], config['enable_summarize']]):
          warnings.append("⚠️ Pilih minimal satu fungsi untuk digunakan")
      
-     if not GEMINI_API_KEY and (config['enable_sentiment'] or config['enable_summarize']):
+     needs_gemini_sentiment = config['enable_sentiment'] and config.get('sentiment_backend', 'gemini') != 'lexicon'
+     if not GEMINI_API_KEY and (needs_gemini_sentiment or config['enable_summarize']):
          features = []
-         if config['enable_sentiment']:
+         if needs_gemini_sentiment:
              features.append("analisis sentimen")
          if config['enable_summarize']:
              features.append("summarize")
          warnings.append(f"⚠️ API Key Gemini belum dikonfigurasi untuk {' dan '.join(features)}")
      
      if config['enable_sentiment']:
-         if not config['sentiment_context']:
-             warnings.append("⚠️ Konteks sentimen diperlukan untuk analisis sentimen")
+         if not config['sentiment_context'] and not config.get('sentiment_entities'):
+             warnings.append("⚠️ Konteks sentimen atau daftar entitas diperlukan untuk analisis sentimen")
      
      if not uploaded_file and not urls:
          warnings.append("⚠️ Masukkan minimal satu URL atau upload file Excel")
@@ -598,14 +1566,14 @@ class NewsAnalyzerApp:
      
      else:  # Upload File Excel
          uploaded_file = st.file_uploader(
-             "Upload file Excel",
-             type=['xlsx', 'xls'],
-             help="File Excel harus memiliki kolom URL"
+             "Upload file Excel / CSV / Parquet",
+             type=UPLOAD_TYPES,
+             help="File harus memiliki kolom URL. File dibaca sekali; mengubah konfigurasi tidak membaca ulang file"
          )
          
          if uploaded_file:
              try:
-                 df = pd.read_excel(uploaded_file)
+                 df = self._load_upload(uploaded_file)
                  st.success(f"✅ Berhasil membaca {len(df)} baris data dari file")
                  
                  # Get column mapping
@@ -638,14 +1606,58 @@ class NewsAnalyzerApp:
      ):
          st.header("📊 Hasil Analisis")
          
-         with st.spinner("Memproses data... Mohon tunggu"):
+         self._prepare_run(config)
+         recorder = PerfRecorder()
+         
+         drop_filtered = self.row_filter is not None and config['prefilter'].get('drop')
+         with recording(recorder), st.spinner("Memproses data... Mohon tunggu"):
              if input_method == "URL Manual":
+                 if drop_filtered:
+                     urls, dropped = filter_urls(urls, self.row_filter)
+                     if dropped:
+                         st.info(f"🔎 {len(dropped)} URL dibuang filter awal (domain/tanggal di URL)")
                  results = self.process_urls_manual(urls, config)
-                 self.display_results(results, config, is_excel_data=False)
              else:
-                 results = self.process_excel_data(df, column_mapping, config)
-                 self.display_results(results, config, is_excel_data=True)
+                 # Kept with the run so timed-out rows can be retried later
+                 config['column_mapping'] = column_mapping
+                 if config.get('incremental'):
+                     df = self._incremental_input(df, column_mapping)
+                 if drop_filtered:
+                     df = self._drop_filtered_rows(df, column_mapping)
+                 if config.get('distributed'):
+                     results = self.process_distributed(df, column_mapping, config)
+                 else:
+                     results = self.process_excel_data(df, column_mapping, config)
+         
+         self.run_metrics['parse_stats'] = {
+             'sentiment': self.sentiment_analyzer.get_parse_stats(),
+             'summary': self.summarizer.get_parse_stats()
+         }
+         self.run_metrics['perf_report'] = recorder.report()
+         self.run_metrics['perf_report']['circuits'] = self.scraper.breaker.snapshot()
+         
+         # Keep the last run so reruns (e.g. download clicks) don't lose or recompute results
+         st.session_state['last_run'] = {
+             'run_id': datetime.now().strftime("%Y%m%d_%H%M%S"),
+             'results': results,
+             'config': config,
+             'is_excel_data': input_method != "URL Manual",
+             'run_metrics': self.run_metrics
+         }
+     elif 'last_run' in st.session_state:
+         st.header("📊 Hasil Analisis")
+     
+     last_run = st.session_state.get('last_run')
+     if last_run:
+         self.run_metrics = last_run['run_metrics']
+         self.display_results(
+             last_run['results'],
+             last_run['config'],
+             is_excel_data=last_run['is_excel_data'],
+             run_id=last_run['run_id']
+         )
 
 if __name__ == "__main__":
+ configure_logging()
  app = NewsAnalyzerApp()
  app.run()
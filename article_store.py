@@ -0,0 +1,232 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from domain_stats import CACHE_DIR, get_domain
+from log_setup import get_logger
+from perf_metrics import perf
+
+logger = get_logger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(CACHE_DIR, 'articles.db')
+
+# Query parameters that never change the article
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid', '_ga', 'ref_src')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    domain TEXT NOT NULL,
+    title TEXT,
+    content TEXT,
+    author TEXT,
+    publish_date TEXT,
+    method TEXT,
+    lastmod TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_domain ON articles(domain);
+CREATE INDEX IF NOT EXISTS idx_articles_publish_date ON articles(publish_date);
+CREATE INDEX IF NOT EXISTS idx_articles_accessed_at ON articles(accessed_at);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    kind TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (kind, fingerprint)
+);
+DROP INDEX IF EXISTS idx_analyses_url;
+CREATE INDEX IF NOT EXISTS idx_analyses_created_at ON analyses(created_at);
+"""
+
+ARTICLE_FIELDS = ('url', 'domain', 'title', 'content', 'author', 'publish_date', 'method', 'lastmod', 'fetched_at')
+
+
+def cached_analysis(store: Optional['ArticleStore'], kind: str, fingerprint: str,
+                    compute: Callable[[], Optional[object]], complete: Callable[[object], bool] = bool):
+    """Return the stored `kind` result for `fingerprint`, or compute it and store it when `complete`"""
+    if store is None:
+        return compute()
+    try:
+        stored = store.get_analysis(kind, fingerprint)
+    except sqlite3.Error as e:
+        logger.warning("Article store lookup failed: %s", e)
+        stored = None
+    if stored is not None:
+        perf.incr(f"{kind}.store_hit")
+        return stored
+
+    result = compute()
+    if result is not None and complete(result):
+        try:
+            store.put_analysis(kind, fingerprint, result)
+        except sqlite3.Error as e:
+            logger.warning("Could not store %s result: %s", kind, e)
+    return result
+
+
+def cached_analyses(store: Optional['ArticleStore'], kind: str, fingerprints: List[str],
+                    compute: Callable[[List[int]], List[Optional[object]]],
+                    complete: Callable[[object], bool] = bool) -> List[Optional[object]]:
+    """Batch form of cached_analysis: `compute` gets the indexes without a stored result and returns theirs in order"""
+    results: List[Optional[object]] = [None] * len(fingerprints)
+    missing = list(range(len(fingerprints)))
+    if store is not None:
+        missing = []
+        for idx, analysis_fingerprint in enumerate(fingerprints):
+            try:
+                stored = store.get_analysis(kind, analysis_fingerprint)
+            except sqlite3.Error as e:
+                logger.warning("Article store lookup failed: %s", e)
+                stored = None
+            if stored is not None:
+                perf.incr(f"{kind}.store_hit")
+                results[idx] = stored
+            else:
+                missing.append(idx)
+
+    if missing:
+        for idx, result in zip(missing, compute(missing)):
+            results[idx] = result
+            if store is not None and result is not None and complete(result):
+                try:
+                    store.put_analysis(kind, fingerprints[idx], result)
+                except sqlite3.Error as e:
+                    logger.warning("Could not store %s result: %s", kind, e)
+    return results
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so the same article maps to one key (case, fragment, tracking params, trailing slash)"""
+    parsed = urlparse(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parsed.path.rstrip('/') or '/'
+    return urlunparse((parsed.scheme.lower() or 'https', parsed.netloc.lower(), path, parsed.params, urlencode(query), ''))
+
+
+class ArticleStore:
+    """Article texts and analysis results shared by every session on this machine (SQLite).
+
+    Articles are keyed by canonical URL; analyses by kind and the fingerprint of their
+    inputs, so a result is only reused when content, context, prompt version and model match.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, retention_days: float = 30,
+                 max_articles: int = 50000, fresh_for: float = 24 * 3600):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_articles = max_articles
+        # Without a sitemap lastmod, stored articles younger than this are reused as-is
+        self.fresh_for = fresh_for
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets sessions read while another one writes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    # Articles
+
+    def get_article(self, url: str, lastmod: str = '') -> Optional[Dict]:
+        """Stored article if still valid: same sitemap lastmod, or fetched within `fresh_for` when there is none"""
+        key = canonical_url(url)
+        conn = self._connect()
+        row = conn.execute(f"SELECT {', '.join(ARTICLE_FIELDS)} FROM articles WHERE url = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if lastmod or row['lastmod']:
+            if lastmod != row['lastmod']:
+                return None
+        elif time.time() - row['fetched_at'] > self.fresh_for:
+            return None
+
+        with conn:
+            conn.execute("UPDATE articles SET accessed_at = ? WHERE url = ?", (time.time(), key))
+        return dict(row)
+
+    def put_article(self, url: str, data: Dict, lastmod: str = ''):
+        key = canonical_url(url)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO articles (url, domain, title, content, author, publish_date, method, "
+                "lastmod, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, get_domain(key), data.get('title', ''), data.get('content', ''), data.get('author', ''),
+                 data.get('publish_date', ''), data.get('method', ''), lastmod or '', now, now)
+            )
+
+    def find(self, domain: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+             limit: int = 100) -> List[Dict]:
+        """Look up stored articles by domain and/or publish date range (ISO strings), newest first"""
+        clauses, params = [], []
+        if domain:
+            clauses.append("domain = ?")
+            params.append(get_domain(domain if '//' in domain else f"//{domain}"))
+        if since:
+            clauses.append("publish_date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("publish_date < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connect().execute(
+            f"SELECT {', '.join(ARTICLE_FIELDS)} FROM articles {where} ORDER BY publish_date DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # Analyses
+
+    def get_analysis(self, kind: str, fingerprint: str) -> Optional[object]:
+        row = self._connect().execute(
+            "SELECT result FROM analyses WHERE kind = ? AND fingerprint = ?", (kind, fingerprint)
+        ).fetchone()
+        return json.loads(row['result']) if row else None
+
+    def put_analysis(self, kind: str, fingerprint: str, result: object):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (kind, fingerprint, result, created_at) VALUES (?, ?, ?, ?)",
+                (kind, fingerprint, json.dumps(result, ensure_ascii=False), time.time())
+            )
+
+    # Retention
+
+    def evict(self) -> int:
+        """Drop entries older than the retention period and the least recently used articles above the cap"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM articles WHERE accessed_at < ?", (cutoff,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM articles WHERE url IN (SELECT url FROM articles ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_articles,)
+            ).rowcount
+            conn.execute("DELETE FROM analyses WHERE created_at < ?", (cutoff,))
+        if removed:
+            logger.info("Evicted %d stored articles", removed)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        return {
+            'articles': conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0],
+            'analyses': conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        }
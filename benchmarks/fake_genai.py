@@ -0,0 +1,158 @@
+"""Deterministic stand-in for `google.generativeai` used by the offline benchmarks.
+
+Latency and error rate are configurable so the harness can model a slow or flaky API.
+Responses are derived from the prompt, so repeated runs produce identical output.
+"""
+import hashlib
+import json
+import re
+import sys
+import time
+import types
+from typing import Dict, Optional
+
+# Tunable by the benchmark runner
+settings = {
+    'latency': 0.05,        # seconds per call
+    'error_rate': 0.0,      # fraction of calls that raise
+    'chunk_words': 8        # words per streamed chunk
+}
+
+calls = {'count': 0, 'errors': 0}
+
+# System instructions seen so far: repeats are reported as cached prompt tokens, like Gemini's implicit caching
+_seen_instructions = set()
+
+
+def configure(api_key: Optional[str] = None, **kwargs):
+    pass
+
+
+class _Usage:
+    def __init__(self, prompt: str, output: str, cached: int = 0):
+        self.prompt_token_count = len(prompt.split())
+        self.candidates_token_count = len(output.split())
+        self.cached_content_token_count = cached
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt: str, cached: int = 0):
+        self.text = text
+        self.usage_metadata = _Usage(prompt, text, cached)
+
+
+class FakeStreamResponse:
+    def __init__(self, text: str, prompt: str, cached: int = 0):
+        self._text = text
+        self._prompt = prompt
+        self._cached = cached
+        self.usage_metadata = None
+
+    def __iter__(self):
+        words = self._text.split(' ')
+        step = settings['chunk_words']
+        for idx in range(0, len(words), step):
+            time.sleep(settings['latency'] / max(1, len(words) // step))
+            yield FakeResponse(' '.join(words[idx:idx + step]) + ' ', '')
+        self.usage_metadata = _Usage(self._prompt, self._text, self._cached)
+
+
+def _stable_fraction(prompt: str) -> float:
+    digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) / 0xFFFFFFFF
+
+
+def _sentiment_json(prompt: str) -> str:
+    fraction = _stable_fraction(prompt)
+    sentiment = 'positif' if fraction < 0.4 else 'negatif' if fraction < 0.7 else 'netral'
+    return json.dumps({
+        'sentiment': sentiment,
+        'confidence': 'tinggi' if fraction < 0.5 else 'sedang',
+        'reasoning': 'Respons deterministik dari fake backend benchmark'
+    })
+
+
+def _entity_json(prompt: str) -> str:
+    block = re.search(r'ENTITAS:\s*\n(.*?)\n\s*\n', prompt, re.DOTALL)
+    entities = re.findall(r'^\s*-\s*(.+?)\s*$', block.group(1), re.MULTILINE) if block else []
+    return json.dumps({'results': [
+        dict(json.loads(_sentiment_json(f"{entity}\n{prompt}")), entity=entity) for entity in entities
+    ]})
+
+
+def _batch_json(prompt: str, summaries: bool) -> str:
+    """One result per "ARTIKEL [n]" / "ARTICLE [n]" block of a batched prompt"""
+    parts = re.split(r'(?:ARTIKEL|ARTICLE) \[(\d+)\]:\s*\n', prompt)
+    results = []
+    for idx, text in zip(parts[1::2], parts[2::2]):
+        if summaries:
+            results.append({'index': int(idx), 'summary': ' '.join(text.split()[:60])})
+        else:
+            results.append(dict(json.loads(_sentiment_json(text)), index=int(idx)))
+    return json.dumps({'results': results})
+
+
+def _summary_text(prompt: str) -> str:
+    match = re.search(r'ARTICLE:\s*(.*)', prompt, re.DOTALL)
+    words = (match.group(1) if match else prompt).split()
+    return ' '.join(words[:60])
+
+
+class GenerativeModel:
+    def __init__(self, model_name: str = 'fake', system_instruction: Optional[str] = None,
+                 generation_config: Optional[Dict] = None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.generation_config = generation_config or {}
+
+    def generate_content(self, prompt, generation_config: Optional[Dict] = None,
+                         stream: bool = False, **kwargs):
+        calls['count'] += 1
+        prompt_text = prompt if isinstance(prompt, str) else json.dumps(prompt, default=str)
+        full_prompt = f"{self.system_instruction or ''}\n{prompt_text}"
+        cached = 0
+        if self.system_instruction:
+            if self.system_instruction in _seen_instructions:
+                cached = len(self.system_instruction.split())
+            _seen_instructions.add(self.system_instruction)
+
+        if _stable_fraction(f"{calls['count']}:{full_prompt}") < settings['error_rate']:
+            calls['errors'] += 1
+            time.sleep(settings['latency'] / 2)
+            raise RuntimeError("503 Service Unavailable (fake backend)")
+
+        config = {**self.generation_config, **(generation_config or {})}
+        if config.get('response_mime_type') == 'application/json':
+            schema = config.get('response_schema') or {}
+            item_fields = schema.get('properties', {}).get('results', {}).get('items', {}).get('properties', {})
+            if 'index' in item_fields:
+                text = _batch_json(prompt_text, 'summary' in item_fields)
+            elif 'results' in schema.get('properties', {}):
+                text = _entity_json(full_prompt)
+            else:
+                text = _sentiment_json(full_prompt)
+        else:
+            text = _summary_text(full_prompt)
+
+        if stream:
+            return FakeStreamResponse(text, full_prompt, cached)
+
+        time.sleep(settings['latency'])
+        return FakeResponse(text, full_prompt, cached)
+
+
+def install():
+    """Register this module as `google.generativeai` before the app modules import it"""
+    module = sys.modules[__name__]
+    google_pkg = sys.modules.get('google')
+    if google_pkg is None:
+        try:
+            import google as google_pkg
+        except ImportError:
+            google_pkg = types.ModuleType('google')
+            google_pkg.__path__ = []
+            sys.modules['google'] = google_pkg
+    google_pkg.generativeai = module
+    sys.modules['google.generativeai'] = module
+    return module
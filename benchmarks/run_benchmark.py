@@ -0,0 +1,203 @@
+"""Offline end-to-end benchmark of the NewsAnalyzerApp pipeline.
+
+Serves the recorded pages in benchmarks/corpus from a local HTTP server, swaps
+google.generativeai for a deterministic fake, and measures throughput, per-stage
+latency and peak memory at several batch sizes.
+
+Usage:
+    python benchmarks/run_benchmark.py --sizes 10 50 --llm-latency 0.05 --name local
+    python benchmarks/run_benchmark.py --compare benchmarks/baselines/local.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCH_DIR, 'corpus')
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_genai  # noqa: E402
+
+fake_genai.install()
+
+import pandas as pd  # noqa: E402
+
+from app import NewsAnalyzerApp  # noqa: E402
+from domain_stats import DomainStats  # noqa: E402
+from site_index import SiteIndex  # noqa: E402
+from adaptive_limiter import AdaptiveLimiter  # noqa: E402
+from prefilter import ArticleIdDates  # noqa: E402
+from perf_metrics import perf  # noqa: E402
+
+# Regressions beyond this ratio versus the baseline are reported
+REGRESSION_TOLERANCE = 0.2
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_corpus_server():
+    handler = partial(_QuietHandler, directory=CORPUS_DIR)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_input(base_url: str, size: int) -> pd.DataFrame:
+    pages = sorted(name for name in os.listdir(CORPUS_DIR) if name.endswith('.html'))
+    rows = []
+    for idx in range(size):
+        page = pages[idx % len(pages)]
+        rows.append({
+            'URL': f"{base_url}/{page}?row={idx}",
+            'Snippet': f"Snippet uji untuk {page}"
+        })
+    return pd.DataFrame(rows)
+
+
+def build_config(workers: int = 1) -> dict:
+    return {
+        'enable_scraping': True,
+        'enable_sentiment': True,
+        'enable_journalist': True,
+        'enable_summarize': True,
+        'sentiment_context': 'Toyota Avanza, suku bunga, ChatGPT',
+        'sentiment_backend': 'gemini',
+        'summarize_config': {
+            'summary_type': 'Ringkas',
+            'max_length': 100,
+            'language': 'Bahasa Indonesia',
+            'focus_aspect': ''
+        },
+        'scraping_timeout': 10,
+        'browser_fallback': False,
+        'max_workers': workers,
+        'live_results': False
+    }
+
+
+def make_app(stats_dir: str) -> NewsAnalyzerApp:
+    app = NewsAnalyzerApp()
+    app.sentiment_analyzer.set_api_key('fake-key')
+    app.summarizer.set_api_key('fake-key')
+    app.scraper.politeness_delay = (0.0, 0.0)
+    app.scraper.browser_fallback = False
+    app.scraper.domain_stats = DomainStats(path=os.path.join(stats_dir, 'domain_stats.json'))
+    app.scraper.site_index = SiteIndex(path=os.path.join(stats_dir, 'site_index.json'))
+    app.scraper.limiter = AdaptiveLimiter(path=os.path.join(stats_dir, 'concurrency_limits.json'))
+    app.article_id_dates = ArticleIdDates(path=os.path.join(stats_dir, 'article_id_dates.json'))
+    app.sentiment_analyzer.limiter = app.scraper.limiter
+    app.summarizer.limiter = app.scraper.limiter
+    return app
+
+
+def run_batch(app: NewsAnalyzerApp, df: pd.DataFrame, config: dict) -> dict:
+    perf.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    results = app.process_excel_data(df, {'url_column': 'URL', 'snippet_column': 'Snippet'}, config)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = perf.report()
+    return {
+        'rows': len(df),
+        'elapsed': round(elapsed, 3),
+        'rows_per_second': round(len(df) / elapsed, 3) if elapsed else 0.0,
+        'peak_memory_mb': round(peak / 1024 / 1024, 2),
+        'result_rows': len(results),
+        'stages': {name: {k: stats[k] for k in ('count', 'mean', 'p50', 'p90', 'p99')}
+                   for name, stats in report['stages'].items()},
+        'counters': report['counters']
+    }
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """Return human-readable regressions of `current` against `baseline`"""
+    regressions = []
+    baseline_runs = {run['rows']: run for run in baseline.get('runs', [])}
+    for run in current['runs']:
+        base = baseline_runs.get(run['rows'])
+        if not base:
+            continue
+        if run['rows_per_second'] < base['rows_per_second'] * (1 - REGRESSION_TOLERANCE):
+            regressions.append(
+                f"[{run['rows']} rows] throughput {run['rows_per_second']} < baseline {base['rows_per_second']}"
+            )
+        if run['peak_memory_mb'] > base['peak_memory_mb'] * (1 + REGRESSION_TOLERANCE):
+            regressions.append(
+                f"[{run['rows']} rows] peak memory {run['peak_memory_mb']} MB > baseline {base['peak_memory_mb']} MB"
+            )
+        for stage, stats in run['stages'].items():
+            base_stats = base['stages'].get(stage)
+            if base_stats and base_stats['p50'] and stats['p50'] > base_stats['p50'] * (1 + REGRESSION_TOLERANCE):
+                regressions.append(
+                    f"[{run['rows']} rows] stage '{stage}' p50 {stats['p50']}s > baseline {base_stats['p50']}s"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--llm-latency', type=float, default=0.05)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=1, help='Rows processed in parallel')
+    parser.add_argument('--name', default='local', help='Baseline file name under benchmarks/baselines')
+    parser.add_argument('--compare', help='Baseline JSON to compare against instead of overwriting')
+    args = parser.parse_args()
+
+    fake_genai.settings['latency'] = args.llm_latency
+    fake_genai.settings['error_rate'] = args.llm_error_rate
+
+    server = start_corpus_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    config = build_config(args.workers)
+
+    runs = []
+    with tempfile.TemporaryDirectory() as stats_dir:
+        for size in args.sizes:
+            app = make_app(stats_dir)
+            run = run_batch(app, build_input(base_url, size), config)
+            runs.append(run)
+            print(f"{size:>6} rows: {run['rows_per_second']:>8.2f} rows/s, "
+                  f"{run['elapsed']:>8.2f}s, peak {run['peak_memory_mb']:.1f} MB")
+    server.shutdown()
+
+    result = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'llm': {'latency': args.llm_latency, 'error_rate': args.llm_error_rate},
+        'workers': args.workers,
+        'runs': runs
+    }
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f))
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, f"{args.name}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Baseline written to {path}")
+
+
+if __name__ == '__main__':
+    main()
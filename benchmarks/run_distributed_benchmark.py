@@ -0,0 +1,99 @@
+"""Scaling benchmark for the sharded work queue (work_queue.py).
+
+Queues one batch of corpus rows, starts N worker processes (fake model backend, local
+corpus server) and measures rows per second until the merged result is complete, for
+several worker counts.
+
+Usage:
+    python benchmarks/run_distributed_benchmark.py --rows 120 --workers 1 2 4 --shard-size 10 --llm-latency 0.3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_genai  # noqa: E402
+from run_benchmark import build_config, build_input, make_app, start_corpus_server  # noqa: E402
+from work_queue import ShardWorker, WorkQueue, analyze_shard  # noqa: E402
+
+COLUMN_MAPPING = {'url_column': 'URL', 'snippet_column': 'Snippet'}
+
+
+def worker_main(queue_path: str, job_id: str, llm_latency: float):
+    fake_genai.settings['latency'] = llm_latency
+    with tempfile.TemporaryDirectory() as stats_dir:
+        app = make_app(stats_dir)
+        queue = WorkQueue(queue_path, lease_seconds=30)
+        ShardWorker(queue, lambda shard: analyze_shard(app, shard), poll_interval=0.2).run(job_id, stop_when_idle=True)
+
+
+def run_case(workers: int, rows: int, shard_size: int, threads: int, llm_latency: float,
+             base_url: str, work_dir: str) -> dict:
+    queue_path = os.path.join(work_dir, f"queue_{workers}.db")
+    queue = WorkQueue(queue_path)
+    config = {**build_config(threads), 'use_article_store': False, 'incremental': False}
+    df = build_input(base_url, rows)
+    job_id = queue.submit(df, COLUMN_MAPPING, config, shard_size)
+
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen(
+            [sys.executable, __file__, '--worker', queue_path, job_id, str(llm_latency)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.wait()
+    elapsed = time.perf_counter() - started
+
+    progress = queue.progress(job_id)
+    results = list(queue.results(job_id)) if queue.is_finished(job_id) else []
+    return {
+        'workers': workers,
+        'rows': rows,
+        'elapsed': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 3),
+        'shards_done': progress['done'],
+        'shards_failed': progress['failed'],
+        'merged_rows': len(results),
+        'ok_rows': sum(record.get('Status_New') == 'ok' for record in results)
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        worker_main(sys.argv[2], sys.argv[3], float(sys.argv[4]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=120)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--shard-size', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=1, help='Rows processed in parallel inside each worker')
+    parser.add_argument('--llm-latency', type=float, default=0.3, help='Seconds per fake model call')
+    args = parser.parse_args()
+
+    server = start_corpus_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    with tempfile.TemporaryDirectory() as work_dir:
+        runs = [run_case(workers, args.rows, args.shard_size, args.threads, args.llm_latency, base_url, work_dir)
+                for workers in args.workers]
+    server.shutdown()
+
+    print(json.dumps(runs, indent=2))
+    base = runs[0]['rows_per_second'] / runs[0]['workers']
+    for run in runs:
+        print(f"{run['workers']} worker(s): {run['rows_per_second']} rows/s "
+              f"({run['rows_per_second'] / (base * run['workers']):.0%} of linear)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Load test for service.py with the fake model backend.
+
+Starts the analysis service in-process (google.generativeai swapped for fake_genai, no
+article store, fresh concurrency limits), fires concurrent /sentiment and /summarize
+requests and reports throughput, latency and how many model calls were made, with and
+without micro-batching.
+
+Usage:
+    python benchmarks/run_service_benchmark.py --requests 64 --concurrency 16 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_genai  # noqa: E402
+
+fake_genai.install()
+
+from service import AnalysisService  # noqa: E402
+from adaptive_limiter import AdaptiveLimiter  # noqa: E402
+
+CONTEXT = 'Kinerja perusahaan teknologi'
+TEXTS = [
+    "Perusahaan mencatat pertumbuhan laba yang kuat dan ekspansi ke pasar baru tahun ini.",
+    "Investor khawatir setelah penjualan turun tajam dan beberapa proyek dibatalkan.",
+    "Manajemen mengumumkan rencana efisiensi tanpa perubahan target pendapatan.",
+    "Peluncuran produk baru mendapat sambutan positif dari konsumen dan analis."
+]
+
+
+async def _post(host: str, port: int, path: str, payload: dict) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+async def _load(port: int, requests: int, concurrency: int) -> list:
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(idx: int):
+        # Unique text per request so nothing is answered from a cache
+        content = f"{TEXTS[idx % len(TEXTS)]} Laporan nomor {idx}."
+        if idx % 2:
+            path, payload = '/summarize', {'content': content}
+        else:
+            path, payload = '/sentiment', {'content': content, 'context': CONTEXT}
+        async with gate:
+            started = time.perf_counter()
+            response = await _post('127.0.0.1', port, path, payload)
+            latencies.append(time.perf_counter() - started)
+        if 'result' not in response:
+            raise RuntimeError(f"{path} failed: {response}")
+
+    await asyncio.gather(*(one(idx) for idx in range(requests)))
+    return latencies
+
+
+async def run_case(max_batch: int, window_ms: float, requests: int, concurrency: int) -> dict:
+    service = AnalysisService(workers=concurrency, batch_window=window_ms / 1000, max_batch=max_batch,
+                              use_store=False)
+    service.sentiment_analyzer.set_api_key('benchmark')
+    service.summarizer.set_api_key('benchmark')
+    # Fresh limits, so the model endpoint's concurrency has to be earned in both cases
+    limiter = AdaptiveLimiter(path=os.path.join(tempfile.mkdtemp(), 'limits.json'))
+    service.scraper.limiter = service.sentiment_analyzer.limiter = service.summarizer.limiter = limiter
+
+    server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    calls_before = fake_genai.calls['count']
+    started = time.perf_counter()
+    async with server:
+        latencies = sorted(await _load(port, requests, concurrency))
+    elapsed = time.perf_counter() - started
+    service.executor.shutdown(wait=False)
+
+    return {
+        'max_batch': max_batch,
+        'requests': requests,
+        'elapsed': round(elapsed, 3),
+        'requests_per_sec': round(requests / elapsed, 2),
+        'p50': round(latencies[len(latencies) // 2], 3),
+        'p95': round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        'model_calls': fake_genai.calls['count'] - calls_before,
+        'batches': {'sentiment': dict(service.sentiment_batcher.stats),
+                    'summary': dict(service.summary_batcher.stats)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--llm-latency', type=float, default=0.2)
+    parser.add_argument('--window-ms', type=float, default=20)
+    parser.add_argument('--max-batch', type=int, default=8)
+    args = parser.parse_args()
+
+    fake_genai.settings['latency'] = args.llm_latency
+    results = [
+        asyncio.run(run_case(max_batch, args.window_ms, args.requests, args.concurrency))
+        for max_batch in (1, args.max_batch)
+    ]
+    print(json.dumps(results, indent=2))
+    speedup = results[1]['requests_per_sec'] / results[0]['requests_per_sec']
+    print(f"Micro-batching: {speedup:.2f}x throughput, "
+          f"{results[0]['model_calls']} -> {results[1]['model_calls']} model calls")
+
+
+if __name__ == '__main__':
+    main()
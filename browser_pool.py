@@ -0,0 +1,150 @@
+import asyncio
+import atexit
+import concurrent.futures
+import contextlib
+import threading
+from typing import Optional
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:  # Playwright is optional; the browser tier is disabled without it
+    async_playwright = None
+
+try:
+    from playwright_stealth import stealth_async
+except ImportError:
+    stealth_async = None
+
+# Resource types that are never needed to read article text
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet'}
+
+# Common ad/tracker hosts on Indonesian news sites
+BLOCKED_HOSTS = (
+    'doubleclick.net', 'googlesyndication.com', 'googletagmanager.com',
+    'google-analytics.com', 'adservice.google', 'facebook.net', 'scorecardresearch.com',
+    'criteo.', 'taboola.com', 'outbrain.com', 'amazon-adsystem.com', 'adnxs.com'
+)
+
+
+class BrowserPool:
+    """Pool of long-lived headless Chromium contexts, reused across URLs.
+
+    Playwright runs on its own event loop in a background thread so callers can use
+    the synchronous `render()` from any thread (including Streamlit script threads).
+    """
+
+    def __init__(self, pool_size: int = 2, max_pages_per_context: int = 50):
+        self.pool_size = pool_size
+        self.max_pages_per_context = max_pages_per_context
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._contexts = None
+        self._page_counts = {}
+        self._start_lock = threading.Lock()
+
+    @staticmethod
+    def is_available() -> bool:
+        return async_playwright is not None
+
+    def render(self, url: str, timeout: int = 30) -> Optional[str]:
+        """Render a page and return its HTML, or None if the browser tier is unavailable"""
+        if not self.is_available():
+            return None
+
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._render(url, timeout), self._loop)
+        try:
+            return future.result(timeout + 5)
+        except concurrent.futures.TimeoutError:
+            # Cancel the in-flight render; its page is closed and the context returned to the pool
+            future.cancel()
+            raise
+
+    def close(self):
+        if not self._loop:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        try:
+            future.result(15)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop = None
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='browser-pool', daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._startup(), loop).result(60)
+            except BaseException:
+                # Leave the pool unstarted (e.g. browsers not installed) so a later call retries
+                with contextlib.suppress(Exception):
+                    asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(15)
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(5)
+                if not thread.is_alive():
+                    loop.close()
+                self._playwright = self._browser = self._contexts = None
+                raise
+            # Only a started pool is published; render() and close() treat a set loop as ready
+            self._loop, self._thread = loop, thread
+            atexit.register(self.close)
+
+    async def _startup(self):
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._contexts = asyncio.Queue()
+        for _ in range(self.pool_size):
+            self._contexts.put_nowait(await self._new_context())
+
+    async def _shutdown(self):
+        while self._contexts and not self._contexts.empty():
+            await self._contexts.get_nowait().close()
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def _new_context(self):
+        context = await self._browser.new_context(
+            locale='id-ID',
+            java_script_enabled=True,
+            extra_http_headers={'Accept-Language': 'id-ID,id;q=0.9,en;q=0.8'}
+        )
+        await context.route('**/*', self._route)
+        self._page_counts[id(context)] = 0
+        return context
+
+    async def _route(self, route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in BLOCKED_HOSTS):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _render(self, url: str, timeout: int) -> Optional[str]:
+        # The queue size caps concurrency: callers wait for a free warm context
+        context = await self._contexts.get()
+        page = None
+        try:
+            page = await context.new_page()
+            if stealth_async:
+                await stealth_async(page)
+            await page.goto(url, wait_until='domcontentloaded', timeout=timeout * 1000)
+            return await page.content()
+        finally:
+            if page:
+                await page.close()
+            self._page_counts[id(context)] += 1
+            if self._page_counts[id(context)] >= self.max_pages_per_context:
+                # Recycle contexts periodically to bound memory growth
+                self._page_counts.pop(id(context), None)
+                await context.close()
+                context = await self._new_context()
+            self._contexts.put_nowait(context)
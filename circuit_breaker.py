@@ -0,0 +1,115 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from log_setup import get_logger
+from perf_metrics import perf
+
+logger = get_logger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(BaseException):
+    """Raised instead of requesting a domain whose circuit is open.
+
+    Derives from BaseException like DeadlineExceeded, so the scraper's broad fallbacks
+    don't turn it into an ordinary failure; the batch defers the row instead.
+    """
+
+    def __init__(self, domain: str):
+        super().__init__(f"Circuit open for {domain}")
+        self.domain = domain
+
+
+class CircuitBreaker:
+    """Per-domain circuit breaker for blocked or dead sites.
+
+    After `failure_threshold` consecutive failed URLs the domain's circuit opens and its
+    URLs are refused without any request. After `reset_after` seconds one probe URL is let
+    through (half-open): success closes the circuit, failure opens it for another period.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_after: float = 120):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._domains: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, domain: str) -> Dict:
+        return self._domains.setdefault(domain, {
+            'state': CLOSED, 'failures': 0, 'opened_at': 0.0, 'probing': False,
+            'trips': 0, 'rejected': 0
+        })
+
+    def is_open(self, domain: str) -> bool:
+        """True while requests to the domain would be refused (read-only, never claims the probe)"""
+        with self._lock:
+            entry = self._domains.get(domain)
+            if entry is None or entry['state'] == CLOSED:
+                return False
+            if entry['state'] == HALF_OPEN:
+                return entry['probing']
+            return time.monotonic() - entry['opened_at'] < self.reset_after
+
+    def before_request(self, domain: str):
+        """Raise CircuitOpen if the domain may not be requested; claims the half-open probe when due"""
+        with self._lock:
+            entry = self._entry(domain)
+            if entry['state'] == OPEN and time.monotonic() - entry['opened_at'] >= self.reset_after:
+                entry['state'] = HALF_OPEN
+                entry['probing'] = False
+            if entry['state'] == HALF_OPEN and not entry['probing']:
+                entry['probing'] = True
+                perf.incr('circuit.probe')
+                return
+            if entry['state'] != CLOSED:
+                entry['rejected'] += 1
+                perf.incr('circuit.rejected')
+                raise CircuitOpen(domain)
+
+    def record(self, domain: str, success: Optional[bool]):
+        """Outcome of a request let through; None means inconclusive (e.g. our own deadline ran out)"""
+        with self._lock:
+            entry = self._entry(domain)
+            was_probe = entry['state'] == HALF_OPEN and entry['probing']
+            entry['probing'] = False
+            if success is None:
+                return
+            if success:
+                if entry['state'] != CLOSED:
+                    logger.info("Circuit for %s closed again", domain)
+                entry['state'] = CLOSED
+                entry['failures'] = 0
+                return
+
+            entry['failures'] += 1
+            if was_probe or (entry['state'] == CLOSED and entry['failures'] >= self.failure_threshold):
+                if entry['state'] == CLOSED:
+                    entry['trips'] += 1
+                    perf.incr('circuit.opened')
+                    logger.warning("Circuit for %s opened after %d consecutive failures", domain, entry['failures'])
+                entry['state'] = OPEN
+                entry['opened_at'] = time.monotonic()
+
+    def retry_after(self, domain: str) -> float:
+        """Seconds until the domain's circuit lets a request through again; 0 when it is closed"""
+        with self._lock:
+            entry = self._domains.get(domain)
+            if entry is None or entry['state'] == CLOSED:
+                return 0.0
+            if entry['state'] == HALF_OPEN:
+                # A probe is in flight; its outcome decides within one request
+                return 1.0 if entry['probing'] else 0.0
+            return max(0.0, self.reset_after - (time.monotonic() - entry['opened_at']))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Domains whose circuit has tripped at least once, with their current state"""
+        with self._lock:
+            return {
+                domain: {'state': entry['state'], 'failures': entry['failures'],
+                         'trips': entry['trips'], 'rejected': entry['rejected']}
+                for domain, entry in self._domains.items() if entry['trips']
+            }
@@ -0,0 +1,44 @@
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(BaseException):
+    """Raised when a time budget runs out.
+
+    Like asyncio.CancelledError this derives from BaseException, so the broad
+    `except Exception` fallbacks in the scraper and analyzers don't swallow it
+    and the remaining tiers/stages of the row are cancelled.
+    """
+
+
+class Deadline:
+    """Absolute time budget shared by all stages of a unit of work"""
+
+    def __init__(self, budget: Optional[float] = None, parent: Optional['Deadline'] = None):
+        expires_at = time.monotonic() + budget if budget else None
+        if parent is not None and parent.expires_at is not None:
+            expires_at = parent.expires_at if expires_at is None else min(expires_at, parent.expires_at)
+        self.expires_at = expires_at
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float('inf')
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded()
+
+    def timeout(self, stage_limit: float) -> float:
+        """Timeout for one network call: the stage limit capped by the remaining budget"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        return max(0.1, min(stage_limit, remaining))
+
+
+# Default for callers that don't pass a deadline
+NO_DEADLINE = Deadline()
@@ -0,0 +1,113 @@
+import json
+import os
+import random
+import threading
+from typing import Dict, List
+from urllib.parse import urlparse
+
+CACHE_DIR = '.scraper_cache'
+DEFAULT_STATS_PATH = os.path.join(CACHE_DIR, 'domain_stats.json')
+
+# Rough latency prior (seconds) per scraping method before we have observations
+METHOD_COST_PRIOR = {
+    'newspaper3k': 1.5,
+    'requests': 1.5,
+    'playwright': 6.0
+}
+
+
+def get_domain(url: str) -> str:
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith('www.') else netloc
+
+
+class DomainStats:
+    """Per-domain success/latency statistics for each scraping method, persisted across runs"""
+
+    def __init__(self, path: str = DEFAULT_STATS_PATH, min_samples: int = 3,
+                 give_up_after: int = 10, explore_rate: float = 0.05, save_every: int = 20):
+        self.path = path
+        self.min_samples = min_samples
+        self.give_up_after = give_up_after
+        self.explore_rate = explore_rate
+        self.save_every = save_every
+        self._stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._stats = json.load(f)
+        except (OSError, ValueError):
+            self._stats = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.dumps(self._stats)
+            self._dirty = 0
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.path)
+
+    def record(self, domain: str, method: str, success: bool, content_length: int, latency: float):
+        with self._lock:
+            entry = self._stats.setdefault(domain, {}).setdefault(method, {
+                'attempts': 0, 'successes': 0, 'total_chars': 0, 'total_latency': 0.0
+            })
+            entry['attempts'] += 1
+            entry['successes'] += int(success)
+            entry['total_chars'] += content_length
+            entry['total_latency'] += latency
+            self._dirty += 1
+            should_save = self._dirty >= self.save_every
+        if should_save:
+            self.save()
+
+    def order_methods(self, domain: str, methods: List[str]) -> List[str]:
+        """Order methods by expected cost to get usable content, dropping ones that never work"""
+        domain_stats = self._stats.get(domain, {})
+        explore = random.random() < self.explore_rate
+
+        candidates = []
+        for method in methods:
+            entry = domain_stats.get(method)
+            if entry and entry['attempts'] >= self.give_up_after and not entry['successes'] and not explore:
+                continue
+            candidates.append(method)
+
+        # Never leave a domain without any method to try
+        if not candidates:
+            candidates = list(methods)
+
+        def expected_cost(method: str) -> float:
+            entry = domain_stats.get(method)
+            prior = METHOD_COST_PRIOR.get(method, 2.0)
+            if not entry or entry['attempts'] < self.min_samples:
+                return prior / 0.5
+            success_rate = (entry['successes'] + 1) / (entry['attempts'] + 2)
+            avg_latency = entry['total_latency'] / entry['attempts']
+            return avg_latency / max(success_rate, 0.05)
+
+        return sorted(candidates, key=expected_cost)
+
+    def get_domain_report(self) -> List[Dict]:
+        rows = []
+        with self._lock:
+            for domain, methods in self._stats.items():
+                for method, entry in methods.items():
+                    attempts = entry['attempts'] or 1
+                    rows.append({
+                        'domain': domain,
+                        'method': method,
+                        'attempts': entry['attempts'],
+                        'success_rate': round(entry['successes'] / attempts, 3),
+                        'avg_chars': int(entry['total_chars'] / attempts),
+                        'avg_latency': round(entry['total_latency'] / attempts, 3)
+                    })
+        return rows
@@ -0,0 +1,173 @@
+import gzip
+import io
+import math
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Tuple
+
+import pandas as pd
+
+from result_store import ResultStore
+
+try:
+    import xlsxwriter
+except ImportError:  # falls back to openpyxl through pandas
+    xlsxwriter = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # ResultStore.to_arrow raises a clear error first
+    pq = None
+
+# Excel silently cuts cells above this length
+EXCEL_CELL_LIMIT = 32767
+CHUNK_ROWS = 2000
+
+EXPORT_FORMATS = {
+    'xlsx': {'label': 'Excel (.xlsx)', 'ext': '.xlsx',
+             'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+    'parquet': {'label': 'Parquet', 'ext': '.parquet', 'mime': 'application/octet-stream'},
+    'csv.gz': {'label': 'CSV (gzip)', 'ext': '.csv.gz', 'mime': 'application/gzip'},
+    'jsonl': {'label': 'JSON Lines', 'ext': '.jsonl', 'mime': 'application/x-ndjson'}
+}
+
+
+class ExportFile(NamedTuple):
+    suffix: str
+    data: bytes
+    mime: str
+
+
+def export_results(store: ResultStore, fmt: str, split_texts: bool = False) -> List[ExportFile]:
+    """Write the results in `fmt`; with `split_texts` long texts go to a separate JSONL.gz file"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    text_columns = [c for c in store.columns if c in store.text_columns]
+    main_columns = [c for c in store.columns if c not in text_columns] if split_texts else store.columns
+
+    writer = {
+        'xlsx': _write_xlsx,
+        'parquet': _write_parquet,
+        'csv.gz': _write_csv_gz,
+        'jsonl': _write_jsonl
+    }[fmt]
+    info = EXPORT_FORMATS[fmt]
+    files = [ExportFile(info['ext'], writer(store, main_columns, split_texts), info['mime'])]
+
+    if split_texts and text_columns:
+        files.append(ExportFile('_texts.jsonl.gz', _write_texts(store, text_columns), 'application/gzip'))
+    return files
+
+
+def _with_row_id(frame, start: int, enabled: bool):
+    if enabled:
+        frame.insert(0, 'Row_Id', range(start, start + len(frame)))
+    return frame
+
+
+def _write_xlsx(store: ResultStore, columns: List[str], row_ids: bool) -> bytes:
+    buffer = io.BytesIO()
+    if xlsxwriter is None:
+        _with_row_id(store.frame(columns=columns), 0, row_ids).to_excel(buffer, index=False, engine='openpyxl')
+        return buffer.getvalue()
+
+    # constant_memory streams rows to disk-backed temp files instead of holding the sheet.
+    # Scraped values are written as plain text like to_excel does: no live formulas
+    # (formula injection), no hyperlinks (Excel caps a sheet at 65,530) and no number guessing
+    workbook = xlsxwriter.Workbook(buffer, {
+        'constant_memory': True, 'in_memory': False,
+        'strings_to_urls': False, 'strings_to_formulas': False, 'strings_to_numbers': False,
+        # Same date cells as to_excel writes
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+    })
+    worksheet = workbook.add_worksheet('Hasil')
+    header = (['Row_Id'] if row_ids else []) + columns
+    worksheet.write_row(0, 0, header)
+
+    row_idx = 1
+    for frame in store.iter_frames(CHUNK_ROWS, columns):
+        frame = _with_row_id(frame, row_idx - 1, row_ids)
+        for values in frame.itertuples(index=False, name=None):
+            worksheet.write_row(row_idx, 0, [_excel_value(v) for v in values])
+            row_idx += 1
+    workbook.close()
+    return buffer.getvalue()
+
+
+def _excel_value(value):
+    if value is None or value is pd.NaT or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel has no time zones; keep the wall-clock time like pandas' tz_localize(None)
+        return value.replace(tzinfo=None)
+    if isinstance(value, str) and len(value) > EXCEL_CELL_LIMIT:
+        return value[:EXCEL_CELL_LIMIT - 20] + ' …[terpotong]'
+    return value
+
+
+def _write_parquet(store: ResultStore, columns: List[str], row_ids: bool) -> bytes:
+    buffer = io.BytesIO()
+    table = store.to_arrow().select(columns)
+    if row_ids:
+        table = table.add_column(0, 'Row_Id', [list(range(len(store)))])
+    pq.write_table(table, buffer, compression='zstd')
+    return buffer.getvalue()
+
+
+def _write_csv_gz(store: ResultStore, columns: List[str], row_ids: bool) -> bytes:
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=5) as gz:
+        text = io.TextIOWrapper(gz, encoding='utf-8', newline='')
+        start = 0
+        for frame in store.iter_frames(CHUNK_ROWS, columns):
+            _with_row_id(frame, start, row_ids).to_csv(text, index=False, header=start == 0)
+            start += len(frame)
+        text.flush()
+        text.detach()
+    return buffer.getvalue()
+
+
+def _write_jsonl(store: ResultStore, columns: List[str], row_ids: bool) -> bytes:
+    buffer = io.StringIO()
+    start = 0
+    for frame in store.iter_frames(CHUNK_ROWS, columns):
+        _with_row_id(frame, start, row_ids).to_json(buffer, orient='records', lines=True, force_ascii=False)
+        start += len(frame)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _write_texts(store: ResultStore, text_columns: List[str]) -> bytes:
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=5) as gz:
+        start = 0
+        for frame in store.iter_frames(CHUNK_ROWS, text_columns):
+            chunk = _with_row_id(frame, start, True).to_json(orient='records', lines=True, force_ascii=False)
+            gz.write(chunk.encode('utf-8'))
+            if not chunk.endswith('\n'):
+                gz.write(b'\n')
+            start += len(frame)
+    return buffer.getvalue()
+
+
+class ExportManager:
+    """Generates export files in a background thread and caches them by key"""
+
+    def __init__(self, max_workers: int = 1, max_entries: int = 8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._jobs: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+
+    def request(self, key: Tuple, store: ResultStore, fmt: str, split_texts: bool) -> Future:
+        with self._lock:
+            job = self._jobs.get(key)
+            # A failed export is not cached, so asking again retries it
+            if job is None or (job.done() and job.exception() is not None):
+                job = self._executor.submit(export_results, store, fmt, split_texts)
+                self._jobs[key] = job
+                # Drop the oldest cached exports
+                while len(self._jobs) > self.max_entries:
+                    self._jobs.pop(next(iter(self._jobs)))
+            return job
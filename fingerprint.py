@@ -0,0 +1,11 @@
+import hashlib
+import json
+
+
+def fingerprint(*parts) -> str:
+    """Short stable hash of the inputs an output was computed from"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()[:16]
@@ -1,17 +1,48 @@
-from newspaper import Article
+from newspaper import Article, Config
 from bs4 import BeautifulSoup
 import re
+import sqlite3
 from typing import Optional
 
+from perf_metrics import perf
+from log_setup import get_logger
+from deadline import Deadline, NO_DEADLINE
+from article_store import ArticleStore
+from circuit_breaker import CircuitBreaker
+from scraper import NewsScraper
+from domain_stats import get_domain
+
+logger = get_logger(__name__)
+
 class JournalistDetector:
     def __init__(self):
-        pass
+        # Shared article store; authors found while scraping avoid a second download
+        self.store: Optional[ArticleStore] = None
+        # Scraper's per-domain circuit breaker; None never skips the download
+        self.breaker: Optional[CircuitBreaker] = None
+        # Scraper whose capped, streamed fetch downloads the page; None lets newspaper3k download it
+        self.scraper: Optional[NewsScraper] = None
 
-    def detect_journalist(self, url: str, content: str) -> Optional[str]:
+    @perf.timed('journalist')
+    def detect_journalist(self, url: str, content: str, timeout: int = 30,
+                          deadline: Deadline = NO_DEADLINE) -> Optional[str]:
         journalist = None
         
-        # Method 1: Using newspaper3k
-        journalist = self._detect_with_newspaper3k(url)
+        # Method 0: Author stored when the article was scraped
+        stored = None
+        if self.store:
+            try:
+                stored = self.store.get_article(url)
+            except sqlite3.Error as e:
+                # A locked or damaged store only costs the cache, not the row
+                logger.warning("Article store lookup failed for %s: %s", url, e)
+        if stored and stored['author']:
+            perf.incr('journalist.store_hit')
+            return stored['author']
+        
+        # Method 1: Using newspaper3k (skipped while the site's circuit is open)
+        if not (self.breaker and self.breaker.is_open(get_domain(url))):
+            journalist = self._detect_with_newspaper3k(url, deadline.timeout(timeout), deadline)
         
         if not journalist:
             # Method 2: Using BeautifulSoup patterns
@@ -19,17 +50,25 @@ class JournalistDetector:
         
         return journalist if journalist else "Tidak ditemukan"
 
-    def _detect_with_newspaper3k(self, url: str) -> Optional[str]:
+    def _detect_with_newspaper3k(self, url: str, timeout: float = 30,
+                                 deadline: Deadline = NO_DEADLINE) -> Optional[str]:
         try:
-            article = Article(url)
-            article.download()
+            config = Config()
+            config.request_timeout = timeout
+            config.fetch_images = False
+            config.memoize_articles = False
+            article = Article(url, config=config)
+            if self.scraper:
+                article.download(input_html=self.scraper.fetch_html(url, timeout, deadline))
+            else:
+                article.download()
             article.parse()
             
             if hasattr(article, 'authors') and article.authors:
                 return ', '.join(article.authors)
             
         except Exception as e:
-            print(f"Error with newspaper3k: {str(e)}")
+            logger.info("newspaper3k author lookup failed for %s: %s", url, e)
         
         return None
 
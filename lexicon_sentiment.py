@@ -0,0 +1,142 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+# Kamus kata sentimen Bahasa Indonesia (bisa ditambah lewat file lexicon custom)
+POSITIVE_WORDS = {
+    'baik', 'bagus', 'positif', 'meningkat', 'peningkatan', 'naik', 'untung', 'keuntungan',
+    'laba', 'sukses', 'berhasil', 'keberhasilan', 'prestasi', 'unggul', 'unggulan', 'puas',
+    'kepuasan', 'memuaskan', 'apresiasi', 'dukung', 'mendukung', 'dukungan', 'inovatif',
+    'inovasi', 'tumbuh', 'bertumbuh', 'pertumbuhan', 'efisien', 'aman', 'nyaman', 'terbaik',
+    'juara', 'populer', 'laris', 'kuat', 'menguat', 'optimis', 'optimistis', 'stabil',
+    'membaik', 'penghargaan', 'rekor', 'hemat', 'andal', 'handal', 'canggih', 'lancar',
+    'pulih', 'pemulihan', 'manfaat', 'bermanfaat', 'senang', 'bangga', 'ramah', 'solusi',
+    'mudah', 'berkualitas', 'terpercaya', 'gemilang', 'melonjak', 'ekspansi', 'kolaborasi',
+    'sejahtera', 'kesejahteraan', 'diminati', 'menang', 'kemenangan', 'terobosan',
+    'transparan', 'profesional', 'sigap', 'responsif', 'kompetitif', 'berkelanjutan',
+}
+
+NEGATIVE_WORDS = {
+    'buruk', 'jelek', 'negatif', 'turun', 'menurun', 'penurunan', 'rugi', 'kerugian', 'merugi',
+    'gagal', 'kegagalan', 'masalah', 'bermasalah', 'keluhan', 'mengeluh', 'dikeluhkan',
+    'kecewa', 'mengecewakan', 'kekecewaan', 'kritik', 'dikritik', 'mengkritik', 'protes',
+    'skandal', 'korupsi', 'penipuan', 'menipu', 'bohong', 'cacat', 'rusak', 'kerusakan',
+    'kecelakaan', 'bahaya', 'berbahaya', 'lambat', 'mahal', 'melemah', 'anjlok', 'merosot',
+    'krisis', 'bangkrut', 'pailit', 'phk', 'mogok', 'gugatan', 'digugat', 'menggugat',
+    'tuntutan', 'sanksi', 'denda', 'didenda', 'recall', 'lemah', 'ancaman', 'mengancam',
+    'khawatir', 'kekhawatiran', 'risiko', 'boikot', 'kontroversi', 'kontroversial', 'polemik',
+    'tersangka', 'ditangkap', 'pelanggaran', 'melanggar', 'bocor', 'kebocoran', 'defisit',
+    'pesimis', 'sulit', 'kesulitan', 'terhambat', 'tertunda', 'mangkrak', 'kebakaran',
+    'tewas', 'korban', 'keributan', 'kisruh', 'ricuh', 'kecurangan', 'curang', 'mundur',
+    'tumbang', 'terpuruk', 'lesu', 'macet', 'gangguan', 'terganggu',
+}
+
+NEGATORS = {'tidak', 'tak', 'bukan', 'belum', 'tanpa', 'kurang', 'jangan', 'enggak', 'nggak'}
+
+STOPWORDS = {
+    'dan', 'atau', 'yang', 'di', 'ke', 'dari', 'untuk', 'dengan', 'pada', 'dalam', 'the', 'of',
+    'and', 'produk', 'harga',
+}
+
+_TOKEN_RE = re.compile(r"[a-zA-Z]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class LexiconSentimentScorer:
+    """Scorer sentimen offline berbasis kamus kata Bahasa Indonesia (CPU-only, deterministik)"""
+
+    def __init__(self, lexicon_path: Optional[str] = None):
+        self.positive: Set[str] = set(POSITIVE_WORDS)
+        self.negative: Set[str] = set(NEGATIVE_WORDS)
+        if lexicon_path:
+            self.load_lexicon(lexicon_path)
+
+    def load_lexicon(self, path: str):
+        """Load additional words from a TSV file: `kata<TAB>positif|negatif`"""
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.strip().split('\t')
+                if len(parts) != 2 or parts[0].startswith('#'):
+                    continue
+                word, polarity = parts[0].lower(), parts[1].lower()
+                if polarity.startswith('pos'):
+                    self.positive.add(word)
+                    self.negative.discard(word)
+                elif polarity.startswith('neg'):
+                    self.negative.add(word)
+                    self.positive.discard(word)
+
+    def score(self, content: str, context: str) -> Dict:
+        return self.score_batch([content], context)[0]
+
+    def score_batch(self, contents: Iterable[str], context: str) -> List[Dict]:
+        """Score many articles against one context; the context matcher is compiled once"""
+        matchers = self._compile_context(context)
+        return [self._score_one(content or '', matchers) for content in contents]
+
+    def _compile_context(self, context: str) -> List[re.Pattern]:
+        matchers = []
+        for phrase in re.split(r'[,;\n]+', context or ''):
+            phrase = phrase.strip().lower()
+            if not phrase:
+                continue
+            matchers.append(re.compile(r'\b' + re.escape(phrase) + r'\b'))
+            # Kata penting dari frasa juga dihitung sebagai penanda konteks
+            for token in _TOKEN_RE.findall(phrase):
+                if len(token) >= 4 and token not in STOPWORDS:
+                    matchers.append(re.compile(r'\b' + re.escape(token) + r'\b'))
+        return matchers
+
+    def _score_one(self, content: str, matchers: List[re.Pattern]) -> Dict:
+        text = content[:20000].lower()
+        sentences = [s for s in _SENTENCE_RE.split(text) if s.strip()]
+
+        relevant = [s for s in sentences if any(m.search(s) for m in matchers)] if matchers else sentences
+        if not relevant:
+            return {
+                "sentiment": "tidak terkait",
+                "confidence": "sedang" if len(text) > 500 else "rendah",
+                "reasoning": "Konteks tidak ditemukan dalam artikel (lexicon lokal)",
+                "backend": "lexicon"
+            }
+
+        positive_hits = 0
+        negative_hits = 0
+        for sentence in relevant:
+            tokens = _TOKEN_RE.findall(sentence)
+            for idx, token in enumerate(tokens):
+                polarity = 1 if token in self.positive else -1 if token in self.negative else 0
+                if not polarity:
+                    continue
+                if idx > 0 and tokens[idx - 1] in NEGATORS:
+                    polarity = -polarity
+                if polarity > 0:
+                    positive_hits += 1
+                else:
+                    negative_hits += 1
+
+        hits = positive_hits + negative_hits
+        score = (positive_hits - negative_hits) / hits if hits else 0.0
+
+        if score > 0.2:
+            sentiment = "positif"
+        elif score < -0.2:
+            sentiment = "negatif"
+        else:
+            sentiment = "netral"
+
+        if hits >= 5 and abs(score) >= 0.5:
+            confidence = "tinggi"
+        elif hits >= 2 and (abs(score) >= 0.3 or sentiment == "netral"):
+            confidence = "sedang"
+        else:
+            confidence = "rendah"
+
+        return {
+            "sentiment": sentiment,
+            "confidence": confidence,
+            "reasoning": (
+                f"{len(relevant)} kalimat terkait konteks, {positive_hits} kata positif dan "
+                f"{negative_hits} kata negatif (lexicon lokal)"
+            ),
+            "backend": "lexicon"
+        }
@@ -0,0 +1,68 @@
+import contextvars
+import json
+import logging
+import sys
+import uuid
+from typing import Optional
+
+LOGGER_ROOT = 'news_analyzer'
+
+# Correlation ID of the URL/row currently being processed in this thread/task
+_correlation_id = contextvars.ContextVar('correlation_id', default='-')
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_ROOT}.{name}")
+
+
+def set_correlation_id(value: Optional[str] = None) -> str:
+    """Tag subsequent log records in this context; a short random ID is generated if none is given"""
+    value = value or uuid.uuid4().hex[:8]
+    _correlation_id.set(value)
+    return value
+
+
+def get_correlation_id() -> str:
+    return _correlation_id.get()
+
+
+class CorrelationFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'cid': getattr(record, 'correlation_id', '-'),
+            'msg': record.getMessage()
+        }
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def configure_logging(level: str = 'WARNING', json_format: bool = False):
+    """Configure the package logger once; later calls only change level/format"""
+    logger = logging.getLogger(LOGGER_ROOT)
+    logger.setLevel(getattr(logging, level.upper(), logging.WARNING))
+    logger.propagate = False
+
+    handler = next((h for h in logger.handlers if getattr(h, '_news_analyzer', False)), None)
+    if handler is None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler._news_analyzer = True
+        handler.addFilter(CorrelationFilter())
+        logger.addHandler(handler)
+
+    if json_format:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s'
+        ))
+    return logger
@@ -0,0 +1,156 @@
+import contextvars
+import functools
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def _summarize(values: List[float]) -> Dict:
+    ordered = sorted(values)
+    total = sum(ordered)
+    return {
+        'count': len(ordered),
+        'total': round(total, 4),
+        'mean': round(total / len(ordered), 4) if ordered else 0.0,
+        'p50': round(_percentile(ordered, 50), 4),
+        'p90': round(_percentile(ordered, 90), 4),
+        'p99': round(_percentile(ordered, 99), 4),
+        'max': round(ordered[-1], 4) if ordered else 0.0
+    }
+
+
+class PerfRecorder:
+    """Lightweight per-stage timers and counters collected during a processing run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._timings = defaultdict(list)
+            self._domain_timings = defaultdict(list)
+            self._method_timings = defaultdict(list)
+            self._counters = defaultdict(int)
+            self._tokens = defaultdict(lambda: {'prompt': 0, 'output': 0, 'cached': 0})
+            self._started = time.time()
+
+    def record(self, stage: str, seconds: float, domain: Optional[str] = None, method: Optional[str] = None):
+        with self._lock:
+            self._timings[stage].append(seconds)
+            if domain:
+                self._domain_timings[(domain, stage)].append(seconds)
+            if method:
+                self._method_timings[(stage, method)].append(seconds)
+
+    @contextmanager
+    def stage(self, name: str, domain: Optional[str] = None, method: Optional[str] = None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, domain, method)
+
+    def timed(self, name: str):
+        """Decorator timing every call of a function under `name`"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def incr(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def record_llm(self, stage: str, latency: float, response=None):
+        """Record latency and token usage of one LLM call (reads `usage_metadata` when present)"""
+        self.record(f"llm.{stage}", latency)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return
+        with self._lock:
+            self._tokens[stage]['prompt'] += getattr(usage, 'prompt_token_count', 0) or 0
+            self._tokens[stage]['output'] += getattr(usage, 'candidates_token_count', 0) or 0
+            # Prompt tokens served from Gemini's (implicit) prefix cache
+            self._tokens[stage]['cached'] += getattr(usage, 'cached_content_token_count', 0) or 0
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                'elapsed': round(time.time() - self._started, 3),
+                'stages': {name: _summarize(values) for name, values in self._timings.items()},
+                'domains': [
+                    {'domain': domain, 'stage': stage, **_summarize(values)}
+                    for (domain, stage), values in self._domain_timings.items()
+                ],
+                'methods': [
+                    {'stage': stage, 'method': method, **_summarize(values)}
+                    for (stage, method), values in self._method_timings.items()
+                ],
+                'counters': dict(self._counters),
+                'llm_tokens': {stage: dict(tokens) for stage, tokens in self._tokens.items()}
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
+
+
+# Recorder of the run active in this context; unset outside `recording`
+_current_recorder: contextvars.ContextVar = contextvars.ContextVar('perf_recorder', default=None)
+
+# Fallback for code not running inside a run (the HTTP service, benchmarks)
+_process_recorder = PerfRecorder()
+
+
+def current_recorder() -> PerfRecorder:
+    return _current_recorder.get() or _process_recorder
+
+
+@contextmanager
+def recording(recorder: PerfRecorder):
+    """Send everything recorded through `perf` in this context to `recorder`.
+
+    Streamlit runs all sessions in one process, so each run gets its own recorder instead
+    of resetting a shared one. Worker threads must run in a copy of this context to see it.
+    """
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+class _CurrentRecorder:
+    """Forwards to the recorder of the current run, resolved on every call"""
+
+    def __getattr__(self, name):
+        return getattr(current_recorder(), name)
+
+    def timed(self, name: str):
+        """Decorator timing every call of a function under `name` in the recorder current at call time"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with current_recorder().stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+# Used by the scraper, detectors and analyzers
+perf = _CurrentRecorder()
@@ -0,0 +1,267 @@
+import json
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from domain_stats import CACHE_DIR, get_domain
+from log_setup import get_logger
+from perf_metrics import perf
+
+logger = get_logger(__name__)
+
+DEFAULT_ID_DATES_PATH = os.path.join(CACHE_DIR, 'article_id_dates.json')
+
+# Dates in article URLs: /2023/05/15/, /2023-05-15/, 14-digit timestamps (/20230515123456-4-...), /2023/05/
+_URL_DAY_RE = re.compile(r'/(20\d{2})[/-](0?[1-9]|1[0-2])[/-](0?[1-9]|[12]\d|3[01])(?=[/-]|$)')
+_URL_STAMP_RE = re.compile(r'/(20\d{2})(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])\d{6}(?=\D|$)')
+_URL_MONTH_RE = re.compile(r'/(20\d{2})/(0?[1-9]|1[0-2])(?=/)')
+_ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+
+# Sites whose article IDs increase with publication time
+SEQUENTIAL_ID_PATTERNS = {
+    'detik.com': re.compile(r'/d-(\d+)')
+}
+
+# Most frequent function words; enough to tell the two feed languages apart on one paragraph
+LANGUAGE_WORDS = {
+    'id': {
+        'yang', 'dan', 'di', 'ke', 'dari', 'ini', 'itu', 'dengan', 'untuk', 'tidak', 'dalam', 'akan',
+        'pada', 'juga', 'adalah', 'ada', 'oleh', 'karena', 'atau', 'bisa', 'telah', 'sudah', 'kata',
+        'saat', 'tersebut', 'lebih', 'para', 'mereka', 'kami', 'kita', 'menjadi', 'bahwa'
+    },
+    'en': {
+        'the', 'and', 'of', 'to', 'in', 'is', 'that', 'for', 'on', 'with', 'as', 'was', 'it', 'by',
+        'are', 'be', 'this', 'from', 'at', 'has', 'have', 'an', 'said', 'will', 'not', 'but', 'which',
+        'were', 'its', 'after', 'their', 'been'
+    }
+}
+LANGUAGE_NAMES = {'id': 'Indonesia', 'en': 'Inggris', 'other': 'lain'}
+DATE_SOURCE_LABELS = {'sitemap': 'sitemap', 'publish_date': 'tanggal artikel'}
+_WORD_RE = re.compile(r"[a-zA-Z]+")
+
+
+def parse_date(value) -> Optional[date]:
+    """Calendar date of an ISO-like string ('2023-05-15', '2023-05-15 10:00:00+07:00', ...)"""
+    match = _ISO_DATE_RE.match(str(value or '').strip())
+    if not match:
+        return None
+    try:
+        return date(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+
+def url_date_range(url: str) -> Optional[Tuple[date, date]]:
+    """Earliest and latest possible publication date encoded in the URL path, if any"""
+    path = re.sub(r'^[a-z]+://[^/]+', '', url or '', flags=re.IGNORECASE).split('?', 1)[0]
+    for pattern in (_URL_DAY_RE, _URL_STAMP_RE):
+        match = pattern.search(path)
+        if match:
+            try:
+                day = date(*map(int, match.groups()))
+            except ValueError:
+                continue
+            return day, day
+    match = _URL_MONTH_RE.search(path)
+    if match:
+        year, month = map(int, match.groups())
+        first = date(year, month, 1)
+        last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return first, last
+    return None
+
+
+def detect_language(text: str, min_words: int = 8) -> Optional[str]:
+    """'id', 'en' or 'other' from function-word frequency in the first paragraph; None if too short to tell"""
+    paragraph = next((part for part in re.split(r'\n+', text or '') if len(part.split()) >= min_words), text or '')
+    words = [word.lower() for word in _WORD_RE.findall(paragraph[:600])]
+    if len(words) < min_words:
+        return None
+    scores = {language: sum(word in common for word in words) / len(words)
+              for language, common in LANGUAGE_WORDS.items()}
+    language, score = max(scores.items(), key=lambda item: item[1])
+    return language if score >= 0.08 else 'other'
+
+
+def _domain_matches(domain: str, patterns: Iterable[str]) -> bool:
+    return any(domain == pattern or domain.endswith(f".{pattern}") for pattern in patterns)
+
+
+class ArticleIdDates:
+    """Publication dates seen for sequential article IDs (e.g. detik `d-7012345`), persisted across runs.
+
+    IDs only grow, so an unseen ID is published no later than any known date of a higher ID
+    and no earlier than any known date of a lower one; that bounds its date without fetching it.
+    """
+
+    def __init__(self, path: str = DEFAULT_ID_DATES_PATH, max_anchors: int = 500, save_every: int = 20):
+        self.path = path
+        self.max_anchors = max_anchors
+        self.save_every = save_every
+        self._anchors: Dict[str, Dict[str, str]] = {}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._anchors = json.load(f)
+        except (OSError, ValueError):
+            self._anchors = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.dumps(self._anchors)
+            self._dirty = 0
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def article_id(url: str) -> Optional[Tuple[str, int]]:
+        domain = get_domain(url)
+        for site, pattern in SEQUENTIAL_ID_PATTERNS.items():
+            if _domain_matches(domain, (site,)):
+                match = pattern.search(url)
+                if match:
+                    return site, int(match.group(1))
+        return None
+
+    def learn(self, url: str, publish_date) -> None:
+        key = self.article_id(url)
+        published = parse_date(publish_date)
+        if key is None or published is None:
+            return
+        site, article_id = key
+        with self._lock:
+            anchors = self._anchors.setdefault(site, {})
+            anchors[str(article_id)] = published.isoformat()
+            if len(anchors) > self.max_anchors:
+                # Thin out evenly so the whole ID range stays covered
+                kept = sorted(anchors, key=int)[::2]
+                self._anchors[site] = {article_id: anchors[article_id] for article_id in kept}
+            self._dirty += 1
+            should_save = self._dirty >= self.save_every
+        if should_save:
+            self.save()
+
+    def date_range(self, url: str) -> Optional[Tuple[Optional[date], Optional[date]]]:
+        """(earliest, latest) possible publication date of the URL's article; None for unknown sites"""
+        key = self.article_id(url)
+        if key is None:
+            return None
+        site, article_id = key
+        with self._lock:
+            anchors = sorted((int(known), value) for known, value in self._anchors.get(site, {}).items())
+        if not anchors:
+            return None
+        ids = [known for known, _ in anchors]
+        lower = [parse_date(value) for _, value in anchors[:bisect_right(ids, article_id)]]
+        upper = [parse_date(value) for _, value in anchors[bisect_left(ids, article_id):]]
+        return (max(lower) if lower else None), (min(upper) if upper else None)
+
+
+class RowFilter:
+    """Cheap checks that rule a row out before the expensive stages.
+
+    Checks go from cheapest signal to dearest: domain lists and dates in the URL (no request),
+    sequential article IDs and news-sitemap dates (cached), then the scraped publish date
+    and the language of the first paragraph (before any model call). Each check returns the
+    reason a row is out of scope, or None.
+    """
+
+    def __init__(self, since: Optional[date] = None, until: Optional[date] = None,
+                 allow_domains: Iterable[str] = (), deny_domains: Iterable[str] = (),
+                 languages: Iterable[str] = (), id_dates: Optional[ArticleIdDates] = None):
+        self.since = since
+        self.until = until
+        self.allow_domains = [_normalize_domain(d) for d in allow_domains if d.strip()]
+        self.deny_domains = [_normalize_domain(d) for d in deny_domains if d.strip()]
+        self.languages = set(languages)
+        self.id_dates = id_dates
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict], id_dates: Optional[ArticleIdDates] = None) -> Optional['RowFilter']:
+        """Filter for the sidebar's `prefilter` settings, or None when nothing is filtered"""
+        if not config:
+            return None
+        row_filter = cls(
+            parse_date(config.get('since')), parse_date(config.get('until')),
+            config.get('allow_domains', ()), config.get('deny_domains', ()),
+            config.get('languages', ()), id_dates
+        )
+        return row_filter if row_filter.active else None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.since or self.until or self.allow_domains or self.deny_domains or self.languages)
+
+    def check_url(self, url: str) -> Optional[str]:
+        domain = get_domain(url).split(':', 1)[0]
+        if self.deny_domains and _domain_matches(domain, self.deny_domains):
+            return self._reject('domain', f"Domain {domain} ada di daftar blokir")
+        if self.allow_domains and not _domain_matches(domain, self.allow_domains):
+            return self._reject('domain', f"Domain {domain} tidak ada di daftar izin")
+        if self.since or self.until:
+            found = url_date_range(url)
+            if found:
+                return self._check_range(*found, 'url_date', 'tanggal di URL')
+            if self.id_dates:
+                found = self.id_dates.date_range(url)
+                if found:
+                    return self._check_range(*found, 'url_id', 'ID artikel')
+        return None
+
+    def check_date(self, value, source: str) -> Optional[str]:
+        """Publish date from the sitemap ('sitemap') or the scraped article ('publish_date')"""
+        published = parse_date(value)
+        if published is None or not (self.since or self.until):
+            return None
+        return self._check_range(published, published, source, DATE_SOURCE_LABELS.get(source, source))
+
+    def check_text(self, text: str) -> Optional[str]:
+        if not self.languages:
+            return None
+        language = detect_language(text)
+        if language is None or language in self.languages:
+            return None
+        return self._reject('language', f"Bahasa {LANGUAGE_NAMES.get(language, language)}")
+
+    def _check_range(self, earliest: Optional[date], latest: Optional[date], signal: str, label: str) -> Optional[str]:
+        # Only rule a row out when its whole possible date range is outside the window
+        if self.since and latest and latest < self.since:
+            return self._reject(signal, f"Terbit sebelum {self.since.isoformat()} ({label}: {latest.isoformat()})")
+        if self.until and earliest and earliest > self.until:
+            return self._reject(signal, f"Terbit setelah {self.until.isoformat()} ({label}: {earliest.isoformat()})")
+        return None
+
+    def _reject(self, signal: str, reason: str) -> str:
+        perf.incr(f"prefilter.{signal}")
+        return reason
+
+
+def _normalize_domain(value: str) -> str:
+    value = value.strip().lower()
+    return get_domain(value if '//' in value else f"//{value}").split(':', 1)[0]
+
+
+def filter_urls(urls: List[str], row_filter: Optional[RowFilter]) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Split URLs into those to process and (url, reason) pairs ruled out by URL-only checks"""
+    if row_filter is None:
+        return list(urls), []
+    kept, dropped = [], []
+    for url in urls:
+        reason = row_filter.check_url(url) if url else None
+        if reason:
+            dropped.append((url, reason))
+        else:
+            kept.append(url)
+    return kept, dropped
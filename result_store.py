@@ -0,0 +1,211 @@
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+# Long text columns kept in the side text store instead of inline
+TEXT_COLUMNS = ('Content', 'Content_New', 'Summary', 'Summary_New', 'Reasoning', 'Reasoning_New')
+
+_MISSING = -1
+
+
+def _is_default_index(index: pd.Index) -> bool:
+    return isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+
+
+def _arrow_column(values: pd.Series):
+    """Arrow array of an input column; object columns mixing types (e.g. ints and text from Excel) become strings"""
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if pd.api.types.is_scalar(v) and pd.isna(v) else str(v) for v in values], type=pa.string())
+
+
+def _truncate(values: pd.Series, width: int) -> pd.Series:
+    """Vectorized counterpart of TextStore.preview for text columns of the input sheet"""
+    texts = values.astype('string')
+    long = texts.str.len() > width
+    truncated = texts.where(~long.fillna(False), texts.str.slice(0, width) + "...")
+    return truncated.astype(object).where(truncated.notna(), None)
+
+
+class TextStore:
+    """Append-only store holding each long text exactly once, addressed by integer ID"""
+
+    def __init__(self):
+        self._texts: List[str] = []
+        self.total_chars = 0
+
+    def add(self, text: str) -> int:
+        self._texts.append(text)
+        self.total_chars += len(text)
+        return len(self._texts) - 1
+
+    def get(self, text_id: int) -> Optional[str]:
+        return None if text_id == _MISSING else self._texts[text_id]
+
+    def length(self, text_id: int) -> int:
+        return 0 if text_id == _MISSING else len(self._texts[text_id])
+
+    def preview(self, text_id: int, width: int) -> Optional[str]:
+        if text_id == _MISSING:
+            return None
+        text = self._texts[text_id]
+        return text[:width] + "..." if len(text) > width else text
+
+
+class ResultStore:
+    """Columnar result store.
+
+    Input rows are referenced from the original DataFrame (never copied per row),
+    new values are kept as one list per column, and long texts live in a TextStore
+    so previews can be built from truncated views without copying full texts.
+    """
+
+    def __init__(self, base: Optional[pd.DataFrame] = None, text_columns: Iterable[str] = TEXT_COLUMNS):
+        # Rows are addressed by position; only an unusual index costs a copy of the input sheet
+        self.base = base if base is None or _is_default_index(base.index) else base.reset_index(drop=True)
+        self.text_columns = set(text_columns)
+        self.texts = TextStore()
+        self._columns: Dict[str, object] = {}
+        self._length = 0
+        # Bumped on every change so cached exports of an older state are not reused
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def new_columns(self) -> List[str]:
+        return list(self._columns.keys())
+
+    @property
+    def columns(self) -> List[str]:
+        base_columns = [c for c in self.base.columns if c not in self._columns] if self.base is not None else []
+        return base_columns + self.new_columns
+
+    def append(self, record: Dict):
+        for key, value in record.items():
+            column = self._columns.get(key)
+            if column is None:
+                column = self._new_column(key)
+            if key in self.text_columns:
+                column.append(self.texts.add(str(value)) if value is not None else _MISSING)
+            else:
+                column.append(value)
+        self._length += 1
+        self.version += 1
+
+        # Pad columns this record did not set
+        for key, column in self._columns.items():
+            if len(column) < self._length:
+                column.append(_MISSING if key in self.text_columns else None)
+
+    def update_row(self, idx: int, record: Dict):
+        """Overwrite values of an existing row (e.g. when a timed-out row is retried)"""
+        if not 0 <= idx < self._length:
+            raise IndexError(idx)
+        for key, value in record.items():
+            column = self._columns.get(key)
+            if column is None:
+                column = self._new_column(key)
+            if key in self.text_columns:
+                # The old text stays in the append-only store; only the reference changes
+                column[idx] = self.texts.add(str(value)) if value is not None else _MISSING
+            else:
+                column[idx] = value
+        self.version += 1
+
+    def _new_column(self, key: str):
+        if key in self.text_columns:
+            column = array('q', [_MISSING] * self._length)
+        else:
+            column = [None] * self._length
+        self._columns[key] = column
+        return column
+
+    def column(self, name: str) -> pd.Series:
+        """Materialize a single column (full texts for text columns)"""
+        if name in self._columns:
+            values = self._columns[name]
+            if name in self.text_columns:
+                return pd.Series([self.texts.get(text_id) for text_id in values], name=name, dtype=object)
+            return pd.Series(values, name=name)
+        if self.base is not None and name in self.base.columns:
+            return self.base[name].iloc[:self._length]
+        raise KeyError(name)
+
+    def text_lengths(self, name: str) -> pd.Series:
+        """Character length per row of a column, without materializing text-store texts"""
+        if name in self._columns and name in self.text_columns:
+            return pd.Series([self.texts.length(text_id) for text_id in self._columns[name]], name=name)
+        return self.column(name).fillna('').astype(str).str.len()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self.frame()
+
+    def frame(self, start: int = 0, stop: Optional[int] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Materialize rows [start, stop) with full texts, optionally restricted to `columns`"""
+        stop = self._length if stop is None else min(stop, self._length)
+        wanted = columns if columns is not None else self.columns
+
+        data = {}
+        for name in wanted:
+            if name in self._columns:
+                values = self._columns[name][start:stop]
+                if name in self.text_columns:
+                    data[name] = [self.texts.get(text_id) for text_id in values]
+                else:
+                    data[name] = values
+            elif self.base is not None and name in self.base.columns:
+                data[name] = self.base[name].iloc[start:stop].reset_index(drop=True)
+        return pd.DataFrame(data, columns=[name for name in wanted if name in data])
+
+    def iter_frames(self, chunk_size: int = 2000, columns: Optional[List[str]] = None):
+        for start in range(0, self._length, chunk_size):
+            yield self.frame(start, start + chunk_size, columns)
+
+    def preview_frame(self, width: int = 100, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """Rows [start, stop) with long texts truncated to `width`; full texts are never copied"""
+        stop = self._length if stop is None else min(stop, self._length)
+        start = max(0, start if start >= 0 else self._length + start)
+
+        data = {}
+        if self.base is not None:
+            for name in self.base.columns:
+                if name not in self._columns:
+                    values = self.base[name].iloc[start:stop].reset_index(drop=True)
+                    if name in self.text_columns and values.dtype == object:
+                        values = _truncate(values, width)
+                    data[name] = values
+        for name, values in self._columns.items():
+            if name in self.text_columns:
+                data[name] = [self.texts.preview(text_id, width) for text_id in values[start:stop]]
+            else:
+                data[name] = values[start:stop]
+        return pd.DataFrame(data)
+
+    def to_arrow(self):
+        if pa is None:
+            raise ImportError("pyarrow diperlukan untuk output Arrow/Parquet")
+        arrays = {}
+        if self.base is not None:
+            for name in self.base.columns:
+                if name not in self._columns:
+                    arrays[str(name)] = _arrow_column(self.base[name].iloc[:self._length])
+        for name, values in self._columns.items():
+            if name in self.text_columns:
+                arrays[name] = pa.array([self.texts.get(text_id) for text_id in values], type=pa.large_string())
+            else:
+                arrays[name] = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+        return pa.table(arrays)
+
+    def to_parquet(self, target, compression: str = 'zstd'):
+        pq.write_table(self.to_arrow(), target, compression=compression)
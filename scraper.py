@@ -1,11 +1,35 @@
+import logging
 import requests
 from bs4 import BeautifulSoup
-from newspaper import Article
+from newspaper import Article, Config
 import re
 from typing import Dict, Optional
 import time
 import random
 
+from browser_pool import BrowserPool
+from domain_stats import DomainStats, get_domain
+from site_index import SiteIndex
+from article_store import ArticleStore
+from adaptive_limiter import AdaptiveLimiter
+from circuit_breaker import CircuitBreaker
+from perf_metrics import perf
+from log_setup import get_logger
+from deadline import Deadline, NO_DEADLINE
+
+logger = get_logger(__name__)
+
+# Only these content types are downloaded and parsed; a missing header is allowed
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+_HEADER_CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class NonHtmlContent(Exception):
+    """The URL serves something other than an HTML page (PDF, video, ...); no tier can extract it"""
+
+
 class NewsScraper:
     def __init__(self):
         self.session = requests.Session()
@@ -53,11 +77,44 @@ class NewsScraper:
             'Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36'
         ]
         
+        # Random delay range (seconds) before each article request
+        self.politeness_delay = (0.5, 2.0)
+        
+        # Download caps: bodies are truncated at max_bytes, head-only reads stop at </head>
+        self.max_bytes = 3 * 1024 * 1024
+        self.max_head_bytes = 256 * 1024
+        
+        # Headless browser tier, only used for pages the cheap tiers fail on
+        self.browser_fallback = True
+        self.browser_pool = BrowserPool()
+        
+        # Per-domain method statistics, persisted across runs
+        self.domain_stats = DomainStats()
+        
+        # robots.txt rules, crawl-delay scheduling and news sitemap metadata per host
+        self.site_index = SiteIndex()
+        self.respect_robots = True
+        self.use_sitemaps = True
+        
+        # Concurrent requests per host, adapted to how each host copes (AIMD) and persisted across runs
+        self.limiter = AdaptiveLimiter()
+        
+        # Stops requesting domains that keep failing (blocked, challenge pages, down) for a while
+        self.breaker = CircuitBreaker()
+        
+        # Shared store of previously scraped articles; None disables reuse
+        self.article_store: Optional[ArticleStore] = None
+        
         # Set initial random user agent
         self._rotate_user_agent()
     
     def _rotate_user_agent(self):
-        """Rotate user agent randomly"""
+        """Pick the session's default headers with a random user agent.
+        
+        Only called before the session is shared: rows are scraped from several threads and
+        the session headers are read on every request. Each request still gets its own
+        rotated user agent from get_random_headers.
+        """
         selected_ua = random.choice(self.user_agents)
         
         self.session.headers.update({
@@ -76,7 +133,7 @@ class NewsScraper:
         })
         
         # Log user agent yang dipilih (untuk debugging)
-        print(f"🔄 Using User-Agent: {selected_ua[:60]}...")
+        logger.debug("Using User-Agent: %.60s", selected_ua)
     
     def get_random_headers(self, url: str = None) -> Dict[str, str]:
         """Generate random headers with Indonesian language priority"""
@@ -126,28 +183,94 @@ class NewsScraper:
         
         return headers
     
-    def get_title_newspaper3k(self, url: str) -> Optional[str]:
+    def _newspaper_config(self, timeout: float) -> Config:
+        """newspaper3k config bounded by `timeout`, using the session's User-Agent"""
+        config = Config()
+        config.request_timeout = timeout
+        config.browser_user_agent = self.session.headers.get('User-Agent')
+        config.fetch_images = False
+        config.memoize_articles = False
+        return config
+    
+    def save_state(self):
+        """Persist per-domain statistics, learned concurrency limits and the robots/sitemap cache, and apply store retention"""
+        self.domain_stats.save()
+        self.site_index.save()
+        self.limiter.save()
+        if self.article_store:
+            self.article_store.evict()
+    
+    def stored_article(self, url: str, lastmod: str = '', basic_only: bool = False) -> Optional[Dict]:
+        """Still-valid stored copy of the article; a basic-only copy only satisfies basic requests"""
+        if not self.article_store:
+            return None
+        try:
+            stored = self.article_store.get_article(url, lastmod)
+        except Exception as e:
+            logger.warning("Article store lookup failed for %s: %s", url, e)
+            return None
+        if not stored or (stored['method'].endswith('_basic') and not basic_only):
+            return None
+        return stored
+    
+    def sitemap_metadata(self, url: str, deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
+        """Title/publication date/lastmod from the host's news sitemap, if the URL is listed"""
+        if not self.use_sitemaps:
+            return None
+        try:
+            return self.site_index.lookup(url, deadline)
+        except Exception as e:
+            logger.info("Sitemap lookup failed for %s: %s", url, e)
+            return None
+    
+    @perf.timed('title')
+    def get_title_newspaper3k(self, url: str, timeout: int = 30, deadline: Deadline = NO_DEADLINE) -> Optional[str]:
         """Get title using newspaper3k - primary method"""
+        entry = self.sitemap_metadata(url, deadline)
+        if entry and entry['title']:
+            # Listed in the news sitemap: no need to download the page for its title
+            perf.incr('title.sitemap')
+            return entry['title']
+        
+        stored = self.stored_article(url, entry['lastmod'] if entry else '', basic_only=True)
+        if stored and stored['title']:
+            perf.incr('title.store')
+            return stored['title']
+        
+        if self.breaker.is_open(get_domain(url)):
+            # Blocked or dead site: don't spend the timeout on a title
+            return None
+        
         try:
-            # Rotate user agent sebelum request
-            self._rotate_user_agent()
-            
-            article = Article(url)
-            article.download()
+            # Most pages carry the title in <head>: read only that far
+            head = self._fetch(url, self.get_random_headers(url), deadline.timeout(timeout), head_only=True,
+                               deadline=deadline)
+            title = self._title_from_head(head)
+            if title:
+                perf.incr('title.head')
+                return title
+        except NonHtmlContent:
+            return None
+        except requests.exceptions.RequestException as e:
+            logger.info("Head-only title fetch failed for %s: %s", url, e)
+        
+        try:
+            html = self._fetch(url, self.get_random_headers(url), deadline.timeout(timeout), deadline=deadline)
+            article = Article(url, config=self._newspaper_config(deadline.timeout(timeout)))
+            article.download(input_html=html)
             article.parse()
             return article.title if article.title else None
         except Exception as e:
-            print(f"Error getting title with newspaper3k for {url}: {str(e)}")
+            logger.info("newspaper3k title failed for %s: %s", url, e)
             # Fallback to manual extraction
-            return self._get_title_manual(url)
+            return self._get_title_manual(url, timeout, deadline)
     
-    def _get_title_manual(self, url: str) -> Optional[str]:
+    def _get_title_manual(self, url: str, timeout: int = 30, deadline: Deadline = NO_DEADLINE) -> Optional[str]:
         """Fallback title extraction"""
         try:
             headers = self.get_random_headers(url)
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            html = self._fetch(url, headers, deadline.timeout(timeout), deadline=deadline)
+            soup = BeautifulSoup(html, 'html.parser')
             
             # Try multiple title selectors
             title_selectors = [
@@ -178,44 +301,131 @@ class NewsScraper:
             return "Gagal mengambil judul"
             
         except Exception as e:
-            print(f"Error in manual title extraction: {str(e)}")
+            logger.warning("Manual title extraction failed for %s: %s", url, e)
             return "Gagal mengambil judul"
     
     async def scrape_article(self, url: str, timeout: int = 30, basic_only: bool = False) -> Optional[Dict]:
         """Scrape article using requests + newspaper3k + BeautifulSoup"""
         return self.scrape_article_sync(url, timeout, basic_only)
     
-    def scrape_article_sync(self, url: str, timeout: int = 30, basic_only: bool = False) -> Optional[Dict]:
-        """Synchronous scraping method with random user agents"""
+    @perf.timed('scrape')
+    def scrape_article_sync(self, url: str, timeout: int = 30, basic_only: bool = False,
+                            deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
+        """Synchronous scraping method with random user agents.
+        
+        `timeout` bounds each network call; `deadline` is the total budget across all tiers
+        and raises DeadlineExceeded once it runs out.
+        """
         try:
-            # Add random delay to be respectful and avoid rate limiting
-            delay = random.uniform(0.5, 2.0)
-            time.sleep(delay)
+            entry = self.sitemap_metadata(url, deadline)
+            lastmod = entry['lastmod'] if entry else ''
+            stored = self.stored_article(url, lastmod, basic_only)
+            if stored:
+                # Unchanged since the stored copy (same sitemap lastmod, or recently fetched)
+                perf.incr('scrape.store_hit')
+                return {
+                    'content': stored['content'], 'url': url, 'title': stored['title'],
+                    'publish_date': stored['publish_date'], 'author': stored['author'],
+                    'method': stored['method']
+                }
             
-            print(f"🌐 Scraping: {url[:60]}...")
+            if self.respect_robots and not self.site_index.can_fetch(url, deadline):
+                logger.info("Disallowed by robots.txt: %s", url)
+                perf.incr('scrape.robots_disallowed')
+                return None
             
-            # Method 1: Try newspaper3k first (most reliable)
-            article_data = self._scrape_with_newspaper3k(url)
-            if article_data and len(article_data.get('content', '')) > 200:
-                print(f"✅ Success with newspaper3k: {len(article_data.get('content', ''))} chars")
+            domain = get_domain(url)
+            # Refuses (CircuitOpen) while the domain is blocked or dead, apart from periodic probes
+            self.breaker.before_request(domain)
+            reachable = None
+            try:
+                article_data = self._scrape_tiers(url, timeout, basic_only, deadline, entry)
+                # A short page still means the site answers; only "nothing from any tier" is a failure
+                reachable = article_data is not None
                 return article_data
-            
-            # Method 2: Fallback to manual scraping
-            print("🔄 Fallback to manual scraping...")
-            return self._scrape_with_requests(url, timeout, basic_only)
-            
+            except NonHtmlContent:
+                reachable = True
+                raise
+            except Exception:
+                reachable = False
+                raise
+            finally:
+                self.breaker.record(domain, reachable)
+            
+        except NonHtmlContent as e:
+            # A PDF or video is not a failure of the tier; no other tier (browser included) can read it
+            logger.info("Skipping %s", e)
+            return None
         except Exception as e:
-            print(f"❌ Error scraping {url}: {str(e)}")
+            logger.warning("Error scraping %s: %s", url, e)
             return None
     
-    def _scrape_with_newspaper3k(self, url: str) -> Optional[Dict]:
+    def _scrape_tiers(self, url: str, timeout: int, basic_only: bool, deadline: Deadline,
+                      entry: Optional[Dict]) -> Optional[Dict]:
+        """Try the scraping methods for one URL; the best (possibly short) result, or None if none returned anything"""
+        # Space requests to the same host by crawl-delay or a random politeness delay
+        self.site_index.wait_turn(url, random.uniform(*self.politeness_delay), deadline)
+        
+        logger.info("Scraping %s", url)
+        
+        # Try methods cheapest-first for this domain, based on observed success and latency
+        tiers = {
+            'newspaper3k': lambda: self._scrape_with_newspaper3k(url, deadline.timeout(timeout), deadline),
+            'requests': lambda: self._scrape_with_requests(url, deadline.timeout(timeout), basic_only, deadline),
+            'playwright': lambda: self._scrape_with_browser(url, deadline.timeout(timeout), basic_only, deadline)
+        }
+        methods = ['newspaper3k', 'requests']
+        if self.browser_fallback and self.browser_pool.is_available():
+            methods.append('playwright')
+        
+        domain = get_domain(url)
+        best_data = None
+        for method in self.domain_stats.order_methods(domain, methods):
+            deadline.check()
+            started = time.perf_counter()
+            article_data = tiers[method]()
+            elapsed = time.perf_counter() - started
+            content_length = len((article_data or {}).get('content', ''))
+            success = content_length > 200
+            self.domain_stats.record(domain, method, success, content_length, elapsed)
+            perf.record('scrape.method', elapsed, domain=domain, method=method)
+            perf.incr(f"scrape.{method}.{'success' if success else 'fail'}")
+            
+            if success:
+                logger.info("Success with %s: %d chars", method, content_length)
+                article_data = self._apply_sitemap_metadata(article_data, entry)
+                self._store_article(url, article_data, entry['lastmod'] if entry else '')
+                return article_data
+            
+            logger.debug("%s gave %d chars, trying next method", method, content_length)
+            if article_data and content_length >= len((best_data or {}).get('content', '')):
+                best_data = article_data
+        
+        return self._apply_sitemap_metadata(best_data, entry)
+    
+    def _store_article(self, url: str, article_data: Dict, lastmod: str):
+        if not self.article_store:
+            return
+        try:
+            self.article_store.put_article(url, article_data, lastmod)
+        except Exception as e:
+            logger.warning("Could not store article %s: %s", url, e)
+    
+    def _apply_sitemap_metadata(self, article_data: Optional[Dict], entry: Optional[Dict]) -> Optional[Dict]:
+        if not article_data or not entry:
+            return article_data
+        if entry['title'] and not article_data.get('title'):
+            article_data['title'] = entry['title']
+        if entry['publication_date'] and not article_data.get('publish_date'):
+            article_data['publish_date'] = entry['publication_date']
+        return article_data
+    
+    def _scrape_with_newspaper3k(self, url: str, timeout: float = 30, deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
         """Primary method using newspaper3k with random UA"""
         try:
-            # Rotate user agent
-            self._rotate_user_agent()
-            
-            article = Article(url)
-            article.download()
+            html = self._fetch(url, self.get_random_headers(url), timeout, deadline=deadline)
+            article = Article(url, config=self._newspaper_config(timeout))
+            article.download(input_html=html)
             article.parse()
             
             if article.text and len(article.text.strip()) > 100:
@@ -224,47 +434,130 @@ class NewsScraper:
                     'url': url,
                     'title': article.title or '',
                     'publish_date': str(article.publish_date) if article.publish_date else '',
+                    'author': ', '.join(article.authors),
                     'method': 'newspaper3k'
                 }
             
             return None
             
+        except NonHtmlContent:
+            raise
         except Exception as e:
-            print(f"📰 Newspaper3k failed for {url}: {str(e)}")
+            logger.info("newspaper3k failed for %s: %s", url, e)
             return None
     
-    def _scrape_with_requests(self, url: str, timeout: int = 30, basic_only: bool = False) -> Optional[Dict]:
+    def _scrape_with_requests(self, url: str, timeout: int = 30, basic_only: bool = False,
+                              deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
         """Fallback method using requests + BeautifulSoup with random headers"""
         try:
             headers = self.get_random_headers(url)
-            print(f"🔧 Using headers: {headers['User-Agent'][:50]}...")
+            logger.debug("Using headers: %.50s", headers['User-Agent'])
             
-            response = requests.get(url, headers=headers, timeout=timeout)
-            response.raise_for_status()
+            content = self._fetch(url, headers, timeout, deadline=deadline)
             
             # Check if we got meaningful content
-            if len(response.content) < 1000:
-                print(f"⚠️ Suspiciously small response: {len(response.content)} bytes")
-            
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract data
-            if basic_only:
-                content = self._extract_content(soup)
-                return {'content': content, 'url': url, 'method': 'requests_basic'}
-            else:
-                article_data = self._extract_article_data(soup, url)
-                article_data['method'] = 'requests_full'
-                return article_data
+            if len(content) < 1000:
+                logger.info("Suspiciously small response: %d bytes", len(content))
+            
+            return self._parse_html(content, url, basic_only, 'requests')
                 
         except requests.exceptions.RequestException as e:
-            print(f"🌐 Network error for {url}: {str(e)}")
+            logger.warning("Network error for %s: %s", url, e)
             return None
+        except NonHtmlContent:
+            raise
         except Exception as e:
-            print(f"❌ Error scraping with requests {url}: {str(e)}")
+            logger.warning("Error scraping with requests %s: %s", url, e)
             return None
     
+    def fetch_html(self, url: str, timeout: float = 30, deadline: Deadline = NO_DEADLINE) -> str:
+        """Capped, rate-limited page download for other components (e.g. journalist detection)"""
+        return self._fetch(url, self.get_random_headers(url), timeout, deadline=deadline)
+    
+    def _fetch(self, url: str, headers: Dict, timeout: float, head_only: bool = False,
+               deadline: Deadline = NO_DEADLINE) -> str:
+        """Stream an HTML page and return it decoded; raises NonHtmlContent for other content types.
+        
+        Reading stops at `max_bytes` (or at </head> with `head_only`), and the whole fetch is
+        aborted after `timeout` seconds in total: the requests timeout only bounds each
+        connect/read, so a server trickling bytes could otherwise hold a row indefinitely.
+        Waits for a free slot of the host's adaptive concurrency limit first.
+        """
+        with self.limiter.slot(f"host:{get_domain(url)}", deadline):
+            return self._fetch_body(url, headers, timeout, head_only)
+    
+    def _fetch_body(self, url: str, headers: Dict, timeout: float, head_only: bool) -> str:
+        started = time.monotonic()
+        limit = self.max_head_bytes if head_only else self.max_bytes
+        with self.session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            mime = content_type.split(';')[0].strip().lower()
+            if mime and mime not in HTML_CONTENT_TYPES:
+                perf.incr('fetch.non_html')
+                raise NonHtmlContent(f"{url} is {mime}")
+            
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=65536):
+                body += chunk
+                if head_only and bytes(body[-(len(chunk) + 7):]).lower().find(b'</head>') != -1:
+                    break
+                if len(body) >= limit:
+                    if not head_only:
+                        logger.info("Truncated %s at %d bytes", url, limit)
+                        perf.incr('fetch.truncated')
+                    break
+                if time.monotonic() - started > timeout:
+                    raise requests.exceptions.Timeout(f"Total fetch time exceeded {timeout:.0f}s")
+        return self._decode(bytes(body[:limit]), content_type)
+    
+    def _decode(self, body: bytes, content_type: str) -> str:
+        """Decode with the charset declared in the header or a <meta> tag, without sniffing the document"""
+        match = _HEADER_CHARSET_RE.search(content_type) or _META_CHARSET_RE.search(body[:4096])
+        charset = match.group(1) if match else 'utf-8'
+        if isinstance(charset, bytes):
+            charset = charset.decode('ascii', errors='ignore')
+        try:
+            return body.decode(charset, errors='replace')
+        except LookupError:
+            return body.decode('utf-8', errors='replace')
+    
+    def _title_from_head(self, head: str) -> Optional[str]:
+        soup = BeautifulSoup(head, 'html.parser')
+        for selector in ('meta[property="og:title"]', 'meta[name="twitter:title"]'):
+            element = soup.select_one(selector)
+            if element and len(element.get('content', '').strip()) > 5:
+                return element['content'].strip()
+        if soup.title and len(soup.title.get_text(strip=True)) > 5:
+            return soup.title.get_text(strip=True)
+        return None
+    
+    def _scrape_with_browser(self, url: str, timeout: int = 30, basic_only: bool = False,
+                             deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
+        """Last-resort method rendering the page in a pooled Playwright context"""
+        try:
+            with self.limiter.slot(f"host:{get_domain(url)}", deadline):
+                html = self.browser_pool.render(url, timeout)
+            if not html:
+                return None
+            return self._parse_html(html, url, basic_only, 'playwright')
+        except Exception as e:
+            logger.warning("Browser rendering failed for %s: %s", url, e)
+            return None
+    
+    def _parse_html(self, html, url: str, basic_only: bool, method: str) -> Dict:
+        # Parse with BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Extract data
+        if basic_only:
+            content = self._extract_content(soup)
+            return {'content': content, 'url': url, 'method': f'{method}_basic'}
+        else:
+            article_data = self._extract_article_data(soup, url)
+            article_data['method'] = f'{method}_full'
+            return article_data
+    
     def _extract_article_data(self, soup: BeautifulSoup, url: str) -> Dict:
         # Remove unwanted elements
         unwanted_elements = [
@@ -297,6 +590,7 @@ class NewsScraper:
             'url': url
         }
     
+    @perf.timed('extract_content')
     def _extract_content(self, soup: BeautifulSoup) -> str:
         # Try multiple selectors for article content (prioritized for Indonesian news sites)
         content_selectors = [
@@ -335,6 +629,7 @@ class NewsScraper:
         ]
         
         best_content = ""
+        debug = logger.isEnabledFor(logging.DEBUG)
         
         for selector in content_selectors:
             try:
@@ -355,14 +650,15 @@ class NewsScraper:
                     # Use the longest meaningful content
                     if len(text) > len(best_content) and len(text) > 200:
                         best_content = text
-                        print(f"📄 Found content with selector '{selector}': {len(text)} chars")
+                        if debug:
+                            logger.debug("Found content with selector %r: %d chars", selector, len(text))
             except Exception as e:
-                print(f"⚠️ Error with selector '{selector}': {e}")
+                logger.debug("Error with selector %r: %s", selector, e)
                 continue
         
         # If no good content found, try paragraph extraction
         if len(best_content) < 200:
-            print("🔍 Trying paragraph extraction...")
+            logger.debug("Trying paragraph extraction")
             paragraphs = soup.find_all('p')
             paragraph_texts = []
             
@@ -375,7 +671,7 @@ class NewsScraper:
             
             if paragraph_texts:
                 best_content = ' '.join(paragraph_texts)
-                print(f"📝 Paragraph extraction: {len(best_content)} chars")
+                logger.debug("Paragraph extraction: %d chars", len(best_content))
         
         # Clean the content
         if best_content:
@@ -1,42 +1,360 @@
 import google.generativeai as genai
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass, asdict
 import json
 import re
+import threading
+import time
+
+from lexicon_sentiment import LexiconSentimentScorer
+from perf_metrics import perf
+from log_setup import get_logger
+from deadline import Deadline, NO_DEADLINE
+from fingerprint import fingerprint
+from article_store import ArticleStore, cached_analyses, cached_analysis
+from adaptive_limiter import AdaptiveLimiter, limited
+
+logger = get_logger(__name__)
+
+# Backend yang tersedia: Gemini (AI), lexicon lokal (offline), atau hybrid
+SENTIMENT_BACKENDS = ('gemini', 'lexicon', 'hybrid')
+
+# Bump whenever the prompt or parsing changes so cached/incremental results are recomputed
+PROMPT_VERSION = 'sentiment-v3'
+
+# Distinct instruction blocks (contexts) kept as compiled models before the oldest are dropped
+MAX_COMPILED_PROMPTS = 32
+
+SENTIMENT_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'sentiment': {'type': 'STRING'},
+        'confidence': {'type': 'STRING'},
+        'reasoning': {'type': 'STRING'}
+    },
+    'required': ['sentiment', 'confidence', 'reasoning']
+}
+
+# One call per article for many entities: a list of per-entity results
+ENTITY_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'results': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'entity': {'type': 'STRING'},
+                    'sentiment': {'type': 'STRING'},
+                    'confidence': {'type': 'STRING'},
+                    'reasoning': {'type': 'STRING'}
+                },
+                'required': ['entity', 'sentiment', 'confidence', 'reasoning']
+            }
+        }
+    },
+    'required': ['results']
+}
+
+# Several articles in one call: one result per article, tied back by its index
+BATCH_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'results': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'index': {'type': 'INTEGER'},
+                    'sentiment': {'type': 'STRING'},
+                    'confidence': {'type': 'STRING'},
+                    'reasoning': {'type': 'STRING'}
+                },
+                'required': ['index', 'sentiment', 'confidence', 'reasoning']
+            }
+        }
+    },
+    'required': ['results']
+}
+
+RETRY_INSTRUCTION = "\n\nPENTING: Jawab HANYA dengan satu objek JSON valid sesuai struktur yang diminta, tanpa teks lain."
+
+CONFIDENCE_ALIASES = {
+    'tinggi': 'tinggi', 'high': 'tinggi',
+    'sedang': 'sedang', 'medium': 'sedang', 'moderate': 'sedang',
+    'rendah': 'rendah', 'low': 'rendah'
+}
+
+# Ascending
+CONFIDENCE_LEVELS = ('rendah', 'sedang', 'tinggi')
+
+
+@dataclass
+class SentimentResult:
+    sentiment: str
+    confidence: str
+    reasoning: str
+    backend: str = 'gemini'
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SentimentResult':
+        if not isinstance(data, dict):
+            raise ValueError("Sentiment response is not a JSON object")
+        sentiment = data.get('sentiment')
+        if not isinstance(sentiment, str) or not sentiment.strip():
+            raise ValueError("Missing 'sentiment' field")
+        confidence = str(data.get('confidence', '')).strip().lower()
+        return cls(
+            sentiment=sentiment.strip().lower(),
+            confidence=CONFIDENCE_ALIASES.get(confidence, 'rendah'),
+            reasoning=str(data.get('reasoning', '')).strip()
+        )
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
 
 class SentimentAnalyzer:
     def __init__(self):
         self.api_key = None
         self.model = None
+        self.model_name = 'gemini-2.5-flash'
+        self.backend = 'gemini'
+        self.lexicon = LexiconSentimentScorer()
+        # Hybrid mode escalates these lexicon confidences to Gemini
+        self.escalate_confidence = {'rendah'}
+        self.parse_stats = {'ok': 0, 'repaired': 0, 'retried': 0, 'failed': 0}
+        # Upper bound (seconds) for a single Gemini request
+        self.request_timeout = 60
+        # Shared store of earlier results; None disables reuse
+        self.store: Optional[ArticleStore] = None
+        # Adaptive concurrency limit for Gemini calls; None leaves them unlimited
+        self.limiter: Optional[AdaptiveLimiter] = None
+        # Models carrying a static instruction block as system instruction, keyed by (prompt kind, context)
+        self._models: Dict[tuple, genai.GenerativeModel] = {}
+        # Rows are analyzed from several threads; guards parse_stats and the compiled models
+        self._lock = threading.Lock()
+    
+    def set_backend(self, backend: str):
+        if backend not in SENTIMENT_BACKENDS:
+            raise ValueError(f"Unknown sentiment backend: {backend}")
+        self.backend = backend
+    
+    def needs_model(self) -> bool:
+        return self.backend in ('gemini', 'hybrid')
     
     def set_api_key(self, api_key: str):
         self.api_key = api_key
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = genai.GenerativeModel(self.model_name)
+        with self._lock:
+            self._models = {}
+    
+    def _model_for(self, key: tuple, build_instruction: Callable[[], str]) -> genai.GenerativeModel:
+        """Model whose system instruction is the static part of the prompt, built once and reused for every article"""
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if len(self._models) >= MAX_COMPILED_PROMPTS:
+                    self._models.pop(next(iter(self._models)))
+                model = genai.GenerativeModel(self.model_name, system_instruction=build_instruction())
+                self._models[key] = model
+            return model
+    
+    def analysis_fingerprint(self, content: str, context: str, entities: Optional[List[str]] = None) -> str:
+        """Identifies a sentiment result by everything it depends on"""
+        model = self.model_name if self.needs_model() else None
+        return fingerprint('sentiment', PROMPT_VERSION, self.backend, model, context, entities or [], content)
+    
+    @perf.timed('sentiment')
+    def analyze_sentiment(self, content: str, context: str, deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
+        return cached_analysis(
+            self.store, 'sentiment', self.analysis_fingerprint(content, context),
+            lambda: self._analyze_sentiment(content, context, deadline)
+        )
     
-    def analyze_sentiment(self, content: str, context: str) -> Optional[Dict]:
+    def _analyze_sentiment(self, content: str, context: str, deadline: Deadline) -> Optional[Dict]:
+        if self.backend == 'lexicon':
+            return self.lexicon.score(content, context)
+        
+        if self.backend == 'hybrid':
+            result = self.lexicon.score(content, context)
+            if result['confidence'] not in self.escalate_confidence or not self.model:
+                return result
+            return self._analyze_with_gemini(content, context, deadline) or result
+        
+        return self._analyze_with_gemini(content, context, deadline)
+    
+    @perf.timed('sentiment')
+    def analyze_batch(self, contents: List[str], context: str, deadline: Deadline = NO_DEADLINE) -> List[Optional[Dict]]:
+        """Analyze many articles; lexicon scoring runs in one pass, articles needing Gemini share one call"""
+        return cached_analyses(
+            self.store, 'sentiment', [self.analysis_fingerprint(content, context) for content in contents],
+            lambda missing: self._analyze_batch([contents[idx] for idx in missing], context, deadline)
+        )
+    
+    def _analyze_batch(self, contents: List[str], context: str, deadline: Deadline) -> List[Optional[Dict]]:
+        if self.backend == 'gemini':
+            return self._analyze_batch_with_gemini(contents, context, deadline)
+        
+        results = self.lexicon.score_batch(contents, context)
+        if self.backend == 'hybrid' and self.model:
+            escalate = [idx for idx, result in enumerate(results) if result['confidence'] in self.escalate_confidence]
+            if escalate:
+                escalated = self._analyze_batch_with_gemini([contents[idx] for idx in escalate], context, deadline)
+                for idx, result in zip(escalate, escalated):
+                    results[idx] = result or results[idx]
+        return results
+    
+    def _analyze_batch_with_gemini(self, contents: List[str], context: str, deadline: Deadline) -> List[Optional[Dict]]:
+        if not self.model:
+            return [None] * len(contents)
+        if len(contents) == 1:
+            return [self._analyze_with_gemini(contents[0], context, deadline)]
+        
+        results: List[Optional[Dict]] = [None] * len(contents)
+        try:
+            model = self._model_for(('sentiment_batch', context), lambda: self._sentiment_batch_instruction(context))
+            prompt = self._create_batch_prompt(contents)
+            parsed = self._parse_batch_response(self._generate(prompt, deadline, BATCH_SCHEMA, model), len(contents))
+            for idx, result in parsed.items():
+                results[idx] = result.to_dict()
+        except Exception as e:
+            logger.warning("Error analyzing sentiment batch: %s", e)
+        
+        # Articles the model skipped get their own call
+        for idx, result in enumerate(results):
+            if result is None:
+                perf.incr('sentiment.batch_fallback')
+                results[idx] = self._analyze_with_gemini(contents[idx], context, deadline)
+        return results
+    
+    @perf.timed('sentiment')
+    def analyze_entities(self, content: str, context: str, entities: List[str],
+                         deadline: Deadline = NO_DEADLINE) -> Dict[str, Optional[Dict]]:
+        """Sentiment towards each entity, from a single pass over the article"""
+        return cached_analysis(
+            self.store, 'sentiment_entities', self.analysis_fingerprint(content, context, entities),
+            lambda: self._analyze_entities(content, context, entities, deadline),
+            complete=lambda results: all(results.values())
+        )
+    
+    def _analyze_entities(self, content: str, context: str, entities: List[str],
+                          deadline: Deadline) -> Dict[str, Optional[Dict]]:
+        if self.backend == 'lexicon':
+            return {entity: self.lexicon.score(content, entity) for entity in entities}
+        
+        results: Dict[str, Optional[Dict]] = {entity: None for entity in entities}
+        pending = list(entities)
+        if self.backend == 'hybrid':
+            for entity in entities:
+                results[entity] = self.lexicon.score(content, entity)
+            if not self.model:
+                return results
+            pending = [entity for entity in entities if results[entity]['confidence'] in self.escalate_confidence]
+        
+        if pending:
+            for entity, result in self._analyze_entities_with_gemini(content, context, pending, deadline).items():
+                results[entity] = result or results[entity]
+        return results
+    
+    def _analyze_entities_with_gemini(self, content: str, context: str, entities: List[str],
+                                      deadline: Deadline) -> Dict[str, Optional[Dict]]:
+        results: Dict[str, Optional[Dict]] = {entity: None for entity in entities}
+        if not self.model:
+            return results
+        
+        try:
+            model = self._model_for(('entities', context), lambda: self._entity_instruction(context))
+            prompt = self._create_entity_prompt(content, entities)
+            parsed = self._parse_entity_response(self._generate(prompt, deadline, ENTITY_SCHEMA, model), entities)
+            
+            missing = [entity for entity in entities if entity not in parsed]
+            if missing:
+                # Single targeted retry for just the entities the model skipped
+                self._count('retried')
+                perf.incr('sentiment.parse_retry')
+                prompt = self._create_entity_prompt(content, missing) + RETRY_INSTRUCTION
+                parsed.update(self._parse_entity_response(self._generate(prompt, deadline, ENTITY_SCHEMA, model), missing))
+            
+            for entity in entities:
+                if entity in parsed:
+                    results[entity] = parsed[entity].to_dict()
+                else:
+                    self._count('failed')
+                    perf.incr('sentiment.parse_failed')
+            return results
+            
+        except Exception as e:
+            logger.warning("Error analyzing entity sentiment: %s", e)
+            return results
+    
+    def _analyze_with_gemini(self, content: str, context: str, deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
         if not self.model:
             return None
         
         try:
-            prompt = self._create_sentiment_prompt(content, context)
-            response = self.model.generate_content(prompt)
+            model = self._model_for(('sentiment', context), lambda: self._sentiment_instruction(context))
+            prompt = self._create_sentiment_prompt(content)
+            response_text = self._generate(prompt, deadline, model=model)
             
             # Parse response
-            return self._parse_sentiment_response(response.text)
+            result = self._parse_sentiment_response(response_text)
+            if result is None:
+                # Single targeted retry for just this item
+                self._count('retried')
+                perf.incr('sentiment.parse_retry')
+                response_text = self._generate(prompt + RETRY_INSTRUCTION, deadline, model=model)
+                result = self._parse_sentiment_response(response_text)
+            
+            if result is None:
+                self._count('failed')
+                perf.incr('sentiment.parse_failed')
+                logger.warning("Unparseable sentiment response: %.100r", response_text)
+                return None
+            
+            return result.to_dict()
             
         except Exception as e:
-            print(f"Error analyzing sentiment: {str(e)}")
+            logger.warning("Error analyzing sentiment: %s", e)
             return None
     
-    def _create_sentiment_prompt(self, content: str, context: str) -> str:
-        prompt = f"""
-        Analisis artikel berita berikut berdasarkan konteks yang diberikan.
+    def _generate(self, prompt: str, deadline: Deadline = NO_DEADLINE, schema: Dict = SENTIMENT_SCHEMA,
+                  model: Optional[genai.GenerativeModel] = None) -> str:
+        with limited(self.limiter, f"llm:{self.model_name}", deadline):
+            started = time.perf_counter()
+            response = (model or self.model).generate_content(
+                prompt,
+                generation_config={
+                    'response_mime_type': 'application/json',
+                    'response_schema': schema
+                },
+                request_options={'timeout': deadline.timeout(self.request_timeout)}
+            )
+        perf.record_llm('sentiment', time.perf_counter() - started, response)
+        try:
+            return response.text
+        except ValueError:
+            # Blocked or empty candidates
+            return ''
+    
+    def get_parse_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.parse_stats)
+    
+    def _count(self, outcome: str):
+        with self._lock:
+            self.parse_stats[outcome] += 1
+    
+    # The instruction blocks are sent once per model as system instruction; only the
+    # article (and entity list) goes into each request
+    
+    def _sentiment_instruction(self, context: str) -> str:
+        return f"""
+        Analisis artikel berita yang diberikan berdasarkan konteks yang diberikan.
         
         KONTEKS: {context}
         
-        ARTIKEL:
-        {content[:3000]}  # Limit content to avoid token limits
-        
         Berikan analisis dalam format JSON dengan struktur berikut:
         {{
             "sentiment": "klasifikasi kategori berdasarkan konteks yang diberikan",
@@ -46,30 +364,169 @@ class SentimentAnalyzer:
         
         Fokus analisis hanya pada konteks yang diberikan. Jika konteks tidak ditemukan dalam artikel, berikan sentimen "tidak terkait".
         """
+    
+    def _create_sentiment_prompt(self, content: str) -> str:
+        # Limit content to avoid token limits
+        return f"ARTIKEL:\n{content[:3000]}"
+    
+    def _sentiment_batch_instruction(self, context: str) -> str:
+        return self._sentiment_instruction(context) + """
+        Beberapa artikel diberikan sekaligus, masing-masing diawali "ARTIKEL [n]". Analisis setiap artikel secara
+        terpisah dan kembalikan {"results": [...]} berisi tepat satu objek per artikel dengan field "index" (n)
+        ditambah field di atas.
+        """
+    
+    def _create_batch_prompt(self, contents: List[str]) -> str:
+        return "\n\n".join(f"ARTIKEL [{idx}]:\n{content[:3000]}" for idx, content in enumerate(contents))
+    
+    def _entity_instruction(self, context: str) -> str:
+        return f"""
+        Analisis artikel berita yang diberikan untuk SETIAP entitas dalam daftar ENTITAS, berdasarkan konteks yang diberikan.
+        
+        KONTEKS: {context or '-'}
+        
+        Berikan analisis dalam format JSON dengan struktur berikut:
+        {{
+            "results": [
+                {{
+                    "entity": "nama entitas persis seperti pada daftar",
+                    "sentiment": "klasifikasi kategori terhadap entitas tersebut berdasarkan konteks",
+                    "confidence": "tinggi/sedang/rendah",
+                    "reasoning": "penjelasan singkat mengapa sentimen tersebut dipilih"
+                }}
+            ]
+        }}
+        
+        Berikan tepat satu hasil untuk setiap entitas. Jika entitas tidak disebut dalam artikel, berikan sentimen "tidak terkait".
+        """
+    
+    def _create_entity_prompt(self, content: str, entities: List[str]) -> str:
+        entity_lines = "\n".join(f"- {entity}" for entity in entities)
+        return f"ENTITAS:\n{entity_lines}\n\nARTIKEL:\n{content[:3000]}"
+    
+    def _parse_entity_response(self, response_text: str, entities: List[str]) -> Dict[str, SentimentResult]:
+        """Per-entity results keyed by the requested entity names; unusable items are left out"""
+        if not response_text:
+            return {}
+        
+        try:
+            data = json.loads(response_text)
+        except ValueError:
+            repaired = _repair_json(response_text)
+            try:
+                data = json.loads(repaired) if repaired else None
+            except ValueError:
+                data = None
+            if data is not None:
+                self._count('repaired')
+        
+        items = data.get('results') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return {}
         
-        return prompt
+        by_name = {entity.strip().lower(): entity for entity in entities}
+        parsed = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            entity = by_name.get(str(item.get('entity', '')).strip().lower())
+            if entity is None or entity in parsed:
+                continue
+            try:
+                parsed[entity] = SentimentResult.from_dict(item)
+                self._count('ok')
+            except ValueError:
+                continue
+        return parsed
     
-    def _parse_sentiment_response(self, response_text: str) -> Dict:
+    def _parse_batch_response(self, response_text: str, count: int) -> Dict[int, SentimentResult]:
+        """Per-article results keyed by index; unusable or out-of-range items are left out"""
+        data = _load_json(response_text)
+        items = data.get('results') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return {}
+        
+        parsed = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                idx = int(item.get('index'))
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= idx < count or idx in parsed:
+                continue
+            try:
+                parsed[idx] = SentimentResult.from_dict(item)
+                self._count('ok')
+            except ValueError:
+                continue
+        return parsed
+    
+    def _parse_sentiment_response(self, response_text: str) -> Optional[SentimentResult]:
+        if not response_text:
+            return None
+        
         try:
-            # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                return json.loads(json_str)
-            else:
-                # Fallback parsing
-                sentiment = "netral"
-                confidence = "rendah"
-                reasoning = response_text
-                
-                return {
-                    "sentiment": sentiment,
-                    "confidence": confidence,
-                    "reasoning": reasoning
-                }
-        except:
-            return {
-                "sentiment": "netral",
-                "confidence": "rendah",
-                "reasoning": "Gagal menganalisis sentimen"
-            }
+            result = SentimentResult.from_dict(json.loads(response_text))
+            self._count('ok')
+            return result
+        except (ValueError, TypeError):
+            pass
+        
+        # Cheap targeted repair: strip fences, take the first balanced object, drop trailing commas
+        repaired = _repair_json(response_text)
+        if repaired is None:
+            return None
+        try:
+            result = SentimentResult.from_dict(json.loads(repaired))
+            self._count('repaired')
+            return result
+        except (ValueError, TypeError):
+            return None
+
+
+def _load_json(response_text: str) -> Optional[object]:
+    """Parse a JSON response, falling back to the cheap repair; None when unusable"""
+    if not response_text:
+        return None
+    try:
+        return json.loads(response_text)
+    except ValueError:
+        repaired = _repair_json(response_text)
+        try:
+            return json.loads(repaired) if repaired else None
+        except ValueError:
+            return None
+
+
+def _repair_json(text: str) -> Optional[str]:
+    text = text.strip()
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text)
+    text = text.replace('\u201c', '"').replace('\u201d', '"')
+    
+    start = text.find('{')
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for idx in range(start, len(text)):
+        char = text[idx]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return re.sub(r',\s*([}\]])', r'\1', text[start:idx + 1])
+    return None
@@ -0,0 +1,380 @@
+"""HTTP/JSON analysis service: the pipeline without the Streamlit UI.
+
+    python service.py --port 8502
+
+Endpoints (POST, JSON body -> {"result": ...} or {"error": ...}):
+    /scrape      {"url", "timeout"?, "basic_only"?}
+    /sentiment   {"content", "context", "entities"?}
+    /summarize   {"content", "config"?}
+    /journalist  {"url", "content"?}
+GET /health returns batching and store statistics, and the pipeline counters of the
+current and previous metrics window.
+
+Upstream timeouts are answered with 504 and domains whose circuit is open with 503 and a
+Retry-After header; invalid requests get 400.
+
+Requests run on an asyncio server; the blocking pipeline runs on a shared thread pool
+with one scraper/analyzer set (and their browser pool, limiter and store) for all
+clients. Concurrent sentiment/summary requests with the same context or summary config
+are coalesced by a MicroBatcher into one model call.
+"""
+import argparse
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from scraper import NewsScraper
+from sentiment_analyzer import SentimentAnalyzer
+from journalist_detector import JournalistDetector
+from summarizer import ArticleSummarizer
+from article_store import ArticleStore
+from config import GEMINI_API_KEY
+from deadline import Deadline, DeadlineExceeded
+from circuit_breaker import CircuitOpen
+from log_setup import configure_logging, get_logger, set_correlation_id
+from perf_metrics import perf
+
+logger = get_logger(__name__)
+
+MAX_BODY_BYTES = 5 * 1024 * 1024
+
+# The shared perf recorder is rolled over this often, so a long-running service stays bounded
+METRICS_WINDOW = 300
+
+DEFAULT_SUMMARY_CONFIG = {
+    'summary_type': 'Ringkas',
+    'max_length': 150,
+    'language': 'Bahasa Indonesia',
+    'focus_aspect': ''
+}
+
+
+class RequestError(Exception):
+    def __init__(self, message: str, status: HTTPStatus = HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests with the same key into one `process(key, items)` call.
+
+    A batch is sent when it reaches `max_batch` items or `window` seconds after its first
+    item arrived, whichever comes first; `process` runs on `executor` and returns one
+    result per item, in order.
+    """
+
+    def __init__(self, process: Callable[[Hashable, List], List], executor: ThreadPoolExecutor,
+                 window: float = 0.02, max_batch: int = 8):
+        self.process = process
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = {'batches': 0, 'items': 0, 'largest': 0}
+        self._pending: Dict[Hashable, List[Tuple[object, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+
+    async def submit(self, key: Hashable, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((item, future))
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        return await future
+
+    def _flush(self, key: Hashable):
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        self.stats['batches'] += 1
+        self.stats['items'] += len(batch)
+        self.stats['largest'] = max(self.stats['largest'], len(batch))
+        asyncio.ensure_future(self._run(key, batch))
+
+    async def _run(self, key: Hashable, batch: List[Tuple[object, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.process, key, [item for item, _ in batch])
+        except (Exception, DeadlineExceeded, CircuitOpen) as e:
+            # Every waiter gets the batch's failure; dispatch maps it to the HTTP status
+            self._fail(batch, e)
+            return
+        except BaseException as e:
+            # Cancellation or interpreter shutdown: answer the waiters, then let it propagate
+            self._fail(batch, RequestError("Service shutting down", HTTPStatus.SERVICE_UNAVAILABLE))
+            raise
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[object, asyncio.Future]], error: BaseException):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+
+class AnalysisService:
+    def __init__(self, workers: int = 32, batch_window: float = 0.02, max_batch: int = 8,
+                 request_budget: float = 120, use_store: bool = True, metrics_window: float = METRICS_WINDOW):
+        self.request_budget = request_budget
+        self.metrics_window = metrics_window
+        self._previous_counters: Dict[str, int] = {}
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='service')
+
+        # One set of clients shared by every request
+        self.scraper = NewsScraper()
+        self.sentiment_analyzer = SentimentAnalyzer()
+        self.summarizer = ArticleSummarizer()
+        self.journalist_detector = JournalistDetector()
+        store = ArticleStore() if use_store else None
+        self.scraper.article_store = store
+        self.sentiment_analyzer.store = store
+        self.summarizer.store = store
+        self.journalist_detector.store = store
+        self.journalist_detector.breaker = self.scraper.breaker
+        self.journalist_detector.scraper = self.scraper
+        self.sentiment_analyzer.limiter = self.scraper.limiter
+        self.summarizer.limiter = self.scraper.limiter
+        if GEMINI_API_KEY and GEMINI_API_KEY != "YOUR_GEMINI_API_KEY_HERE":
+            self.sentiment_analyzer.set_api_key(GEMINI_API_KEY)
+            self.summarizer.set_api_key(GEMINI_API_KEY)
+
+        self.sentiment_batcher = MicroBatcher(self._sentiment_batch, self.executor, batch_window, max_batch)
+        self.summary_batcher = MicroBatcher(self._summary_batch, self.executor, batch_window, max_batch)
+        self.routes = {
+            '/scrape': self.scrape,
+            '/sentiment': self.sentiment,
+            '/summarize': self.summarize,
+            '/journalist': self.journalist
+        }
+
+    # Operations
+
+    async def scrape(self, body: Dict):
+        url = _required(body, 'url')
+        timeout = _timeout(body, 30)
+        basic_only = bool(body.get('basic_only', False))
+        return await self._run_blocking(
+            lambda deadline: self.scraper.scrape_article_sync(url, timeout, basic_only, deadline)
+        )
+
+    async def sentiment(self, body: Dict):
+        content = _required(body, 'content')
+        context = body.get('context') or ''
+        entities = body.get('entities')
+        if entities:
+            if not isinstance(entities, list) or not all(isinstance(e, str) and e.strip() for e in entities):
+                raise RequestError("'entities' must be a list of non-empty strings")
+            return await self._run_blocking(
+                lambda deadline: self.sentiment_analyzer.analyze_entities(content, context, entities, deadline)
+            )
+        if not context:
+            raise RequestError("'context' or 'entities' is required")
+        return await self.sentiment_batcher.submit(context, content)
+
+    async def summarize(self, body: Dict):
+        content = _required(body, 'content')
+        config = {**DEFAULT_SUMMARY_CONFIG, **(body.get('config') or {})}
+        return await self.summary_batcher.submit(json.dumps(config, sort_keys=True), content)
+
+    async def journalist(self, body: Dict):
+        url = _required(body, 'url')
+        content = body.get('content') or ''
+        return await self._run_blocking(
+            lambda deadline: self.journalist_detector.detect_journalist(url, content, 30, deadline)
+        )
+
+    def health(self) -> Dict:
+        store = self.scraper.article_store
+        return {
+            'batching': {'sentiment': self.sentiment_batcher.stats, 'summary': self.summary_batcher.stats},
+            'store': store.stats() if store else None,
+            'circuits': self.scraper.breaker.snapshot(),
+            'counters': perf.report()['counters'],
+            'previous_counters': self._previous_counters
+        }
+
+    def roll_metrics(self):
+        """Start a new metrics window; timings and counters otherwise grow for the life of the process"""
+        self._previous_counters = perf.report()['counters']
+        perf.reset()
+
+    async def _roll_metrics_periodically(self):
+        while True:
+            await asyncio.sleep(self.metrics_window)
+            self.roll_metrics()
+
+    def _sentiment_batch(self, context: str, contents: List[str]) -> List[Optional[Dict]]:
+        return self.sentiment_analyzer.analyze_batch(contents, context, Deadline(self.request_budget))
+
+    def _summary_batch(self, config_key: str, contents: List[str]) -> List[Optional[Dict]]:
+        return self.summarizer.summarize_batch(contents, json.loads(config_key), Deadline(self.request_budget))
+
+    async def _run_blocking(self, work: Callable[[Deadline], object]):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, work, Deadline(self.request_budget))
+
+    # HTTP
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload, extra_headers = await self.dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                _write_response(writer, status, payload, keep_alive, extra_headers)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except RequestError as e:
+            _write_response(writer, e.status, {'error': str(e)}, False)
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, Dict, Dict[str, str]]:
+        """Status, JSON payload and extra response headers for one request"""
+        set_correlation_id()
+        path = path.split('?', 1)[0]
+        try:
+            if path == '/health' and method == 'GET':
+                return HTTPStatus.OK, self.health(), {}
+            handler = self.routes.get(path)
+            if handler is None:
+                raise RequestError(f"Unknown endpoint {path}", HTTPStatus.NOT_FOUND)
+            if method != 'POST':
+                raise RequestError("Use POST", HTTPStatus.METHOD_NOT_ALLOWED)
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                raise RequestError("Body must be JSON")
+            if not isinstance(payload, dict):
+                raise RequestError("Body must be a JSON object")
+            return HTTPStatus.OK, {'result': await handler(payload)}, {}
+        except RequestError as e:
+            return e.status, {'error': str(e)}, {}
+        except DeadlineExceeded:
+            return HTTPStatus.GATEWAY_TIMEOUT, {'error': 'Waktu habis (timeout)'}, {}
+        except CircuitOpen as e:
+            retry_after = max(1, math.ceil(self.scraper.breaker.retry_after(e.domain)))
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': str(e)}, {'Retry-After': str(retry_after)}
+        except Exception as e:
+            logger.exception("Request to %s failed", path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}, {}
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.warning("Analysis service listening on %s:%d", host, port)
+        roller = asyncio.ensure_future(self._roll_metrics_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            roller.cancel()
+
+    def close(self):
+        self.scraper.save_state()
+        self.executor.shutdown(wait=False)
+
+
+def _required(body: Dict, field: str) -> str:
+    value = body.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise RequestError(f"'{field}' is required")
+    return value
+
+
+def _timeout(body: Dict, default: float) -> float:
+    value = body.get('timeout', default)
+    try:
+        # float(True) works, but a bool is not a number of seconds
+        timeout = math.nan if isinstance(value, bool) else float(value)
+    except (TypeError, ValueError):
+        timeout = math.nan
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise RequestError("'timeout' must be a positive number of seconds")
+    return timeout
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise RequestError("Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise RequestError("Invalid Content-Length")
+    if length < 0:
+        raise RequestError("Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise RequestError("Body too large", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, headers, body
+
+
+def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Dict, keep_alive: bool,
+                    extra_headers: Optional[Dict[str, str]] = None):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        + ''.join(f"{name}: {value}\r\n" for name, value in (extra_headers or {}).items())
+        + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode('latin-1') + body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--workers', type=int, default=32, help='Threads for scraping and model calls')
+    parser.add_argument('--batch-window-ms', type=float, default=20, help='How long a batch waits for more requests')
+    parser.add_argument('--max-batch', type=int, default=8, help='Articles per batched model call (1 disables batching)')
+    parser.add_argument('--request-budget', type=float, default=120, help='Seconds per request across all stages')
+    parser.add_argument('--no-store', action='store_true', help='Do not use the shared article store')
+    parser.add_argument('--metrics-window', type=float, default=METRICS_WINDOW,
+                        help='Seconds per window of the counters reported by /health')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    configure_logging(args.log_level)
+    service = AnalysisService(args.workers, args.batch_window_ms / 1000, args.max_batch,
+                              args.request_budget, not args.no_store, args.metrics_window)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
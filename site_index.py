@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from deadline import Deadline, NO_DEADLINE
+from domain_stats import CACHE_DIR
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(CACHE_DIR, 'site_index.json')
+
+# Sitemap locations tried when robots.txt doesn't list a news sitemap
+NEWS_SITEMAP_PATHS = ('/sitemap-news.xml', '/sitemap_news.xml', '/news-sitemap.xml')
+MAX_SITEMAPS_PER_HOST = 3
+
+
+def get_origin(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme or 'https'}://{parsed.netloc.lower()}"
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_sitemap(content: bytes) -> Dict[str, object]:
+    """Parse a sitemap or sitemap index.
+
+    Returns {'sitemaps': [child sitemap URLs], 'entries': {url: {title, publication_date, lastmod}}}
+    """
+    root = ET.fromstring(content)
+    result = {'sitemaps': [], 'entries': {}}
+
+    if _local_name(root.tag) == 'sitemapindex':
+        for node in root:
+            loc = next((child.text for child in node if _local_name(child.tag) == 'loc'), None)
+            if loc:
+                result['sitemaps'].append(loc.strip())
+        return result
+
+    for node in root:
+        if _local_name(node.tag) != 'url':
+            continue
+        entry = {'title': '', 'publication_date': '', 'lastmod': ''}
+        loc = None
+        for element in node.iter():
+            name = _local_name(element.tag)
+            text = (element.text or '').strip()
+            if name == 'loc' and loc is None:
+                loc = text
+            elif name in entry and text:
+                entry[name] = text
+        if loc:
+            # News sitemaps often carry only the publication date
+            entry['lastmod'] = entry['lastmod'] or entry['publication_date']
+            result['entries'][loc] = entry
+    return result
+
+
+class SiteIndex:
+    """Per-host cache of robots.txt rules and news sitemap metadata, persisted across runs.
+
+    Also spaces out requests to the same host by its crawl-delay (or the caller's
+    politeness delay) instead of sleeping before every request.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, robots_ttl: float = 24 * 3600,
+                 sitemap_ttl: float = 15 * 60, fetch_timeout: float = 10,
+                 user_agent: str = 'Mozilla/5.0 (compatible; NewsAnalyzer/1.0)'):
+        self.path = path
+        self.robots_ttl = robots_ttl
+        self.sitemap_ttl = sitemap_ttl
+        self.fetch_timeout = fetch_timeout
+        self.user_agent = user_agent
+        self._robots: Dict[str, Dict] = {}
+        self._sitemaps: Dict[str, Dict] = {}
+        self._parsers: Dict[str, RobotFileParser] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._host_locks: Dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self._robots = data.get('robots', {})
+            self._sitemaps = data.get('sitemaps', {})
+        except (OSError, ValueError):
+            self._robots = {}
+            self._sitemaps = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.dumps({'robots': self._robots, 'sitemaps': self._sitemaps})
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.path)
+
+    def _host_lock(self, origin: str) -> threading.RLock:
+        with self._lock:
+            return self._host_locks.setdefault(origin, threading.RLock())
+
+    def _get(self, url: str, deadline: Deadline) -> Optional[requests.Response]:
+        try:
+            return requests.get(url, headers={'User-Agent': self.user_agent},
+                                timeout=deadline.timeout(self.fetch_timeout))
+        except requests.exceptions.RequestException as e:
+            logger.info("Could not fetch %s: %s", url, e)
+            return None
+
+    # robots.txt
+
+    def _robots_entry(self, origin: str, deadline: Deadline) -> Dict:
+        entry = self._robots.get(origin)
+        if entry and time.time() - entry['fetched_at'] < self.robots_ttl:
+            return entry
+
+        with self._host_lock(origin):
+            entry = self._robots.get(origin)
+            if entry and time.time() - entry['fetched_at'] < self.robots_ttl:
+                return entry
+
+            response = self._get(f"{origin}/robots.txt", deadline)
+            if response is None:
+                # Unreachable: allow, but retry sooner than a normal refresh
+                entry = {'fetched_at': time.time() - self.robots_ttl + 600, 'status': 0, 'text': ''}
+            else:
+                entry = {'fetched_at': time.time(), 'status': response.status_code,
+                         'text': response.text if response.ok else ''}
+            with self._lock:
+                self._robots[origin] = entry
+                self._parsers.pop(origin, None)
+                self._dirty = True
+        return entry
+
+    def _parser(self, origin: str, deadline: Deadline) -> RobotFileParser:
+        entry = self._robots_entry(origin, deadline)
+        parser = self._parsers.get(origin)
+        if parser is None:
+            parser = RobotFileParser()
+            # Same semantics as RobotFileParser.read(): 401/403 disallow all, other errors allow all
+            if entry['status'] in (401, 403):
+                parser.disallow_all = True
+            elif 200 <= entry['status'] < 300:
+                parser.parse(entry['text'].splitlines())
+            else:
+                parser.allow_all = True
+            # can_fetch() refuses everything until the parser is marked as loaded
+            parser.modified()
+            self._parsers[origin] = parser
+        return parser
+
+    def can_fetch(self, url: str, deadline: Deadline = NO_DEADLINE) -> bool:
+        return self._parser(get_origin(url), deadline).can_fetch('*', url)
+
+    def crawl_delay(self, url: str, deadline: Deadline = NO_DEADLINE) -> float:
+        parser = self._parser(get_origin(url), deadline)
+        delay = parser.crawl_delay('*')
+        if delay is None:
+            rate = parser.request_rate('*')
+            delay = rate.seconds / rate.requests if rate else 0
+        return float(delay or 0)
+
+    def robots_sitemaps(self, url: str, deadline: Deadline = NO_DEADLINE) -> List[str]:
+        return self._parser(get_origin(url), deadline).site_maps() or []
+
+    # Per-host scheduling
+
+    def wait_turn(self, url: str, min_interval: float = 0, deadline: Deadline = NO_DEADLINE):
+        """Block until the host may be requested again; the gap is the larger of crawl-delay and `min_interval`"""
+        origin = get_origin(url)
+        interval = max(self.crawl_delay(url, deadline), min_interval)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(origin, 0))
+            self._next_slot[origin] = slot + interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(min(wait, max(0.0, deadline.remaining())))
+
+    # News sitemaps
+
+    def lookup(self, url: str, deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
+        """Sitemap metadata (title, publication_date, lastmod) for `url`, or None if not listed"""
+        origin = get_origin(url)
+        entries = self._sitemap_entries(origin, deadline)
+        return entries.get(url) or entries.get(url.rstrip('/'))
+
+    def _sitemap_entries(self, origin: str, deadline: Deadline) -> Dict[str, Dict]:
+        cached = self._sitemaps.get(origin)
+        if cached and time.time() - cached['fetched_at'] < self.sitemap_ttl:
+            return cached['entries']
+
+        with self._host_lock(origin):
+            cached = self._sitemaps.get(origin)
+            if cached and time.time() - cached['fetched_at'] < self.sitemap_ttl:
+                return cached['entries']
+
+            entries = self._fetch_news_sitemaps(origin, deadline)
+            with self._lock:
+                self._sitemaps[origin] = {'fetched_at': time.time(), 'entries': entries}
+                self._dirty = True
+        return entries
+
+    def _fetch_news_sitemaps(self, origin: str, deadline: Deadline) -> Dict[str, Dict]:
+        listed = [u for u in self.robots_sitemaps(origin + '/', deadline) if 'news' in u.lower()]
+        queue = listed or [origin + path for path in NEWS_SITEMAP_PATHS]
+        entries: Dict[str, Dict] = {}
+        fetched = 0
+
+        while queue and fetched < MAX_SITEMAPS_PER_HOST:
+            sitemap_url = queue.pop(0)
+            if deadline.expired():
+                break
+            self.wait_turn(sitemap_url, 0, deadline)
+            response = self._get(sitemap_url, deadline)
+            if response is None or not response.ok:
+                continue
+            fetched += 1
+            try:
+                parsed = parse_sitemap(response.content)
+            except ET.ParseError as e:
+                logger.info("Invalid sitemap %s: %s", sitemap_url, e)
+                continue
+            entries.update(parsed['entries'])
+            queue = [u for u in parsed['sitemaps'] if 'news' in u.lower()] + queue
+            if entries and not listed:
+                # The first conventional location that works is enough
+                break
+
+        logger.info("%d sitemap entries for %s", len(entries), origin)
+        return entries
@@ -1,43 +1,240 @@
 import google.generativeai as genai
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
 import json
-import re
+import threading
+import time
+
+from perf_metrics import perf
+from log_setup import get_logger
+from deadline import Deadline, DeadlineExceeded, NO_DEADLINE
+from fingerprint import fingerprint
+from article_store import ArticleStore, cached_analyses, cached_analysis
+from adaptive_limiter import AdaptiveLimiter, limited
+
+logger = get_logger(__name__)
+
+# Bump whenever the prompt or parsing changes so cached/incremental results are recomputed
+PROMPT_VERSION = 'summary-v3'
+
+# Distinct summary configurations kept as compiled models before the oldest are dropped
+MAX_COMPILED_PROMPTS = 32
+
+BATCH_INSTRUCTION = """
+        Several articles are given at once, each starting with "ARTICLE [n]". Summarize each one separately and
+        return {"results": [...]} with exactly one object per article holding "index" (n) and "summary".
+        """
+
+# Several articles in one call: one summary per article, tied back by its index
+BATCH_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'results': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'index': {'type': 'INTEGER'},
+                    'summary': {'type': 'STRING'}
+                },
+                'required': ['index', 'summary']
+            }
+        }
+    },
+    'required': ['results']
+}
 
 class ArticleSummarizer:
     def __init__(self):
         self.api_key = None
         self.model = None
+        self.model_name = 'gemini-2.5-flash'
+        self.parse_stats = {'ok': 0, 'retried': 0, 'failed': 0}
+        # Upper bound (seconds) for a single Gemini request
+        self.request_timeout = 90
+        # Shared store of earlier results; None disables reuse
+        self.store: Optional[ArticleStore] = None
+        # Adaptive concurrency limit for Gemini calls; None leaves them unlimited
+        self.limiter: Optional[AdaptiveLimiter] = None
+        # Models carrying the summary requirements as system instruction, keyed by summary config
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        # Articles are summarized from several threads; guards parse_stats and the compiled models
+        self._lock = threading.Lock()
 
     def set_api_key(self, api_key: str):
         self.api_key = api_key
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = genai.GenerativeModel(self.model_name)
+        with self._lock:
+            self._models = {}
+
+    def _model_for(self, config: Dict, batch: bool = False) -> genai.GenerativeModel:
+        """Model whose system instruction holds the requirements for `config`, built once and reused for every article"""
+        key = json.dumps([config, batch], sort_keys=True, default=str)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if len(self._models) >= MAX_COMPILED_PROMPTS:
+                    self._models.pop(next(iter(self._models)))
+                instruction = self._summary_instruction(config)
+                if batch:
+                    instruction += BATCH_INSTRUCTION
+                model = genai.GenerativeModel(self.model_name, system_instruction=instruction)
+                self._models[key] = model
+            return model
+
+    def analysis_fingerprint(self, content: str, config: Dict) -> str:
+        """Identifies a summary by everything it depends on"""
+        return fingerprint('summary', PROMPT_VERSION, self.model_name, config, content)
 
-    def summarize_article(self, content: str, config: Dict) -> Optional[Dict]:
+    @perf.timed('summarize')
+    def summarize_article(self, content: str, config: Dict, deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
+        return cached_analysis(
+            self.store, 'summary', self.analysis_fingerprint(content, config),
+            lambda: self._summarize(content, config, deadline)
+        )
+
+    def _summarize(self, content: str, config: Dict, deadline: Deadline) -> Optional[Dict]:
         if not self.model:
             return None
         
         try:
-            prompt = self._create_summary_prompt(content, config)
-            response = self.model.generate_content(prompt)
+            model = self._model_for(config)
+            prompt = self._create_summary_prompt(content)
+            response_text = self._generate(prompt, deadline, model)
+            if not response_text.strip():
+                # Empty or blocked response: one retry for just this article
+                self._count('retried')
+                response_text = self._generate(prompt, deadline, model)
+            
+            if not response_text.strip():
+                self._count('failed')
+                return None
             
             # Parse response
-            return self._parse_summary_response(response.text, config)
+            return self._parse_summary_response(response_text, config)
             
         except Exception as e:
-            print(f"Error summarizing article: {str(e)}")
+            logger.warning("Error summarizing article: %s", e)
             return None
 
-    def _create_summary_prompt(self, content: str, config: Dict) -> str:
+    @perf.timed('summarize')
+    def summarize_batch(self, contents: List[str], config: Dict, deadline: Deadline = NO_DEADLINE) -> List[Optional[Dict]]:
+        """Summarize several articles with the same config in one model call"""
+        return cached_analyses(
+            self.store, 'summary', [self.analysis_fingerprint(content, config) for content in contents],
+            lambda missing: self._summarize_batch([contents[idx] for idx in missing], config, deadline)
+        )
+
+    def _summarize_batch(self, contents: List[str], config: Dict, deadline: Deadline) -> List[Optional[Dict]]:
+        if not self.model:
+            return [None] * len(contents)
+        if len(contents) == 1:
+            return [self._summarize(contents[0], config, deadline)]
+        
+        results: List[Optional[Dict]] = [None] * len(contents)
+        try:
+            model = self._model_for(config, batch=True)
+            prompt = "\n\n".join(f"ARTICLE [{idx}]:\n{content[:4000]}" for idx, content in enumerate(contents))
+            data = json.loads(self._generate(prompt, deadline, model, BATCH_SCHEMA) or '{}')
+            for item in data.get('results', []) if isinstance(data, dict) else []:
+                idx = item.get('index') if isinstance(item, dict) else None
+                summary = str(item.get('summary', '')).strip() if isinstance(item, dict) else ''
+                if isinstance(idx, int) and 0 <= idx < len(contents) and results[idx] is None and summary:
+                    results[idx] = self._parse_summary_response(summary, config)
+        except Exception as e:
+            logger.warning("Error summarizing batch: %s", e)
+        
+        # Articles the model skipped get their own call
+        for idx, result in enumerate(results):
+            if result is None:
+                perf.incr('summarize.batch_fallback')
+                results[idx] = self._summarize(contents[idx], config, deadline)
+        return results
+
+    @perf.timed('summarize')
+    def summarize_article_stream(self, content: str, config: Dict,
+                                 on_chunk: Optional[Callable[[str], None]] = None,
+                                 deadline: Deadline = NO_DEADLINE) -> Optional[Dict]:
+        """Summarize using streamed chunks; `on_chunk` receives the partial summary so far"""
+        return cached_analysis(
+            self.store, 'summary', self.analysis_fingerprint(content, config),
+            lambda: self._summarize_stream(content, config, on_chunk, deadline)
+        )
+
+    def _summarize_stream(self, content: str, config: Dict, on_chunk: Optional[Callable[[str], None]],
+                          deadline: Deadline) -> Optional[Dict]:
+        if not self.model:
+            return None
+        
+        try:
+            prompt = self._create_summary_prompt(content)
+            # The slot is held until the stream is fully consumed
+            with limited(self.limiter, f"llm:{self.model_name}", deadline):
+                started = time.perf_counter()
+                response = self._model_for(config).generate_content(
+                    prompt, stream=True, request_options={'timeout': deadline.timeout(self.request_timeout)}
+                )
+                
+                parts = []
+                for chunk in response:
+                    if deadline.expired():
+                        # Stop consuming the stream; the partial summary is discarded
+                        raise DeadlineExceeded()
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        continue
+                    if not parts:
+                        perf.record('llm.summarize.first_chunk', time.perf_counter() - started)
+                    parts.append(text)
+                    if on_chunk:
+                        on_chunk(''.join(parts))
+            
+            perf.record_llm('summarize', time.perf_counter() - started, response)
+            summary_text = ''.join(parts)
+            if not summary_text.strip():
+                self._count('failed')
+                return None
+            
+            return self._parse_summary_response(summary_text, config)
+            
+        except Exception as e:
+            logger.warning("Error streaming summary: %s", e)
+            return None
+
+    def _generate(self, prompt: str, deadline: Deadline = NO_DEADLINE,
+                  model: Optional[genai.GenerativeModel] = None, schema: Optional[Dict] = None) -> str:
+        # Plain-text summaries, or JSON following `schema` for batches
+        generation_config = {'response_mime_type': 'application/json', 'response_schema': schema} if schema else None
+        with limited(self.limiter, f"llm:{self.model_name}", deadline):
+            started = time.perf_counter()
+            response = (model or self.model).generate_content(
+                prompt, generation_config=generation_config,
+                request_options={'timeout': deadline.timeout(self.request_timeout)}
+            )
+        perf.record_llm('summarize', time.perf_counter() - started, response)
+        try:
+            return response.text
+        except ValueError:
+            # Blocked or empty candidates
+            return ''
+
+    def get_parse_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.parse_stats)
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.parse_stats[outcome] += 1
+
+    def _summary_instruction(self, config: Dict) -> str:
+        """Static requirements block, sent once per model as system instruction"""
         # Base prompt components
         summary_type = config.get('summary_type', 'Ringkas')
         max_length = config.get('max_length', 150)
         language = config.get('language', 'Bahasa Indonesia')
         focus_aspect = config.get('focus_aspect', '')
         
-        # Limit content length to avoid token limits
-        content = content[:4000] if len(content) > 4000 else content
-        
         # Language instruction
         if language == "English":
             lang_instruction = "Respond in English."
@@ -61,8 +258,8 @@ class ArticleSummarizer:
         if focus_aspect:
             focus_instruction = f"\nFocus specifically on: {focus_aspect}"
         
-        prompt = f"""
-        Summarize the following article according to these requirements:
+        return f"""
+        Summarize the article you are given according to these requirements:
         
         REQUIREMENTS:
         - {type_instruction}
@@ -70,25 +267,25 @@ class ArticleSummarizer:
         - Maximum {max_length} words
         {focus_instruction}
         
-        ARTICLE:
-        {content}
-        
         Please provide only the summary text without any additional formatting or explanations.
         """
-        
-        return prompt
+
+    def _create_summary_prompt(self, content: str) -> str:
+        # Limit content length to avoid token limits
+        return f"ARTICLE:\n{content[:4000]}"
 
     def _parse_summary_response(self, response_text: str, config: Dict) -> Dict:
         try:
             summary = response_text.strip()
             word_count = self._count_words(summary)
+            self._count('ok')
             
             return {
                 "summary": summary,
                 "word_count": word_count
             }
         except Exception as e:
-            print(f"Error parsing summary response: {str(e)}")
+            logger.warning("Error parsing summary response: %s", e)
             return {
                 "summary": "Gagal memparse ringkasan",
                 "word_count": 0
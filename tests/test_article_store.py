@@ -0,0 +1,39 @@
+import sqlite3
+
+from article_store import ArticleStore
+from journalist_detector import JournalistDetector
+
+
+def test_analyses_round_trip(tmp_path):
+    store = ArticleStore(str(tmp_path / 'articles.db'))
+    store.put_analysis('sentiment', 'abc', {'sentiment': 'positif'})
+    assert store.get_analysis('sentiment', 'abc') == {'sentiment': 'positif'}
+    assert store.get_analysis('summary', 'abc') is None
+
+
+def test_store_created_with_url_column_still_works(tmp_path):
+    path = str(tmp_path / 'articles.db')
+    with sqlite3.connect(path) as conn:
+        conn.executescript(
+            "CREATE TABLE analyses (kind TEXT NOT NULL, fingerprint TEXT NOT NULL, url TEXT, "
+            "result TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (kind, fingerprint));"
+            "CREATE INDEX idx_analyses_url ON analyses(url);"
+        )
+    store = ArticleStore(path)
+    store.put_analysis('summary', 'def', {'summary': 'ringkas'})
+    assert store.get_analysis('summary', 'def') == {'summary': 'ringkas'}
+    indexes = [row[0] for row in store._connect().execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+    assert 'idx_analyses_url' not in indexes
+
+
+class BrokenStore:
+    def get_article(self, url, lastmod=''):
+        raise sqlite3.OperationalError('database is locked')
+
+
+def test_journalist_detection_survives_store_errors():
+    detector = JournalistDetector()
+    detector.store = BrokenStore()
+    detector._detect_with_newspaper3k = lambda url, timeout=30, deadline=None: None
+    content = "Harga naik lagi. Penulis: Budi Santoso."
+    assert detector.detect_journalist('http://news.test/a', content) == 'Budi Santoso'
@@ -0,0 +1,176 @@
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+import browser_pool
+from browser_pool import BrowserPool
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = None
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        if 'slow' in url:
+            await asyncio.sleep(timeout / 1000 + 10)
+        self.url = url
+
+    async def content(self):
+        return f"<html><body>{self.url}</body></html>"
+
+    async def close(self):
+        self.context.open_pages -= 1
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.open_pages = 0
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.route_handler = handler
+
+    async def new_page(self):
+        self.open_pages += 1
+        return FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.closed = False
+
+    async def new_context(self, **kwargs):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePlaywright:
+    """Just enough of `async_playwright()` for the pool; `fail_launches` simulates missing browsers"""
+
+    def __init__(self):
+        self.fail_launches = 0
+        self.launches = 0
+        self.browsers = []
+        self.chromium = self
+
+    def __call__(self):
+        return self
+
+    async def start(self):
+        return self
+
+    async def launch(self, headless=True):
+        self.launches += 1
+        if self.fail_launches:
+            self.fail_launches -= 1
+            raise RuntimeError("Executable doesn't exist")
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = FakePlaywright()
+    monkeypatch.setattr(browser_pool, 'async_playwright', fake)
+    monkeypatch.setattr(browser_pool, 'stealth_async', None)
+    return fake
+
+
+def test_contexts_are_reused_across_urls(playwright):
+    pool = BrowserPool(pool_size=2)
+    try:
+        for idx in range(5):
+            assert f"/article/{idx}" in pool.render(f"http://news.test/article/{idx}")
+        assert playwright.launches == 1
+        browser = playwright.browsers[0]
+        assert len(browser.contexts) == 2
+        assert all(context.open_pages == 0 for context in browser.contexts)
+    finally:
+        pool.close()
+    assert browser.closed
+    assert all(context.closed for context in browser.contexts)
+
+
+def test_contexts_are_recycled_after_page_limit(playwright):
+    pool = BrowserPool(pool_size=1, max_pages_per_context=2)
+    try:
+        for idx in range(5):
+            pool.render(f"http://news.test/{idx}")
+        contexts = playwright.browsers[0].contexts
+        assert len(contexts) == 3
+        assert [context.closed for context in contexts] == [True, True, False]
+    finally:
+        pool.close()
+
+
+def test_pool_caps_concurrent_renders(playwright):
+    pool = BrowserPool(pool_size=2)
+    peak = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+    goto = FakePage.goto
+
+    async def counting_goto(page, url, wait_until=None, timeout=None):
+        with lock:
+            peak['now'] += 1
+            peak['max'] = max(peak['max'], peak['now'])
+        await asyncio.sleep(0.05)
+        await goto(page, url, wait_until, timeout)
+        with lock:
+            peak['now'] -= 1
+
+    FakePage.goto = counting_goto
+    try:
+        with concurrent.futures.ThreadPoolExecutor(6) as executor:
+            pages = list(executor.map(pool.render, [f"http://news.test/{idx}" for idx in range(6)]))
+        assert len(pages) == 6
+        assert peak['max'] == 2
+    finally:
+        FakePage.goto = goto
+        pool.close()
+
+
+def test_timed_out_render_returns_its_context(playwright):
+    pool = BrowserPool(pool_size=1)
+    try:
+        with pytest.raises(concurrent.futures.TimeoutError):
+            pool.render('http://news.test/slow', timeout=0)
+        # The cancelled render released its context, so the next one does not wait on it
+        assert 'fast' in pool.render('http://news.test/fast', timeout=5)
+    finally:
+        pool.close()
+
+
+def test_failed_startup_is_retried(playwright):
+    playwright.fail_launches = 1
+    pool = BrowserPool(pool_size=1)
+    with pytest.raises(RuntimeError):
+        pool.render('http://news.test/a')
+    assert pool._loop is None
+    try:
+        assert 'news.test/b' in pool.render('http://news.test/b')
+        assert playwright.launches == 2
+    finally:
+        pool.close()
+
+
+def test_render_without_playwright_returns_none(monkeypatch):
+    monkeypatch.setattr(browser_pool, 'async_playwright', None)
+    pool = BrowserPool()
+    assert pool.render('http://news.test/a') is None
+    pool.close()
@@ -0,0 +1,40 @@
+import io
+
+import pandas as pd
+
+from exporter import export_results
+from result_store import ResultStore
+
+
+def test_xlsx_keeps_urls_and_formulas_as_plain_text():
+    rows = 65540
+    base = pd.DataFrame({'URL': [f"https://news.test/artikel/{idx}" for idx in range(rows)]})
+    store = ResultStore(base)
+    for idx in range(rows):
+        store.append({'Title_New': '=1+1' if idx == 0 else '00123' if idx == 1 else f"Judul {idx}"})
+
+    [export_file] = export_results(store, 'xlsx')
+    frame = pd.read_excel(io.BytesIO(export_file.data), dtype=str)
+
+    assert len(frame) == rows
+    assert frame['URL'].iloc[-1] == f"https://news.test/artikel/{rows - 1}"
+    assert frame['Title_New'].iloc[0] == '=1+1'
+    assert frame['Title_New'].iloc[1] == '00123'
+
+
+def test_xlsx_writes_missing_and_tz_aware_dates():
+    base = pd.DataFrame({
+        'URL': ['https://news.test/a', 'https://news.test/b', 'https://news.test/c'],
+        'Tanggal': pd.to_datetime(['2024-03-01 08:30', None, '2024-03-03 17:00']),
+        'Diterbitkan': pd.to_datetime(['2024-03-01 08:30', '2024-03-02 09:00', None]).tz_localize('Asia/Jakarta')
+    })
+    store = ResultStore(base)
+    for _ in range(len(base)):
+        store.append({'Title_New': 'Judul'})
+
+    [export_file] = export_results(store, 'xlsx')
+    frame = pd.read_excel(io.BytesIO(export_file.data))
+
+    assert list(frame['Tanggal']) == [pd.Timestamp('2024-03-01 08:30'), pd.NaT, pd.Timestamp('2024-03-03 17:00')]
+    assert frame['Diterbitkan'].iloc[0] == pd.Timestamp('2024-03-01 08:30')
+    assert pd.isna(frame['Diterbitkan'].iloc[2])
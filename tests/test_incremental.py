@@ -0,0 +1,62 @@
+import pandas as pd
+
+from app import carry_over_outputs
+from result_store import ResultStore
+
+
+def values(column: pd.Series) -> list:
+    return [None if pd.isna(value) else value for value in column]
+
+
+def previous_run(base: pd.DataFrame) -> ResultStore:
+    store = ResultStore(base)
+    for idx in range(len(base)):
+        store.append({'Sentiment_New': f"lama {idx}", 'Fingerprint_Sentiment_New': f"fp{idx}"})
+    return store
+
+
+def test_only_unchanged_rows_take_over_previous_outputs():
+    base = pd.DataFrame({'URL': ['https://a.test/1', 'https://a.test/2', 'https://a.test/3'],
+                         'Snippet': ['satu', 'dua', 'tiga'], 'Media': ['A', 'B', 'C']})
+    previous = previous_run(base)
+
+    upload = base.copy()
+    upload.loc[1, 'Snippet'] = 'dua (diperbaiki)'
+    upload.loc[2, 'Media'] = 'C2'
+    merged = carry_over_outputs(upload, previous, 'URL')
+
+    # The uploaded input values are kept as they are
+    pd.testing.assert_frame_equal(merged[list(upload.columns)], upload)
+    assert values(merged['Sentiment_New']) == ['lama 0', None, None]
+    assert values(merged['Fingerprint_Sentiment_New']) == ['fp0', None, None]
+
+
+def test_rows_are_matched_by_content_not_position():
+    base = pd.DataFrame({'URL': ['https://a.test/1', 'https://a.test/2', 'https://a.test/3'],
+                         'Snippet': ['satu', 'dua', 'tiga']})
+    # The previous run only saw the rows left by the prefilter
+    previous = previous_run(base.iloc[[0, 2]].reset_index(drop=True))
+
+    upload = base.iloc[[2, 1, 0]].reset_index(drop=True)
+    merged = carry_over_outputs(upload, previous, 'URL')
+
+    assert list(merged['URL']) == list(upload['URL'])
+    assert values(merged['Sentiment_New']) == ['lama 1', None, 'lama 0']
+
+
+def test_reuploaded_export_keeps_its_own_outputs_for_unmatched_rows():
+    base = pd.DataFrame({'URL': ['https://a.test/1', 'https://a.test/2'], 'Snippet': ['satu', 'dua']})
+    previous = previous_run(base)
+
+    upload = base.copy()
+    upload.loc[1, 'URL'] = 'https://a.test/baru'
+    upload['Sentiment_New'] = ['dari file', 'dari file']
+    merged = carry_over_outputs(upload, previous, 'URL')
+
+    assert values(merged['Sentiment_New']) == ['lama 0', 'dari file']
+
+
+def test_different_input_columns_reuse_nothing():
+    base = pd.DataFrame({'URL': ['https://a.test/1'], 'Snippet': ['satu']})
+    upload = base.assign(Catatan=['baru'])
+    assert carry_over_outputs(upload, previous_run(base), 'URL') is upload
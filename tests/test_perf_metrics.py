@@ -0,0 +1,58 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from perf_metrics import PerfRecorder, perf, recording
+
+
+@perf.timed('work')
+def work(amount: int) -> int:
+    perf.incr('calls', amount)
+    return amount
+
+
+def test_recording_routes_perf_calls_to_the_run_recorder():
+    recorder = PerfRecorder()
+    with recording(recorder):
+        work(2)
+    report = recorder.report()
+    assert report['counters'] == {'calls': 2}
+    assert report['stages']['work']['count'] == 1
+
+
+def test_concurrent_runs_do_not_mix():
+    barrier = threading.Barrier(2)
+    reports = {}
+
+    def run(name: str, calls: int):
+        recorder = PerfRecorder()
+        with recording(recorder):
+            barrier.wait()
+            for _ in range(calls):
+                work(1)
+            # A reset in one run must not wipe the other
+            if name == 'a':
+                perf.reset()
+                work(1)
+            barrier.wait()
+        reports[name] = recorder.report()
+
+    threads = [threading.Thread(target=run, args=('a', 3)), threading.Thread(target=run, args=('b', 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert reports['a']['counters'] == {'calls': 1}
+    assert reports['b']['counters'] == {'calls': 5}
+    assert reports['b']['stages']['work']['count'] == 5
+
+
+def test_worker_threads_see_the_recorder_through_a_copied_context():
+    recorder = PerfRecorder()
+    with recording(recorder):
+        with ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, work, n) for n in range(1, 5)]
+            for future in futures:
+                future.result()
+    assert recorder.report()['counters'] == {'calls': 10}
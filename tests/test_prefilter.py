@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+
+from prefilter import ArticleIdDates, RowFilter, detect_language, url_date_range
+
+
+@pytest.mark.parametrize('url, expected', [
+    # Day in the path
+    ('https://www.kompas.com/tren/read/2023/05/15/123456/judul-berita', (date(2023, 5, 15), date(2023, 5, 15))),
+    ('https://portal.test/2023-05-15/judul', (date(2023, 5, 15), date(2023, 5, 15))),
+    ('https://portal.test/berita/2023/5/7/judul', (date(2023, 5, 7), date(2023, 5, 7))),
+    ('https://portal.test/arsip/2023/05/15', (date(2023, 5, 15), date(2023, 5, 15))),
+    # 14-digit timestamp
+    ('https://www.cnbcindonesia.com/news/20230515123456-4-438912/judul', (date(2023, 5, 15), date(2023, 5, 15))),
+    # Month only: the whole month
+    ('https://portal.test/berita/2024/02/judul', (date(2024, 2, 1), date(2024, 2, 29))),
+    ('https://portal.test/2023/12/', (date(2023, 12, 1), date(2023, 12, 31))),
+    # Not a date
+    ('https://news.detik.com/berita/d-7012345/judul', None),
+    ('https://portal.test/1999/05/15/judul', None),
+    ('https://portal.test/artikel?tanggal=2023/05/15/', None),
+    ('https://2023.test/05/15/judul', None),
+    ('https://portal.test/berita/20230515/judul', None),
+    ('', None),
+    # Ambiguous: fall back to what can be trusted
+    ('https://portal.test/2023/02/30/judul', (date(2023, 2, 1), date(2023, 2, 28))),
+    ('https://portal.test/2023/05/15123/judul', (date(2023, 5, 1), date(2023, 5, 31))),
+    ('https://portal.test/2023/1234567/judul', None)
+])
+def test_url_date_range(url, expected):
+    assert url_date_range(url) == expected
+
+
+@pytest.fixture
+def id_dates(tmp_path):
+    id_dates = ArticleIdDates(path=str(tmp_path / 'ids.json'))
+    id_dates.learn('https://news.detik.com/berita/d-7000100/a', '2024-01-10T08:00:00+07:00')
+    id_dates.learn('https://finance.detik.com/bursa/d-7000200/b', '2024-01-20')
+    return id_dates
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://news.detik.com/berita/d-7000150/c', (date(2024, 1, 10), date(2024, 1, 20))),
+    ('https://news.detik.com/berita/d-7000100/a', (date(2024, 1, 10), date(2024, 1, 10))),
+    ('https://news.detik.com/berita/d-7000050/d', (None, date(2024, 1, 10))),
+    ('https://news.detik.com/berita/d-7000250/e', (date(2024, 1, 20), None)),
+    # No ID, or not a site with sequential IDs
+    ('https://news.detik.com/berita/judul-tanpa-id', None),
+    ('https://www.kompas.com/read/d-7000150/judul', None)
+])
+def test_detik_id_dates_are_interpolated(id_dates, url, expected):
+    assert id_dates.date_range(url) == expected
+
+
+def test_id_dates_persist(id_dates, tmp_path):
+    id_dates.save()
+    reloaded = ArticleIdDates(path=str(tmp_path / 'ids.json'))
+    assert reloaded.date_range('https://news.detik.com/berita/d-7000150/c') == (date(2024, 1, 10), date(2024, 1, 20))
+
+
+def test_row_filter_uses_id_dates_only_when_the_whole_range_is_out(id_dates):
+    row_filter = RowFilter(since=date(2024, 1, 15), id_dates=id_dates)
+    assert 'ID artikel' in row_filter.check_url('https://news.detik.com/berita/d-7000050/d')
+    assert row_filter.check_url('https://news.detik.com/berita/d-7000150/c') is None
+    assert row_filter.check_url('https://news.detik.com/berita/d-7000250/e') is None
+    # A date in the URL wins over the ID
+    assert row_filter.check_url('https://news.detik.com/berita/2024/01/16/d-7000050/d') is None
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("Pemerintah akan menaikkan harga beras karena stok di gudang Bulog tidak cukup untuk dalam negeri.", 'id'),
+    ("The government said that it will raise the price of rice because the stock in the warehouse is low.", 'en'),
+    ("Die Regierung hat gesagt, dass der Preis für Reis wegen der geringen Vorräte im Lager steigen wird.", 'other'),
+    # Too short to tell: never filtered on language
+    ("Harga beras naik", None),
+    ("", None),
+    # A short headline line is skipped for the first real paragraph
+    ("JAKARTA\nThe central bank kept its rate unchanged and said that inflation is on target for the year.", 'en')
+])
+def test_detect_language(text, expected):
+    assert detect_language(text) == expected
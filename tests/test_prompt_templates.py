@@ -0,0 +1,84 @@
+import pytest
+
+import fake_genai
+import sentiment_analyzer
+import summarizer
+from sentiment_analyzer import SentimentAnalyzer
+from summarizer import ArticleSummarizer
+
+SUMMARY_CONFIG = {'summary_type': 'Ringkas', 'max_length': 100, 'language': 'Bahasa Indonesia', 'focus_aspect': ''}
+ARTICLES = [
+    "Penjualan Toyota Avanza naik tajam bulan ini setelah diskon besar dari dealer di Jakarta.",
+    "Bank Indonesia menahan suku bunga acuan sehingga cicilan kredit kendaraan tetap stabil.",
+    "Pengguna ChatGPT di Indonesia terus bertambah walau ada kekhawatiran soal privasi data."
+]
+
+
+class RecordingModel(fake_genai.GenerativeModel):
+    """Fake model that records how it was built and what each request carried"""
+    built = []
+    prompts = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        RecordingModel.built.append(self)
+
+    def generate_content(self, prompt, *args, **kwargs):
+        RecordingModel.prompts.append((self, prompt))
+        return super().generate_content(prompt, *args, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(monkeypatch):
+    monkeypatch.setattr(fake_genai, 'GenerativeModel', RecordingModel)
+    monkeypatch.setattr(sentiment_analyzer, 'genai', fake_genai)
+    monkeypatch.setattr(summarizer, 'genai', fake_genai)
+    monkeypatch.setitem(fake_genai.settings, 'latency', 0)
+    RecordingModel.built = []
+    RecordingModel.prompts = []
+
+
+def instructed_models():
+    return [model for model in RecordingModel.built if model.system_instruction]
+
+
+def test_sentiment_instruction_is_compiled_once_per_context():
+    analyzer = SentimentAnalyzer()
+    analyzer.set_api_key('fake-key')
+    for article in ARTICLES:
+        assert analyzer.analyze_sentiment(article, 'Toyota Avanza')['sentiment'] in ('positif', 'negatif', 'netral')
+
+    [model] = instructed_models()
+    assert 'Toyota Avanza' in model.system_instruction
+    assert len(RecordingModel.prompts) == len(ARTICLES)
+    for (used, prompt), article in zip(RecordingModel.prompts, ARTICLES):
+        assert used is model
+        # Only the article travels with each request
+        assert prompt == f"ARTIKEL:\n{article}"
+
+    analyzer.analyze_sentiment(ARTICLES[0], 'suku bunga')
+    assert len(instructed_models()) == 2
+    assert 'suku bunga' in instructed_models()[1].system_instruction
+
+
+def test_summary_requirements_are_compiled_once_per_config():
+    article_summarizer = ArticleSummarizer()
+    article_summarizer.set_api_key('fake-key')
+    for article in ARTICLES:
+        assert article_summarizer.summarize_article(article, SUMMARY_CONFIG)
+
+    [model] = instructed_models()
+    assert 'Bahasa Indonesia' in model.system_instruction
+    assert [prompt for _, prompt in RecordingModel.prompts] == [f"ARTICLE:\n{article}" for article in ARTICLES]
+
+    article_summarizer.summarize_article(ARTICLES[0], {**SUMMARY_CONFIG, 'max_length': 50})
+    assert len(instructed_models()) == 2
+
+
+def test_new_api_key_rebuilds_compiled_models():
+    analyzer = SentimentAnalyzer()
+    analyzer.set_api_key('fake-key')
+    analyzer.analyze_sentiment(ARTICLES[0], 'Toyota Avanza')
+    analyzer.set_api_key('other-key')
+    analyzer.analyze_sentiment(ARTICLES[1], 'Toyota Avanza')
+    assert len(instructed_models()) == 2
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from result_store import ResultStore
+
+
+def make_store(base):
+    store = ResultStore(base)
+    for idx in range(len(base)):
+        store.append({'Sentiment_New': 'positif', 'Content_New': f"teks {idx}"})
+    return store
+
+
+def test_to_arrow_converts_mixed_object_columns_to_strings():
+    base = pd.DataFrame({'Kode': [101, 'A-7', None], 'Jumlah': [1, 2, 3]})
+    table = make_store(base).to_arrow()
+    assert table.column('Kode').to_pylist() == ['101', 'A-7', None]
+    assert table.column('Jumlah').to_pylist() == [1, 2, 3]
+    assert table.column('Content_New').to_pylist() == ['teks 0', 'teks 1', 'teks 2']
+
+
+def test_base_with_default_index_is_not_copied():
+    base = pd.DataFrame({'URL': ['a', 'b']})
+    assert ResultStore(base).base is base
+
+
+def test_base_with_other_index_is_read_by_position():
+    base = pd.DataFrame({'URL': ['a', 'b', 'c']}).iloc[1:]
+    store = make_store(base)
+    assert store.frame()['URL'].tolist() == ['b', 'c']
+    assert store.column('URL').tolist() == ['b', 'c']
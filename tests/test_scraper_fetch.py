@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from adaptive_limiter import AdaptiveLimiter
+from journalist_detector import JournalistDetector
+from run_benchmark import start_corpus_server
+from scraper import NewsScraper
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = start_corpus_server()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def scraper(tmp_path):
+    scraper = NewsScraper()
+    scraper.limiter = AdaptiveLimiter(path=os.path.join(str(tmp_path), 'limits.json'))
+    return scraper
+
+
+def test_fetch_uses_the_pooled_session(scraper, base_url):
+    calls = []
+    get = scraper.session.get
+    scraper.session.get = lambda *args, **kwargs: calls.append(args[0]) or get(*args, **kwargs)
+    html = scraper.fetch_html(f"{base_url}/detik_ekonomi.html", timeout=10)
+    assert '<html' in html.lower()
+    assert calls == [f"{base_url}/detik_ekonomi.html"]
+
+
+def test_fetch_is_capped(scraper, base_url):
+    scraper.max_bytes = 2048
+    html = scraper.fetch_html(f"{base_url}/detik_ekonomi.html", timeout=10)
+    assert len(html.encode('utf-8')) <= 2048
+
+
+def test_journalist_detection_downloads_through_the_scraper(scraper, base_url):
+    fetched = []
+    fetch_html = scraper.fetch_html
+    scraper.fetch_html = lambda url, timeout=30, deadline=None: fetched.append(url) or fetch_html(url, timeout)
+    detector = JournalistDetector()
+    detector.scraper = scraper
+    journalist = detector.detect_journalist(f"{base_url}/kompas_teknologi.html", '', timeout=10)
+    assert journalist == 'Wahyunanda Kusuma Pertiwi'
+    assert fetched == [f"{base_url}/kompas_teknologi.html"]
@@ -0,0 +1,83 @@
+import pytest
+
+from sentiment_analyzer import SentimentAnalyzer, _repair_json
+
+VALID = '{"sentiment": "positif", "confidence": "tinggi", "reasoning": "Penjualan naik"}'
+
+
+class ScriptedResponse:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class ScriptedModel:
+    """Returns the given response texts in order and records the prompts"""
+
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return ScriptedResponse(self.texts.pop(0))
+
+
+def analyzer_with(model):
+    analyzer = SentimentAnalyzer()
+    analyzer.model = model
+    analyzer._model_for = lambda key, build_instruction: model
+    return analyzer
+
+
+@pytest.mark.parametrize('text, expected', [
+    (VALID, VALID),
+    (f"```json\n{VALID}\n```", VALID),
+    ('Berikut hasilnya: {"sentiment": "netral", "confidence": "sedang", "reasoning": "x",} Semoga membantu',
+     '{"sentiment": "netral", "confidence": "sedang", "reasoning": "x"}'),
+    ('{"sentiment": “negatif”, "confidence": "rendah", "reasoning": "a } b"}',
+     '{"sentiment": "negatif", "confidence": "rendah", "reasoning": "a } b"}'),
+    ('{"sentiment": "positif", "confidence": "tin', None),
+    ('Maaf, saya tidak bisa menjawab.', None)
+])
+def test_repair_json(text, expected):
+    assert _repair_json(text) == expected
+
+
+def test_fenced_response_is_repaired_without_retry():
+    model = ScriptedModel(f"```json\n{VALID[:-1]},\n}}\n```")
+    analyzer = analyzer_with(model)
+    result = analyzer._analyze_with_gemini('Artikel', 'Toyota')
+    assert result['sentiment'] == 'positif'
+    assert len(model.prompts) == 1
+    assert analyzer.get_parse_stats() == {'ok': 0, 'repaired': 1, 'retried': 0, 'failed': 0}
+
+
+def test_truncated_response_is_retried_once():
+    model = ScriptedModel('{"sentiment": "positif", "confid', VALID)
+    analyzer = analyzer_with(model)
+    result = analyzer._analyze_with_gemini('Artikel', 'Toyota')
+    assert result['confidence'] == 'tinggi'
+    assert len(model.prompts) == 2
+    assert model.prompts[1].endswith('tanpa teks lain.')
+    assert analyzer.get_parse_stats() == {'ok': 1, 'repaired': 0, 'retried': 1, 'failed': 0}
+
+
+def test_unrepairable_response_is_retried_once_then_failed():
+    model = ScriptedModel('Maaf, tidak bisa.', '{"sentiment": "positif"')
+    analyzer = analyzer_with(model)
+    assert analyzer._analyze_with_gemini('Artikel', 'Toyota') is None
+    assert len(model.prompts) == 2
+    assert analyzer.get_parse_stats() == {'ok': 0, 'repaired': 0, 'retried': 1, 'failed': 1}
+
+
+def test_response_without_sentiment_field_counts_as_failed():
+    model = ScriptedModel('{"confidence": "tinggi", "reasoning": "x"}', '{"sentiment": "", "confidence": "tinggi"}')
+    analyzer = analyzer_with(model)
+    assert analyzer._analyze_with_gemini('Artikel', 'Toyota') is None
+    assert analyzer.get_parse_stats() == {'ok': 0, 'repaired': 0, 'retried': 1, 'failed': 1}
+
+
+def test_unknown_confidence_falls_back_to_low():
+    analyzer = analyzer_with(ScriptedModel('{"sentiment": "Positif", "confidence": "very high", "reasoning": "x"}'))
+    assert analyzer._analyze_with_gemini('Artikel', 'Toyota')['confidence'] == 'rendah'
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import fake_genai
+import sentiment_analyzer
+import summarizer
+from adaptive_limiter import AdaptiveLimiter
+from circuit_breaker import CircuitOpen
+from deadline import DeadlineExceeded
+from perf_metrics import perf
+from service import AnalysisService, RequestError, _read_request
+
+ARTICLES = [f"Artikel nomor {idx} tentang harga Toyota Avanza yang naik di dealer Jakarta." for idx in range(8)]
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setattr(sentiment_analyzer, 'genai', fake_genai)
+    monkeypatch.setattr(summarizer, 'genai', fake_genai)
+    monkeypatch.setitem(fake_genai.settings, 'latency', 0)
+    service = AnalysisService(workers=4, batch_window=0.05, max_batch=8, request_budget=10, use_store=False)
+    service.scraper.limiter = AdaptiveLimiter(path=os.path.join(str(tmp_path), 'limits.json'))
+    service.sentiment_analyzer.set_api_key('fake-key')
+    service.summarizer.set_api_key('fake-key')
+    yield service
+    service.executor.shutdown(wait=True)
+
+
+def post(service, path, payload):
+    return service.dispatch('POST', path, json.dumps(payload).encode('utf-8'))
+
+
+async def gather(*requests):
+    return await asyncio.gather(*requests)
+
+
+def test_concurrent_sentiment_requests_share_one_model_call(service):
+    calls = fake_genai.calls['count']
+    responses = asyncio.run(gather(*(
+        post(service, '/sentiment', {'content': article, 'context': 'Toyota Avanza'}) for article in ARTICLES
+    )))
+    assert [status for status, _, _ in responses] == [200] * len(ARTICLES)
+    assert all(payload['result']['sentiment'] for _, payload, _ in responses)
+    assert service.sentiment_batcher.stats == {'batches': 1, 'items': 8, 'largest': 8}
+    assert fake_genai.calls['count'] - calls == 1
+
+
+def test_requests_are_batched_per_context_and_config(service):
+    requests = [post(service, '/sentiment', {'content': article, 'context': f"konteks {idx % 2}"})
+                for idx, article in enumerate(ARTICLES)]
+    requests += [post(service, '/summarize', {'content': article, 'config': {'max_length': 50 + 50 * (idx % 2)}})
+                 for idx, article in enumerate(ARTICLES[:4])]
+    responses = asyncio.run(gather(*requests))
+    assert all(status == 200 for status, _, _ in responses)
+    assert service.sentiment_batcher.stats['batches'] == 2
+    assert service.summary_batcher.stats['batches'] == 2
+
+
+def test_batch_flushes_after_window_when_not_full(service):
+    status, payload, _ = asyncio.run(post(service, '/summarize', {'content': ARTICLES[0]}))
+    assert status == 200
+    assert payload['result']['summary']
+    assert service.summary_batcher.stats == {'batches': 1, 'items': 1, 'largest': 1}
+
+
+@pytest.mark.parametrize('error, status', [
+    (DeadlineExceeded(), 504),
+    (CircuitOpen('news.test'), 503),
+    (RequestError('salah'), 400),
+    (RuntimeError('rusak'), 500)
+])
+def test_batch_failures_map_to_http_status(service, monkeypatch, error, status):
+    def fail(*args):
+        raise error
+
+    monkeypatch.setattr(service.sentiment_batcher, 'process', fail)
+    responses = asyncio.run(gather(*(
+        post(service, '/sentiment', {'content': article, 'context': 'Toyota Avanza'}) for article in ARTICLES[:3]
+    )))
+    assert [response[0] for response in responses] == [status] * 3
+    assert all('error' in payload for _, payload, _ in responses)
+
+
+def test_open_circuit_reports_retry_after(service, monkeypatch):
+    breaker = service.scraper.breaker
+    breaker.reset_after = 90
+    for _ in range(breaker.failure_threshold):
+        breaker.record('news.test', False)
+
+    def blocked(*args, **kwargs):
+        breaker.before_request('news.test')
+
+    monkeypatch.setattr(service.scraper, 'scrape_article_sync', blocked)
+    status, payload, headers = asyncio.run(post(service, '/scrape', {'url': 'http://news.test/a'}))
+    assert status == 503
+    assert 80 <= int(headers['Retry-After']) <= 90
+
+
+def test_request_validation(service):
+    assert asyncio.run(post(service, '/sentiment', {'content': 'x'}))[0] == 400
+    assert asyncio.run(post(service, '/unknown', {}))[0] == 404
+    assert asyncio.run(service.dispatch('GET', '/sentiment', b''))[0] == 405
+    assert asyncio.run(service.dispatch('POST', '/sentiment', b'{bukan json'))[0] == 400
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/scrape', {'url': 'http://news.test/a', 'timeout': 'lama'}),
+    ('/scrape', {'url': 'http://news.test/a', 'timeout': 0}),
+    ('/scrape', {'url': 'http://news.test/a', 'timeout': -5}),
+    ('/scrape', {'url': 'http://news.test/a', 'timeout': None}),
+    ('/scrape', {'url': 'http://news.test/a', 'timeout': True}),
+    ('/sentiment', {'content': 'x', 'entities': 'Toyota'}),
+    ('/sentiment', {'content': 'x', 'entities': ['Toyota', '']}),
+    ('/sentiment', {'content': 'x', 'entities': ['Toyota', 3]})
+])
+def test_invalid_fields_are_client_errors(service, path, body):
+    status, payload, _ = asyncio.run(post(service, path, body))
+    assert status == 400
+    assert 'error' in payload
+
+
+def test_scrape_accepts_a_numeric_timeout(service, monkeypatch):
+    calls = []
+    monkeypatch.setattr(service.scraper, 'scrape_article_sync',
+                        lambda url, timeout, basic_only, deadline: calls.append(timeout) or {'url': url})
+    assert asyncio.run(post(service, '/scrape', {'url': 'http://news.test/a', 'timeout': '12.5'}))[0] == 200
+    assert calls == [12.5]
+
+
+def test_health_counters_roll_over(service):
+    perf.incr('tier.snippet', 3)
+    service.roll_metrics()
+    health = service.health()
+    assert health['previous_counters']['tier.snippet'] == 3
+    assert 'tier.snippet' not in health['counters']
+
+
+def read(raw: bytes):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await _read_request(reader)
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('length', ['abc', '-5'])
+def test_invalid_content_length_is_a_client_error(length):
+    with pytest.raises(RequestError) as error:
+        read(f"POST /sentiment HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode('latin-1'))
+    assert error.value.status == 400
+
+
+def test_request_is_parsed():
+    method, path, headers, body = read(b"post /health HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n\r\n{}")
+    assert (method, path, headers['connection'], body) == ('POST', '/health', 'close', b'{}')
+
+
+def test_http_round_trip(service):
+    async def run():
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"POST /sentiment HTTP/1.1\r\nContent-Length: x\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    response = asyncio.run(run())
+    assert response.startswith(b"HTTP/1.1 400 Bad Request")
+    assert b'Invalid Content-Length' in response
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from site_index import SiteIndex, parse_sitemap
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'site_index')
+
+ORIGIN = 'https://portal.test'
+BERAS = f"{ORIGIN}/ekonomi/2024/03/02/harga-beras-naik"
+STARTUP = f"{ORIGIN}/teknologi/startup-lokal-raih-pendanaan"
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, content: bytes, status_code: int = 200):
+        self.content = content
+        self.text = content.decode('utf-8')
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+
+def serve(index: SiteIndex, pages: dict) -> list:
+    """Answer the index's requests from `pages` (url -> fixture name); returns the requested URLs"""
+    requested = []
+
+    def get(url, deadline):
+        requested.append(url)
+        if url in pages:
+            return FakeResponse(fixture(pages[url]))
+        return FakeResponse(b'', 404)
+
+    index._get = get
+    return requested
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SiteIndex(path=str(tmp_path / 'site_index.json'))
+
+
+def test_sitemap_index_lists_child_sitemaps():
+    parsed = parse_sitemap(fixture('sitemap-index.xml'))
+    assert parsed == {
+        'sitemaps': [f"{ORIGIN}/news/sitemap-news-1.xml", f"{ORIGIN}/sitemap-video.xml"],
+        'entries': {}
+    }
+
+
+def test_news_sitemap_entries():
+    entries = parse_sitemap(fixture('sitemap-news-1.xml'))['entries']
+    assert entries == {
+        BERAS: {
+            'title': 'Harga Beras Naik Jelang Ramadan',
+            'publication_date': '2024-03-02T09:00:00+07:00',
+            'lastmod': '2024-03-02T11:15:00+07:00'
+        },
+        # Without <lastmod> the publication date stands in
+        STARTUP: {
+            'title': 'Startup Lokal Raih Pendanaan',
+            'publication_date': '2024-03-01T20:30:00+07:00',
+            'lastmod': '2024-03-01T20:30:00+07:00'
+        }
+    }
+
+
+def test_robots_rules_and_sitemap_lines(index):
+    serve(index, {f"{ORIGIN}/robots.txt": 'robots.txt'})
+    assert index.robots_sitemaps(BERAS) == [f"{ORIGIN}/sitemap.xml", f"{ORIGIN}/news/sitemap-index.xml"]
+    assert index.can_fetch(BERAS)
+    assert not index.can_fetch(f"{ORIGIN}/admin/login")
+    assert index.crawl_delay(BERAS) == 0
+
+
+def test_lookup_follows_news_sitemaps_listed_in_robots(index, tmp_path):
+    requested = serve(index, {
+        f"{ORIGIN}/robots.txt": 'robots.txt',
+        f"{ORIGIN}/news/sitemap-index.xml": 'sitemap-index.xml',
+        f"{ORIGIN}/news/sitemap-news-1.xml": 'sitemap-news-1.xml'
+    })
+
+    assert index.lookup(BERAS)['title'] == 'Harga Beras Naik Jelang Ramadan'
+    assert index.lookup(STARTUP + '/')['lastmod'] == '2024-03-01T20:30:00+07:00'
+    assert index.lookup(f"{ORIGIN}/ekonomi/tidak-ada") is None
+    # Only sitemaps with "news" in the URL are read, and only once per TTL
+    assert requested == [
+        f"{ORIGIN}/robots.txt", f"{ORIGIN}/news/sitemap-index.xml", f"{ORIGIN}/news/sitemap-news-1.xml"
+    ]
+
+    index.save()
+    reloaded = SiteIndex(path=str(tmp_path / 'site_index.json'))
+    assert serve(reloaded, {}) == []
+    assert reloaded.lookup(BERAS)['publication_date'] == '2024-03-02T09:00:00+07:00'
+    assert not reloaded.can_fetch(f"{ORIGIN}/admin/login")
+
+
+def test_lookup_falls_back_to_conventional_news_sitemap(index):
+    requested = serve(index, {f"{ORIGIN}/sitemap_news.xml": 'sitemap-news-1.xml'})
+    assert index.lookup(BERAS)['title'] == 'Harga Beras Naik Jelang Ramadan'
+    # Missing robots.txt allows everything; the first location that works is enough
+    assert index.can_fetch(f"{ORIGIN}/admin/login")
+    assert requested == [f"{ORIGIN}/robots.txt", f"{ORIGIN}/sitemap-news.xml", f"{ORIGIN}/sitemap_news.xml"]
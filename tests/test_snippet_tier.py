@@ -0,0 +1,102 @@
+import pytest
+
+import fake_genai
+import sentiment_analyzer
+import summarizer
+from app import NewsAnalyzerApp
+from perf_metrics import perf
+from run_benchmark import build_config, build_input, make_app, start_corpus_server
+
+confident = NewsAnalyzerApp._snippet_confident
+
+
+@pytest.mark.parametrize('confidence, min_confidence, accepted', [
+    ('tinggi', 'sedang', True),
+    ('sedang', 'sedang', True),
+    ('rendah', 'sedang', False),
+    ('tinggi', 'tinggi', True),
+    ('sedang', 'tinggi', False),
+    ('rendah', 'rendah', True)
+])
+def test_confidence_threshold(confidence, min_confidence, accepted):
+    assert confident({'sentiment': 'positif', 'confidence': confidence}, min_confidence) is accepted
+
+
+@pytest.mark.parametrize('confidence, accepted', [('tinggi', True), ('sedang', False), ('rendah', False)])
+def test_unrelated_needs_high_confidence_whatever_the_threshold(confidence, accepted):
+    assert confident({'sentiment': 'tidak terkait', 'confidence': confidence}, 'rendah') is accepted
+
+
+@pytest.mark.parametrize('sentiment', [None, {}, {'sentiment': 'positif'}, {'sentiment': 'positif', 'confidence': 'high'}])
+def test_missing_or_unknown_confidence_escalates(sentiment):
+    assert not confident(sentiment, 'rendah')
+
+
+@pytest.fixture
+def corpus_url():
+    server = start_corpus_server()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_tiered_run_fetches_and_summarizes_only_escalated_rows(monkeypatch, tmp_path, corpus_url):
+    monkeypatch.setattr(sentiment_analyzer, 'genai', fake_genai)
+    monkeypatch.setattr(summarizer, 'genai', fake_genai)
+    monkeypatch.setitem(fake_genai.settings, 'latency', 0)
+    app = make_app(str(tmp_path))
+    df = build_input(corpus_url, 12)
+    df['Snippet'] = [f"Berita nomor {idx} tentang Toyota Avanza dan suku bunga bank" for idx in range(len(df))]
+    config = {**build_config(1), 'use_article_store': False, 'incremental': False,
+              'snippet_first': True, 'min_snippet_confidence': 'tinggi'}
+    app._prepare_run(config)
+
+    perf.reset()
+    results = app.process_excel_data(df, {'url_column': 'URL', 'snippet_column': 'Snippet'}, config).frame()
+    counters = perf.report()['counters']
+
+    snippet_rows = results[results['Tier_New'] == 'snippet']
+    full_rows = results[results['Tier_New'] == 'full']
+    assert len(snippet_rows) == counters['tier.snippet'] > 0
+    assert len(full_rows) == counters['tier.escalated'] > 0
+    assert (snippet_rows['Confidence_New'] == 'tinggi').all()
+    assert (snippet_rows['Summary_New'] == 'Tidak diringkas (mode snippet)').all()
+    assert snippet_rows['Content_New'].isna().all()
+    assert full_rows['Content_New'].str.len().gt(100).all()
+    assert counters['scrape.newspaper3k.success'] == len(full_rows)
+
+
+def test_escalated_rows_are_analyzed_on_the_article_not_the_snippet(monkeypatch, tmp_path, corpus_url):
+    monkeypatch.setattr(sentiment_analyzer, 'genai', fake_genai)
+    monkeypatch.setattr(summarizer, 'genai', fake_genai)
+    monkeypatch.setitem(fake_genai.settings, 'latency', 0)
+    app = make_app(str(tmp_path))
+    df = build_input(corpus_url, 8)
+    df['Snippet'] = [f"Berita nomor {idx} tentang Toyota Avanza dan suku bunga bank" for idx in range(len(df))]
+    config = {**build_config(1), 'use_article_store': False, 'incremental': False, 'enable_summarize': False,
+              'enable_journalist': False, 'snippet_first': True, 'min_snippet_confidence': 'tinggi'}
+    app._prepare_run(config)
+
+    snippet_inputs, full_inputs = [], []
+    analyze_batch = app.sentiment_analyzer.analyze_batch
+    analyze_sentiment = app.sentiment_analyzer.analyze_sentiment
+    monkeypatch.setattr(app.sentiment_analyzer, 'analyze_batch',
+                        lambda texts, *args: snippet_inputs.extend(texts) or analyze_batch(texts, *args))
+    monkeypatch.setattr(app.sentiment_analyzer, 'analyze_sentiment',
+                        lambda text, *args: full_inputs.append(text) or analyze_sentiment(text, *args))
+
+    results = app.process_excel_data(df, {'url_column': 'URL', 'snippet_column': 'Snippet'}, config).frame()
+
+    escalated = (results['Tier_New'] == 'full').sum()
+    assert escalated > 0
+    assert len(full_inputs) == escalated
+    assert not set(full_inputs) & set(snippet_inputs)
+    assert all(len(text) > len(max(snippet_inputs, key=len)) for text in full_inputs)
+
+
+def test_tiered_mode_needs_scraping(tmp_path):
+    app = make_app(str(tmp_path))
+    df = build_input('http://127.0.0.1:9', 2)
+    df['Snippet'] = ["Berita tentang Toyota Avanza dan suku bunga bank"] * 2
+    config = {**build_config(1), 'enable_scraping': False, 'snippet_first': True}
+    mapping = {'url_column': 'URL', 'snippet_column': 'Snippet'}
+    assert app._snippet_tier(df, mapping, config, None, None) is None
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import fake_genai
+import sentiment_analyzer
+import summarizer
+from sentiment_analyzer import SentimentAnalyzer
+from summarizer import ArticleSummarizer
+
+THREADS = 8
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(monkeypatch):
+    monkeypatch.setattr(sentiment_analyzer, 'genai', fake_genai)
+    monkeypatch.setattr(summarizer, 'genai', fake_genai)
+
+
+def run_concurrently(task, times: int = THREADS):
+    with ThreadPoolExecutor(THREADS) as executor:
+        return list(executor.map(lambda _: task(), range(times)))
+
+
+def test_sentiment_model_is_built_once_under_concurrency():
+    analyzer = SentimentAnalyzer()
+    analyzer.set_api_key('fake-key')
+    builds = []
+
+    def slow_instruction():
+        builds.append(1)
+        time.sleep(0.05)
+        return 'instruksi'
+
+    models = run_concurrently(lambda: analyzer._model_for(('sentiment', 'Toyota'), slow_instruction))
+    assert len(builds) == 1
+    assert all(model is models[0] for model in models)
+
+
+def test_summary_model_is_built_once_under_concurrency(monkeypatch):
+    article_summarizer = ArticleSummarizer()
+    article_summarizer.set_api_key('fake-key')
+    instruction = article_summarizer._summary_instruction
+    builds = []
+
+    def slow_instruction(config):
+        builds.append(1)
+        time.sleep(0.05)
+        return instruction(config)
+
+    monkeypatch.setattr(article_summarizer, '_summary_instruction', slow_instruction)
+    config = {'summary_type': 'Ringkas', 'max_length': 100, 'language': 'Bahasa Indonesia', 'focus_aspect': ''}
+    models = run_concurrently(lambda: article_summarizer._model_for(config))
+    assert len(builds) == 1
+    assert all(model is models[0] for model in models)
+
+
+def test_parse_stats_keep_every_count():
+    analyzer = SentimentAnalyzer()
+    article_summarizer = ArticleSummarizer()
+
+    def count_many():
+        for _ in range(5000):
+            analyzer._count('ok')
+            article_summarizer._count('ok')
+
+    run_concurrently(count_many)
+    assert analyzer.get_parse_stats()['ok'] == THREADS * 5000
+    assert article_summarizer.get_parse_stats()['ok'] == THREADS * 5000
@@ -0,0 +1,38 @@
+import io
+
+import pandas as pd
+import pytest
+
+import upload_reader
+from upload_reader import _excel_number, read_upload
+
+
+def sheet_bytes() -> bytes:
+    frame = pd.DataFrame({
+        'ID': [1001, 1002, 1003],
+        'URL': ['https://portal.test/a', None, 'https://portal.test/c'],
+        'Skor': [0.5, 2.0, None],
+        'Campur': ['teks', 42, None]
+    })
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('value, expected', [(123.0, 123), (-4.0, -4), (0.5, 0.5), ('123.0', '123.0'), (None, None)])
+def test_whole_floats_become_ints(value, expected):
+    result = _excel_number(value)
+    assert result == expected and type(result) is type(expected)
+
+
+def test_calamine_reads_like_openpyxl(monkeypatch):
+    pytest.importorskip('python_calamine')
+    data = sheet_bytes()
+    calamine = read_upload(data, 'hasil.xlsx')
+
+    monkeypatch.setattr(upload_reader, 'CalamineWorkbook', None)
+    openpyxl = read_upload(data, 'hasil.xlsx')
+
+    pd.testing.assert_frame_equal(calamine, openpyxl)
+    assert calamine['ID'].tolist() == [1001, 1002, 1003]
+    assert calamine['Campur'].tolist()[1] == 42
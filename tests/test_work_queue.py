@@ -0,0 +1,148 @@
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+import work_queue
+from app import NewsAnalyzerApp
+from circuit_breaker import CircuitOpen
+from deadline import DeadlineExceeded
+from work_queue import DONE, FAILED, QUEUED, ROW_INDEX, ShardWorker, WorkQueue
+
+COLUMN_MAPPING = {'url_column': 'URL'}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(str(tmp_path / 'queue.db'), lease_seconds=30, max_attempts=2)
+
+
+def submit(queue, rows: int = 6, shard_size: int = 2) -> str:
+    df = pd.DataFrame({'URL': [f"http://news.test/{idx}" for idx in range(rows)]})
+    return queue.submit(df, COLUMN_MAPPING, {'enable_scraping': True}, shard_size)
+
+
+def echo(shard):
+    return [{'Title_New': url.rsplit('/', 1)[1], 'Status_New': 'ok'} for url in shard['rows']['URL']]
+
+
+def shard_states(queue, job_id):
+    rows = queue._connect().execute("SELECT state, error FROM shards WHERE job_id = ? ORDER BY shard_id", (job_id,))
+    return [(row['state'], row['error']) for row in rows]
+
+
+def test_results_are_merged_in_row_order(queue):
+    job_id = submit(queue)
+    assert ShardWorker(queue, echo, 'w1').run(job_id, stop_when_idle=True) == 3
+    assert queue.is_finished(job_id)
+    assert [record['Title_New'] for record in queue.results(job_id)] == ['0', '1', '2', '3', '4', '5']
+    assert [record[ROW_INDEX] for record in queue.results(job_id)] == [0, 1, 2, 3, 4, 5]
+
+
+def test_results_carry_the_submitted_index(queue):
+    # Rows 1 and 4 were dropped by the prefilter before submitting
+    df = pd.DataFrame({'URL': [f"http://news.test/{idx}" for idx in (0, 2, 3, 5)]}, index=[0, 2, 3, 5])
+    job_id = queue.submit(df, COLUMN_MAPPING, {}, 3)
+    ShardWorker(queue, echo, 'w1').run(job_id, stop_when_idle=True)
+    assert [(record[ROW_INDEX], record['Title_New']) for record in queue.results(job_id)] == [
+        (0, '0'), (2, '2'), (3, '3'), (5, '5')
+    ]
+
+
+def test_duplicate_index_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.submit(pd.DataFrame({'URL': ['a', 'b']}, index=[1, 1]), COLUMN_MAPPING, {})
+
+
+def test_wrong_number_of_results_fails_the_shard(queue):
+    job_id = submit(queue, rows=2)
+    ShardWorker(queue, lambda shard: echo(shard)[:1], 'w1').run(job_id, stop_when_idle=True)
+    assert [state for state, _ in shard_states(queue, job_id)] == [FAILED]
+
+
+@pytest.mark.parametrize('error', [DeadlineExceeded(), CircuitOpen('news.test'), RuntimeError('rusak')])
+def test_shard_errors_fail_the_shard_not_the_worker(queue, error):
+    job_id = submit(queue, rows=2)
+    attempts = []
+
+    def flaky(shard):
+        attempts.append(shard['attempt'])
+        if len(attempts) == 1:
+            raise error
+        return echo(shard)
+
+    ShardWorker(queue, flaky, 'w1').run(job_id, stop_when_idle=True)
+    assert attempts == [1, 2]
+    assert shard_states(queue, job_id) == [(DONE, None)]
+
+
+def test_shard_is_given_up_after_max_attempts(queue):
+    job_id = submit(queue, rows=4)
+
+    def always_late(shard):
+        raise DeadlineExceeded()
+
+    ShardWorker(queue, always_late, 'w1').run(job_id, stop_when_idle=True)
+    assert [state for state, _ in shard_states(queue, job_id)] == [FAILED, FAILED]
+    assert list(queue.results(job_id)) == [{ROW_INDEX: idx, 'Status_New': 'timeout'} for idx in range(4)]
+
+
+def test_interrupt_gives_the_shard_back_and_stops_the_worker(queue):
+    job_id = submit(queue, rows=2)
+
+    def interrupted(shard):
+        raise KeyboardInterrupt()
+
+    with pytest.raises(KeyboardInterrupt):
+        ShardWorker(queue, interrupted, 'w1').run(job_id, stop_when_idle=True)
+    [(state, error)] = shard_states(queue, job_id)
+    assert state == QUEUED
+    assert error.startswith('KeyboardInterrupt')
+
+
+def test_result_after_lease_expiry_is_discarded(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), lease_seconds=0.2, max_attempts=3)
+    job_id = submit(queue, rows=2)
+    shard = queue.claim('slow')
+    time.sleep(0.3)
+
+    # No other worker has claimed the shard yet, but the lease is over
+    assert not queue.heartbeat(job_id, shard['shard_id'], 'slow')
+    assert not queue.complete(job_id, shard['shard_id'], 'slow', echo(shard))
+
+    again = queue.claim('fast')
+    assert again['shard_id'] == shard['shard_id'] and again['attempt'] == 2
+    assert queue.complete(job_id, again['shard_id'], 'fast', echo(again))
+    assert queue.is_finished(job_id)
+
+
+def test_lost_lease_rejects_result_from_old_worker(queue):
+    job_id = submit(queue, rows=2)
+    shard = queue.claim('w1')
+    queue.fail(job_id, shard['shard_id'], 'w1', 'test')
+    queue.claim('w2')
+    assert not queue.complete(job_id, shard['shard_id'], 'w1', echo(shard))
+
+
+def test_merge_joins_results_on_the_row_index(queue, tmp_path, monkeypatch):
+    sheet = pd.DataFrame({'URL': [f"http://news.test/{idx}" for idx in range(5)], 'Media': list('ABCDE')})
+    sheet.to_excel(tmp_path / 'input.xlsx', index=False)
+    job_id = queue.submit(sheet.drop(index=[1, 3]), COLUMN_MAPPING, {}, 2)
+    ShardWorker(queue, echo, 'w1').run(job_id, stop_when_idle=True)
+
+    monkeypatch.setattr(sys, 'argv', ['work_queue.py', '--queue', queue.path, 'merge', job_id,
+                                      str(tmp_path / 'input.xlsx'), str(tmp_path / 'output.xlsx')])
+    work_queue.main()
+    merged = pd.read_excel(tmp_path / 'output.xlsx', dtype=str)
+
+    assert list(merged['Media']) == list('ABCDE')
+    assert [None if pd.isna(v) else v for v in merged['Title_New']] == ['0', None, '2', None, '4']
+
+
+def test_shards_share_the_job_deadline():
+    deadline_at = time.time() + 5
+    deadline = NewsAnalyzerApp._batch_deadline(None, {'batch_deadline_at': deadline_at, 'batch_deadline_minutes': 60})
+    assert 0 < deadline.remaining() <= 5
+    late = NewsAnalyzerApp._batch_deadline(None, {'batch_deadline_at': time.time() - 1, 'batch_deadline_minutes': 60})
+    assert late.expired()
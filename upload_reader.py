@@ -0,0 +1,103 @@
+import csv
+import hashlib
+import os
+from io import BytesIO
+from typing import List
+
+import pandas as pd
+
+from log_setup import get_logger
+from perf_metrics import perf
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # Faster xlsx reading is optional; openpyxl is the fallback
+    CalamineWorkbook = None
+
+logger = get_logger(__name__)
+
+UPLOAD_TYPES = ['xlsx', 'xls', 'csv', 'tsv', 'txt', 'parquet']
+
+_CSV_DELIMITERS = ',;\t|'
+
+
+def content_hash(data) -> str:
+    """Digest of the uploaded bytes, so a re-uploaded or unchanged file maps to the same parse"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@perf.timed('upload')
+def read_upload(data: bytes, name: str) -> pd.DataFrame:
+    """Parse an uploaded sheet (Excel, CSV/TSV or Parquet) into a DataFrame, by file extension"""
+    extension = os.path.splitext(name.lower())[1].lstrip('.')
+    if extension == 'parquet':
+        return pd.read_parquet(BytesIO(data))
+    if extension in ('csv', 'tsv', 'txt'):
+        return _read_delimited(data, '\t' if extension == 'tsv' else None)
+    if extension == 'xlsx' and CalamineWorkbook is not None:
+        try:
+            return _read_xlsx_calamine(data)
+        except Exception as e:
+            logger.warning("Calamine could not read %s, falling back to openpyxl: %s", name, e)
+    return pd.read_excel(BytesIO(data))
+
+
+def _read_delimited(data: bytes, delimiter=None) -> pd.DataFrame:
+    if delimiter is None:
+        sample = data[:65536].decode('utf-8', errors='ignore')
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=_CSV_DELIMITERS).delimiter
+        except csv.Error:
+            delimiter = ','
+    if _is_utf8(data):
+        try:
+            # Multithreaded Arrow parser; it would return other encodings as raw bytes
+            return pd.read_csv(BytesIO(data), sep=delimiter, engine='pyarrow')
+        except Exception as e:
+            logger.info("Arrow CSV parser failed (%s), using the default parser", e)
+    for encoding in ('utf-8-sig', 'latin-1'):
+        try:
+            return pd.read_csv(BytesIO(data), sep=delimiter, encoding=encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("File teks tidak dapat dibaca (encoding tidak dikenal)")
+
+
+def _is_utf8(data: bytes) -> bool:
+    try:
+        data.decode('utf-8')
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _read_xlsx_calamine(data: bytes) -> pd.DataFrame:
+    """First sheet through the Rust calamine reader, shaped like pd.read_excel's result"""
+    rows = CalamineWorkbook.from_filelike(BytesIO(data)).get_sheet_by_index(0).to_python()
+    if not rows:
+        return pd.DataFrame()
+    header = _column_names(rows[0])
+    frame = pd.DataFrame([[_excel_number(value) for value in row] for row in rows[1:]], columns=header)
+    # Empty cells come back as '' where read_excel gives NaN
+    return frame.replace({'': None}).infer_objects()
+
+
+def _excel_number(value):
+    # Excel stores every number as a float; like read_excel, whole numbers (IDs) become ints again
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _column_names(header: List) -> List[str]:
+    names, seen = [], {}
+    for idx, value in enumerate(header):
+        name = str(value) if value not in ('', None) else f"Unnamed: {idx}"
+        if name in seen:
+            # Same de-duplication as read_excel: A, A.1, A.2
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
@@ -0,0 +1,379 @@
+"""Sharded work queue for spreading one large Excel batch over several worker processes or hosts.
+
+The submitting session splits the input rows into shards stored in a SQLite queue on a
+shared path. Workers (`python work_queue.py worker --queue PATH`) claim one shard at a time
+under a lease, renew it with heartbeats while processing and post back the new columns.
+A shard whose lease expires (worker crashed or stalled) is queued again; after
+`max_attempts` it is given up and its rows come back marked 'timeout', so the app's retry
+button can pick them up. Every result row carries the index of its input row, and results
+are merged back on that index, so rows dropped before submitting don't shift the others.
+
+SQLite needs working file locks, so put the queue on local disk or a volume that provides
+them; all workers use the same file.
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from io import StringIO
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from domain_stats import CACHE_DIR
+from log_setup import configure_logging, get_logger, set_correlation_id
+from perf_metrics import perf
+from upload_reader import read_upload
+
+logger = get_logger(__name__)
+
+DEFAULT_QUEUE_PATH = os.path.join(CACHE_DIR, 'work_queue.db')
+
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+# Key of the submitted row's index in every result row
+ROW_INDEX = 'Row_Index'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    column_mapping TEXT NOT NULL,
+    total_rows INTEGER NOT NULL,
+    shard_count INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS shards (
+    job_id TEXT NOT NULL,
+    shard_id INTEGER NOT NULL,
+    start_row INTEGER NOT NULL,
+    stop_row INTEGER NOT NULL,
+    input TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, shard_id)
+);
+CREATE INDEX IF NOT EXISTS idx_shards_state ON shards(state, lease_expires);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+
+
+class WorkQueue:
+    """Job shards with leases in a SQLite file shared by the submitter and all workers"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, lease_seconds: float = 300, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, autocommit; claims take the write lock explicitly
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def submit(self, df: pd.DataFrame, column_mapping: Dict, config: Dict, shard_size: int = 500) -> str:
+        """Split `df` into shards of `shard_size` rows and queue them; returns the job id.
+
+        The index of `df` is kept with the rows (see ROW_INDEX); it must be unique.
+        """
+        if not df.index.is_unique:
+            raise ValueError("Input rows need a unique index")
+        job_id = uuid.uuid4().hex[:12]
+        starts = range(0, len(df), shard_size)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                "INSERT INTO jobs (job_id, config, column_mapping, total_rows, shard_count, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(config, default=str), json.dumps(column_mapping), len(df), len(starts), time.time())
+            )
+            conn.executemany(
+                "INSERT INTO shards (job_id, shard_id, start_row, stop_row, input, state) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (job_id, shard_id, start, min(start + shard_size, len(df)),
+                     df.iloc[start:start + shard_size].to_json(orient='split', date_format='iso',
+                                                               default_handler=str), QUEUED)
+                    for shard_id, start in enumerate(starts)
+                ]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        logger.info("Queued job %s: %d rows in %d shards", job_id, len(df), len(starts))
+        return job_id
+
+    def claim(self, worker: str, job_id: Optional[str] = None) -> Optional[Dict]:
+        """Lease the next queued shard (oldest job first), re-queueing expired leases first"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire_leases(conn, now)
+            query = "SELECT s.* FROM shards s JOIN jobs j USING (job_id) WHERE s.state = ?"
+            params = [QUEUED]
+            if job_id:
+                query += " AND s.job_id = ?"
+                params.append(job_id)
+            row = conn.execute(query + " ORDER BY j.created_at, s.shard_id LIMIT 1", params).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                "UPDATE shards SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE job_id = ? AND shard_id = ?",
+                (LEASED, worker, now + self.lease_seconds, row['job_id'], row['shard_id'])
+            )
+            job = conn.execute("SELECT config, column_mapping FROM jobs WHERE job_id = ?", (row['job_id'],)).fetchone()
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        perf.incr('queue.claimed')
+        return {
+            'job_id': row['job_id'],
+            'shard_id': row['shard_id'],
+            'start_row': row['start_row'],
+            'attempt': row['attempts'] + 1,
+            'rows': pd.read_json(StringIO(row['input']), orient='split', dtype=False, convert_dates=False),
+            'config': json.loads(job['config']),
+            'column_mapping': json.loads(job['column_mapping'])
+        }
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float):
+        expired = conn.execute(
+            "SELECT job_id, shard_id, worker, attempts FROM shards WHERE state = ? AND lease_expires < ?",
+            (LEASED, now)
+        ).fetchall()
+        for row in expired:
+            state = FAILED if row['attempts'] >= self.max_attempts else QUEUED
+            conn.execute(
+                "UPDATE shards SET state = ?, worker = NULL, error = ? WHERE job_id = ? AND shard_id = ?",
+                (state, f"Lease of {row['worker']} expired", row['job_id'], row['shard_id'])
+            )
+            perf.incr('queue.lease_expired')
+            logger.warning("Lease on shard %s/%d held by %s expired", row['job_id'], row['shard_id'], row['worker'])
+
+    def heartbeat(self, job_id: str, shard_id: int, worker: str) -> bool:
+        """Extend the worker's lease; False if the lease was lost (expired or the shard went to someone else)"""
+        now = time.time()
+        updated = self._connect().execute(
+            "UPDATE shards SET lease_expires = ? "
+            "WHERE job_id = ? AND shard_id = ? AND state = ? AND worker = ? AND lease_expires >= ?",
+            (now + self.lease_seconds, job_id, shard_id, LEASED, worker, now)
+        ).rowcount
+        return bool(updated)
+
+    def complete(self, job_id: str, shard_id: int, worker: str, records: List[Dict]) -> bool:
+        """Store the shard's result rows; ignored (False) if the worker no longer holds an unexpired lease"""
+        # An expired lease counts as lost even before a claim has re-queued the shard
+        updated = self._connect().execute(
+            "UPDATE shards SET state = ?, result = ?, lease_expires = NULL, error = NULL "
+            "WHERE job_id = ? AND shard_id = ? AND state = ? AND worker = ? AND lease_expires >= ?",
+            (DONE, json.dumps(records, ensure_ascii=False, default=str), job_id, shard_id, LEASED, worker,
+             time.time())
+        ).rowcount
+        if not updated:
+            logger.warning("Result for shard %s/%d from %s discarded: lease lost", job_id, shard_id, worker)
+        return bool(updated)
+
+    def fail(self, job_id: str, shard_id: int, worker: str, error: str):
+        """Give the shard back after an error; it is retried until it has used `max_attempts`"""
+        self._connect().execute(
+            "UPDATE shards SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, "
+            "lease_expires = NULL, error = ? WHERE job_id = ? AND shard_id = ? AND state = ? AND worker = ?",
+            (self.max_attempts, FAILED, QUEUED, error[:1000], job_id, shard_id, LEASED, worker)
+        )
+        perf.incr('queue.failed')
+
+    def progress(self, job_id: str) -> Dict[str, int]:
+        """Shard count per state, plus finished rows and the job's totals"""
+        conn = self._connect()
+        job = conn.execute("SELECT total_rows, shard_count FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if job is None:
+            raise KeyError(job_id)
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        rows_done = 0
+        for row in conn.execute(
+            "SELECT state, COUNT(*) AS shards, SUM(stop_row - start_row) AS rows FROM shards "
+            "WHERE job_id = ? GROUP BY state", (job_id,)
+        ):
+            counts[row['state']] = row['shards']
+            if row['state'] in (DONE, FAILED):
+                rows_done += row['rows']
+        return {**counts, 'rows_done': rows_done, 'total_rows': job['total_rows'], 'shards': job['shard_count']}
+
+    def is_finished(self, job_id: str) -> bool:
+        progress = self.progress(job_id)
+        return progress[DONE] + progress[FAILED] == progress['shards']
+
+    def results(self, job_id: str) -> Iterator[Dict]:
+        """Result rows of a finished job in submitted order; rows of failed shards are marked 'timeout'"""
+        rows = self._connect().execute(
+            "SELECT state, input, result FROM shards WHERE job_id = ? ORDER BY shard_id", (job_id,)
+        )
+        for row in rows:
+            if row['state'] == DONE:
+                yield from json.loads(row['result'])
+            elif row['state'] == FAILED:
+                for index in json.loads(row['input'])['index']:
+                    yield {ROW_INDEX: index, 'Status_New': 'timeout'}
+            else:
+                raise RuntimeError(f"Job {job_id} is not finished (shard state {row['state']})")
+
+    def delete(self, job_id: str):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("DELETE FROM shards WHERE job_id = ?", (job_id,))
+        conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        conn.execute('COMMIT')
+
+
+class ShardWorker:
+    """Claims shards and runs `process(shard) -> result rows`, renewing the lease while it works.
+
+    `process` returns one record per input row, in order; the worker tags each with the row's index.
+    """
+
+    def __init__(self, queue: WorkQueue, process: Callable[[Dict], List[Dict]],
+                 worker_id: Optional[str] = None, poll_interval: float = 2.0):
+        self.queue = queue
+        self.process = process
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+
+    def run(self, job_id: Optional[str] = None, stop_when_idle: bool = False) -> int:
+        """Process shards until stopped (or until none is left with `stop_when_idle`); returns shards done"""
+        done = 0
+        while True:
+            shard = self.queue.claim(self.worker_id, job_id)
+            if shard is None:
+                if stop_when_idle:
+                    return done
+                time.sleep(self.poll_interval)
+                continue
+            done += self.work_on(shard)
+
+    def work_on(self, shard: Dict) -> bool:
+        job_id, shard_id = shard['job_id'], shard['shard_id']
+        set_correlation_id(f"{job_id}/{shard_id}")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, shard_id, stop), daemon=True)
+        heartbeat.start()
+        try:
+            index = shard['rows'].index.tolist()
+            records = self.process(shard)
+            if len(records) != len(index):
+                raise RuntimeError(f"{len(records)} results for {len(index)} rows")
+            records = [{**record, ROW_INDEX: row_index} for row_index, record in zip(index, records)]
+        except BaseException as e:
+            # DeadlineExceeded and CircuitOpen derive from BaseException; they fail the shard, not the worker
+            logger.exception("Shard %s/%d failed", job_id, shard_id)
+            self.queue.fail(job_id, shard_id, self.worker_id, f"{type(e).__name__}: {e}")
+            if isinstance(e, (KeyboardInterrupt, SystemExit)):
+                raise
+            return False
+        finally:
+            stop.set()
+            heartbeat.join()
+        return self.queue.complete(job_id, shard_id, self.worker_id, records)
+
+    def _heartbeat(self, job_id: str, shard_id: int, stop: threading.Event):
+        while not stop.wait(self.queue.lease_seconds / 3):
+            if not self.queue.heartbeat(job_id, shard_id, self.worker_id):
+                logger.warning("Lost lease on shard %s/%d", job_id, shard_id)
+                return
+
+
+def analyze_shard(app, shard: Dict) -> List[Dict]:
+    """Run a shard through `app.process_excel_data` and return its new columns as row dicts.
+
+    The job's `batch_deadline_at` (set by the submitter) bounds every shard, so all shards share
+    the one batch deadline instead of each starting a fresh `batch_deadline_minutes`.
+    """
+    config = shard['config']
+    app._prepare_run(config)
+    results = app.process_excel_data(shard['rows'], shard['column_mapping'], config)
+    frame = results.frame(columns=results.new_columns)
+    return [
+        {key: value for key, value in record.items() if value is not None and value == value}
+        for record in frame.to_dict('records')
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_PATH, help='Queue database shared by all workers')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    worker = commands.add_parser('worker', help='Process shards of queued jobs')
+    worker.add_argument('--job', help='Only work on this job')
+    worker.add_argument('--id', help='Worker name (default: host-pid)')
+    worker.add_argument('--exit-when-idle', action='store_true', help='Stop when no shard is queued')
+    worker.add_argument('--lease', type=float, default=300, help='Lease length in seconds')
+    worker.add_argument('--log-level', default='WARNING')
+
+    status = commands.add_parser('status', help='Show progress of a job')
+    status.add_argument('job')
+
+    merge = commands.add_parser('merge', help='Write a finished job as Excel: input columns plus results')
+    merge.add_argument('job')
+    merge.add_argument('input', help='The submitted input file (Excel, CSV/TSV or Parquet)')
+    merge.add_argument('output')
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        configure_logging(args.log_level)
+        # Imported here: the app module pulls in Streamlit and the whole pipeline
+        from app import NewsAnalyzerApp
+
+        app = NewsAnalyzerApp()
+        queue = WorkQueue(args.queue, lease_seconds=args.lease)
+        done = ShardWorker(queue, lambda shard: analyze_shard(app, shard), args.id).run(
+            args.job, stop_when_idle=args.exit_when_idle
+        )
+        app.scraper.save_state()
+        print(f"{done} shard(s) processed")
+    elif args.command == 'status':
+        print(json.dumps(WorkQueue(args.queue).progress(args.job), indent=2))
+    else:
+        queue = WorkQueue(args.queue)
+        if not queue.is_finished(args.job):
+            parser.error(f"job {args.job} is not finished")
+        with open(args.input, 'rb') as f:
+            merged = read_upload(f.read(), args.input).reset_index(drop=True)
+        results = pd.DataFrame(list(queue.results(args.job))).set_index(ROW_INDEX)
+        # Joined on the submitted row index: rows the prefilter dropped stay without results
+        merged = merged.drop(columns=[c for c in results.columns if c in merged.columns]).join(results)
+        merged.to_excel(args.output, index=False)
+        print(f"{len(merged)} rows written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()